@@ -0,0 +1,69 @@
+import collections
+import time
+
+import numpy as np
+
+# Quality ladder, best first. Each step down is cheaper than the one before it.
+QUALITY_LEVELS = [
+    {"input_scale": 1.0, "model_complexity": 1, "max_hands": 2, "render_interval": 1},
+    {"input_scale": 0.75, "model_complexity": 1, "max_hands": 2, "render_interval": 1},
+    {"input_scale": 0.75, "model_complexity": 0, "max_hands": 2, "render_interval": 1},
+    {"input_scale": 0.5, "model_complexity": 0, "max_hands": 2, "render_interval": 2},
+    {"input_scale": 0.5, "model_complexity": 0, "max_hands": 1, "render_interval": 3},
+]
+
+
+class AdaptiveQualityController:
+    """
+    Holds a target frame rate by walking up and down QUALITY_LEVELS.
+
+    Fed the per-frame time of the slowest pipeline stage (which is what
+    bounds throughput, since the camera itself caps the observed FPS). When
+    that stage uses more than `high_load` of the frame budget the controller
+    steps quality down; when it stays under `low_load` it steps back up.
+    A cooldown after every change lets the new level settle before judging it.
+    """
+
+    def __init__(self, target_fps=30, levels=None, window=30, high_load=0.95, low_load=0.6, cooldown=2.0):
+        self.target_fps = target_fps
+        self.levels = levels or QUALITY_LEVELS
+        self.window = window
+        self.high_load = high_load
+        self.low_load = low_load
+        self.cooldown = cooldown
+
+        self.level = 0
+        self.stage_times = collections.deque(maxlen=window)
+        self.last_change = 0
+        self.changes = 0
+
+    @property
+    def settings(self):
+        return self.levels[self.level]
+
+    def load(self):
+        """Fraction of the frame budget used by the slowest stage (p90 over the window)."""
+        if not self.stage_times:
+            return 0.0
+        return float(np.percentile(self.stage_times, 90)) * self.target_fps
+
+    def update(self, stage_time, now=None):
+        """Record one frame; returns the new settings dict if the level changed, else None."""
+        now = time.time() if now is None else now
+        self.stage_times.append(stage_time)
+        if len(self.stage_times) < self.window or now - self.last_change < self.cooldown:
+            return None
+
+        load = self.load()
+        if load > self.high_load and self.level < len(self.levels) - 1:
+            return self.set_level(self.level + 1, now)
+        if load < self.low_load and self.level > 0:
+            return self.set_level(self.level - 1, now)
+        return None
+
+    def set_level(self, level, now=None):
+        self.level = level
+        self.last_change = time.time() if now is None else now
+        self.stage_times.clear()
+        self.changes += 1
+        return self.settings
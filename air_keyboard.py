@@ -0,0 +1,415 @@
+import time
+import os
+
+import cv2
+import numpy as np
+
+from autocomplete import Autocomplete, WordIndex
+from key_decoder import CharNgram, KeyDecoder
+from keyboard_layout import KeyboardLayout
+from swipe_decoder import SwipeDecoder, path_length
+from text_renderer import GlyphCache, TextLine
+from cursor_filter import CursorFilterBank
+from gesture_engine import GestureEngine
+from hand_identity import HandIdentityTracker
+from profiler import NULL_PROFILER
+
+# Mode constants
+MODE_KEYBOARD = 0
+MODE_TRACKPAD = 1
+MODE_EMOJI = 2
+MODE_SWIPE = 3
+MODE_NAMES = ["KEYBOARD", "TRACKPAD", "EMOJI", "SWIPE"]
+
+# Swipe mode: trails shorter than this (px) are taps on the key under the pinch
+SWIPE_MIN_LENGTH = 60
+
+# Cursor smoothing: "one_euro", "kalman" or "exponential" (fixed smoothing factor).
+# CURSOR_PREDICTION extrapolates by N seconds, or "latency" to cancel pipeline lag.
+CURSOR_FILTER = "one_euro"
+CURSOR_FILTER_PARAMS = {"min_cutoff": 1.0, "beta": 0.02}
+CURSOR_PREDICTION = "latency"
+
+
+class AirKeyboard:
+    """
+    Gesture logic and HUD rendering for one stream of hand landmarks.
+
+    All side effects (key presses, mouse, sounds, clipboard) go through
+    `sink`, and time is passed in explicitly, so the same code runs live
+    from main() and headless from recorded video or landmark traces.
+    """
+
+    def __init__(self, sink, screen_size=(1920, 1080), frame_size=(1280, 720), max_hands=2, layout="qwerty",
+                 profiler=None, events=None):
+        self.sink = sink
+        self.profiler = profiler or NULL_PROFILER
+        # Optional publish(kind, t=None, **fields) callback (ipc_server.IpcServer.publish)
+        # for cursor, gesture, mode and text events
+        self.events = events
+        self.published_text = ""
+        self.published_gestures = {}  # hand id -> gestures triggered last frame
+        self.screen_size = screen_size
+        self.frame_size = frame_size
+
+        # Initialize Layouts
+        self.keyboard = KeyboardLayout(layout, frame_size=frame_size)
+        # Built on first entry to emoji mode (see emoji_panel())
+        self.emoji = None
+
+        self.final_text = ""
+        # Output box text, re-rendered incrementally from a glyph atlas
+        self.output_line = TextLine(GlyphCache(height=64), 1160)
+
+        # Word completions for the text typed so far, shown as extra keys
+        index = WordIndex.load()
+        self.autocomplete = Autocomplete(index, k=len(self.keyboard.suggestion_buttons))
+
+        # Shape-writing: index-tip trail per hand while pinched, decoded on release.
+        # Decoders are built per keyboard layout, the first time it is used.
+        self.lexicon = ([index.word(i) for i in range(index.size)], index.freqs)
+        self.swipe_decoders = {}
+        self.swipe_trails = {}
+
+        # Pinched keys are decoded from a per-key touch model plus a character
+        # n-gram over the typed text (one decoder per layout, built on first use).
+        # Kept taps and taps erased with BACK then retyped train the touch model.
+        self.ngram = CharNgram(*self.lexicon)
+        self.key_decoders = {}
+        self.pending_tap = None  # (button, x, y) of the last key tap, until confirmed
+        self.erased_tap = None   # the same, after BACK erased it
+
+        # Mode state (held open palm switches mode, see gesture_engine.DEFAULT_CONFIG)
+        self.current_mode = MODE_KEYBOARD
+        self.mode_switch_progress = None
+
+        # Stable hand identities, pinch/gesture state for all hands, and index-tip
+        # cursor filters per hand identity
+        self.identities = HandIdentityTracker(max_hands=max_hands)
+        self.gestures = GestureEngine(max_hands=max_hands)
+        self.cursor_filters = CursorFilterBank(CURSOR_FILTER, landmark_ids=(8,),
+                                               prediction=CURSOR_PREDICTION, **CURSOR_FILTER_PARAMS)
+
+        self.is_shift = False
+
+        # Per-frame interaction results by hand identity, consumed by render()
+        self.hovered_buttons = {}
+        self.clicked_buttons = {}
+        self.cursors_to_draw = []
+
+    def update(self, landmarks, capture_time, now=None):
+        """Run mode switching, cursor filtering and click logic for one frame."""
+        with self.profiler.measure("gesture"):
+            self.update_hands(landmarks, capture_time, now)
+
+    def update_hands(self, landmarks, capture_time, now):
+        if now is None:
+            now = time.time()
+
+        self.hovered_buttons = {}
+        self.clicked_buttons = {}
+        self.cursors_to_draw = []
+
+        # Match hands to last frame's, so per-hand state follows the hand, not MediaPipe's order
+        reset = self.identities.assign(landmarks, now)
+        self.gestures.reset(reset)
+        for hand_id in reset:
+            self.swipe_trails.pop(hand_id, None)
+        active = self.identities.active_ids()
+        self.cursor_filters.prune([i for i in active if i not in reset])
+
+        # One batched pass: finger states, pinch clicks and held gestures for every hand
+        gestures = self.gestures.update(landmarks, now)
+        self.update_mode(gestures)
+
+        for row in range(gestures.count):
+            hand_id = int(landmarks.ids[row])
+            # Smoothing (filtered with the frame's capture timestamp)
+            smoothed = self.cursor_filters.filter(hand_id, landmarks.pixels[row],
+                                                  capture_time, now)
+            x8, y8 = int(smoothed[8][0]), int(smoothed[8][1])
+
+            self.cursors_to_draw.append((x8, y8))
+            if self.events is not None:
+                self.publish_hand(gestures, row, hand_id, x8, y8, capture_time)
+
+            # MODE-SPECIFIC LOGIC
+            clicked = bool(gestures.clicked[row])
+            if self.current_mode == MODE_KEYBOARD:
+                self.update_keyboard(hand_id, x8, y8, clicked)
+            elif self.current_mode == MODE_TRACKPAD:
+                self.update_trackpad(x8, y8, clicked)
+            elif self.current_mode == MODE_EMOJI:
+                self.update_emoji(hand_id, x8, y8, clicked)
+            elif self.current_mode == MODE_SWIPE:
+                self.update_swipe(hand_id, row, x8, y8, gestures)
+
+        for hand_id in list(self.swipe_trails):
+            if hand_id not in active:
+                del self.swipe_trails[hand_id]
+
+        if self.events is not None and self.final_text != self.published_text:
+            # Only the edit since the last text event: characters removed from the end, then appended
+            kept = len(os.path.commonprefix([self.published_text, self.final_text]))
+            self.events("text", delete=len(self.published_text) - kept, insert=self.final_text[kept:])
+            self.published_text = self.final_text
+
+    def publish_hand(self, gestures, row, hand_id, x, y, capture_time):
+        self.events("cursor", t=capture_time, hand=hand_id, x=x, y=y)
+        if gestures.clicked[row]:
+            self.events("gesture", hand=hand_id, gesture="pinch", x=x, y=y)
+        if gestures.released[row]:
+            self.events("gesture", hand=hand_id, gesture="release", x=x, y=y)
+        # Held gestures are reported once when they trigger, not every frame they stay triggered
+        triggered = {self.gestures.gesture_names[g] for g in np.flatnonzero(gestures.triggered[row])}
+        for name in triggered - self.published_gestures.get(hand_id, set()):
+            self.events("gesture", hand=hand_id, gesture=name, x=x, y=y)
+        self.published_gestures[hand_id] = triggered
+
+    def swipe_decoder(self):
+        name = self.keyboard.layout.name
+        if name not in self.swipe_decoders:
+            self.swipe_decoders[name] = SwipeDecoder(self.keyboard.button_list, *self.lexicon)
+        return self.swipe_decoders[name]
+
+    def key_decoder(self):
+        name = self.keyboard.layout.name
+        if name not in self.key_decoders:
+            self.key_decoders[name] = KeyDecoder(self.keyboard.button_list, self.ngram,
+                                                 radius=int(self.keyboard.magnet_radius * 1.5))
+        return self.key_decoders[name]
+
+    def emoji_panel(self):
+        if self.emoji is None:
+            from emoji_panel import EmojiPanel
+            self.emoji = EmojiPanel(frame_size=self.frame_size)
+        return self.emoji
+
+    def next_layout(self):
+        layout = self.keyboard.next_layout()
+        self.swipe_trails = {}
+        self.pending_tap = self.erased_tap = None
+        print(f"Switched to layout: {layout.title}")
+        if self.events is not None:
+            self.events("layout", layout=layout.name)
+
+    def update_mode(self, gestures):
+        # Mode gestures may come from any hand. Hold state is kept per identity
+        # slot, so it follows each hand whatever MediaPipe's row order is.
+        rows = range(gestures.count)
+
+        # Mode Switching Logic: a hand holds an open palm; the bar shows the furthest hold
+        progress = [p for p in (gestures.hold_progress(row, "open_palm") for row in rows) if p is not None]
+        self.mode_switch_progress = max(progress) if progress else None
+        if any(gestures.is_triggered(row, "open_palm") for row in rows):
+            self.current_mode = (self.current_mode + 1) % len(MODE_NAMES)
+            self.swipe_trails = {}
+            self.mode_switch_progress = None
+            print(f"Switched to mode: {MODE_NAMES[self.current_mode]}")
+            if self.events is not None:
+                self.events("mode", mode=MODE_NAMES[self.current_mode])
+
+        # Held victory sign cycles the keyboard layout
+        victory = any(gestures.is_triggered(row, "victory") for row in rows)
+        if self.current_mode in (MODE_KEYBOARD, MODE_SWIPE) and victory:
+            self.next_layout()
+
+    def update_keyboard(self, hand_id, x8, y8, clicked):
+        # Magnetic Key Logic
+        closest_button = self.keyboard.get_closest_button(x8, y8)
+
+        if closest_button:
+            self.hovered_buttons[hand_id] = closest_button
+
+            # Click Logic
+            if clicked:
+                button = self.tap_button(x8, y8, closest_button)
+                self.clicked_buttons[hand_id] = button
+                self.sink.play_click()
+                self.press_key(button, (x8, y8))
+
+    def tap_button(self, x, y, closest_button):
+        """Key meant by a pinch at (x, y): suggestions by proximity, keys by the probabilistic decoder."""
+        if closest_button in self.keyboard.suggestion_buttons:
+            return closest_button
+        with self.profiler.measure("key_decode"):
+            return self.key_decoder().decode(x, y, self.final_text) or closest_button
+
+    def learn_tap(self, button, tap):
+        decoder = self.key_decoder()
+        if button.text == "BACK":
+            # The previous tap was a miss; remember where it landed
+            self.erased_tap, self.pending_tap = self.pending_tap, None
+            return
+        if self.pending_tap is not None:
+            # Not erased, so it hit the key it was meant for
+            decoder.learn(*self.pending_tap)
+        if self.erased_tap is not None and self.erased_tap[0] is not button:
+            # Erased and retyped: the erased tap was meant for this key
+            decoder.learn(button, *self.erased_tap[1:])
+        self.erased_tap = None
+        self.pending_tap = (button, *tap)
+
+    def press_key(self, button, tap=None):
+        if tap is not None and button not in self.keyboard.suggestion_buttons:
+            self.learn_tap(button, tap)
+        try:
+            if button in self.keyboard.suggestion_buttons:
+                self.accept_suggestion(button.text)
+            elif button.text == "SPACE":
+                self.final_text += " "
+                self.sink.tap_key("space")
+            elif button.text == "ENTER":
+                self.final_text += "\n"
+                self.sink.tap_key("enter")
+            elif button.text == "BACK":
+                self.final_text = self.final_text[:-1]
+                self.sink.tap_key("backspace")
+            elif button.text == "SHIFT":
+                self.is_shift = not self.is_shift
+            else:
+                char_to_type = button.text
+                if not self.is_shift:
+                    char_to_type = char_to_type.lower()
+                self.final_text += char_to_type
+                self.sink.tap_key(char_to_type)
+        except Exception as e:
+            print(f"Error: {e}")
+        self.refresh_suggestions()
+
+    def accept_suggestion(self, word):
+        # Type the rest of the word plus a trailing space
+        self.type_word(self.autocomplete.completion(word))
+
+    def type_word(self, word):
+        if self.is_shift:
+            word = word.upper()
+        for char in word:
+            self.sink.tap_key(char)
+        self.sink.tap_key("space")
+        self.final_text += word + " "
+
+    def refresh_suggestions(self):
+        with self.profiler.measure("autocomplete"):
+            previous = self.autocomplete.suggestions
+            if self.autocomplete.update(self.final_text) is not previous:
+                self.keyboard.set_suggestions(self.autocomplete.suggestions)
+
+    def update_swipe(self, hand_id, row, x8, y8, gestures):
+        # Hover feedback like keyboard mode
+        closest_button = self.keyboard.get_closest_button(x8, y8)
+        if closest_button:
+            self.hovered_buttons[hand_id] = closest_button
+
+        if gestures.clicked[row]:
+            self.swipe_trails[hand_id] = [(x8, y8)]
+        elif gestures.pinched[row] and hand_id in self.swipe_trails:
+            self.swipe_trails[hand_id].append((x8, y8))
+        elif gestures.released[row] and hand_id in self.swipe_trails:
+            trail = self.swipe_trails.pop(hand_id)
+            trail.append((x8, y8))
+            self.finish_swipe(hand_id, trail)
+
+    def finish_swipe(self, hand_id, trail):
+        self.sink.play_click()
+        if path_length(np.array(trail, np.float32)) < SWIPE_MIN_LENGTH:
+            # Short trail: a tap on the key where the pinch started
+            button = self.keyboard.get_closest_button(*trail[0])
+            if button:
+                button = self.tap_button(*trail[0], button)
+                self.clicked_buttons[hand_id] = button
+                self.press_key(button, trail[0])
+            return
+
+        with self.profiler.measure("swipe_decode"):
+            words = self.swipe_decoder().decode(trail)
+        if words:
+            self.type_word(words[0])
+            self.refresh_suggestions()
+            print(f"Swiped: {words[0]} (alternatives: {', '.join(words[1:])})")
+
+    def update_trackpad(self, x8, y8, clicked):
+        # Trackpad Mode: Control mouse cursor
+        # Map hand position to screen coordinates
+        screen_x = int(x8 * self.screen_size[0] / self.frame_size[0])
+        screen_y = int(y8 * self.screen_size[1] / self.frame_size[1])
+
+        self.sink.move_mouse(screen_x, screen_y)
+
+        if clicked:
+            self.sink.click_mouse()
+            self.sink.play_click()
+
+    def update_emoji(self, hand_id, x8, y8, clicked):
+        # Emoji Mode
+        panel = self.emoji_panel()
+        emoji_hovered = panel.get_hovered_button(x8, y8)
+        if emoji_hovered:
+            self.hovered_buttons[hand_id] = emoji_hovered
+
+        if clicked:
+            result = panel.check_click(x8, y8)
+            if result:
+                self.clicked_buttons[hand_id] = emoji_hovered
+                self.sink.copy_to_clipboard(result)
+                print(f"Copied to clipboard: {result}")
+                self.final_text += result
+                self.refresh_suggestions()
+            self.sink.play_click()
+
+    def render(self, img):
+        """Draw the HUD for the current mode; returns the frame to display."""
+        # Draw mode switch progress indicator
+        if self.mode_switch_progress is not None:
+            bar_width = int(200 * self.mode_switch_progress)
+            cv2.rectangle(img, (540, 20), (740, 40), (50, 50, 50), cv2.FILLED)
+            cv2.rectangle(img, (540, 20), (540 + bar_width, 40), (0, 255, 255), cv2.FILLED)
+            cv2.putText(img, "SWITCHING MODE...", (545, 35), cv2.FONT_HERSHEY_PLAIN, 1, (255, 255, 255), 1)
+
+        # Draw mode-specific UI
+        if self.current_mode in (MODE_KEYBOARD, MODE_SWIPE):
+            with self.profiler.measure("draw_keyboard"):
+                img = self.keyboard.draw_keyboard(img, self.hovered_buttons.values(),
+                                                  self.clicked_buttons.values(), shift=self.is_shift)
+
+            if self.is_shift:
+                cv2.putText(img, "SHIFT ON", (1100, 100), cv2.FONT_HERSHEY_PLAIN, 2, (0, 255, 255), 2)
+
+            # Display Output Text
+            cv2.rectangle(img, (50, 600), (1230, 700), (0, 0, 0), cv2.FILLED)
+            cv2.rectangle(img, (50, 600), (1230, 700), (255, 255, 0), 2)
+            self.output_line.update(self.final_text)
+            self.output_line.draw(img, (60, 618))
+
+            # Swipe trails in progress
+            for trail in self.swipe_trails.values():
+                if len(trail) > 1:
+                    cv2.polylines(img, [np.array(trail, np.int32)], False, (0, 255, 255), 4)
+
+        elif self.current_mode == MODE_TRACKPAD:
+            # Draw trackpad indicator
+            cv2.rectangle(img, (50, 50), (350, 150), (0, 0, 0), cv2.FILLED)
+            cv2.rectangle(img, (50, 50), (350, 150), (0, 255, 255), 2)
+            cv2.putText(img, "TRACKPAD MODE", (60, 90), cv2.FONT_HERSHEY_PLAIN, 2, (0, 255, 255), 2)
+            cv2.putText(img, "Pinch to Click", (60, 120), cv2.FONT_HERSHEY_PLAIN, 1.5, (255, 255, 255), 1)
+
+        elif self.current_mode == MODE_EMOJI:
+            panel = self.emoji_panel()
+            with self.profiler.measure("draw_panel"):
+                img = panel.draw_panel(img, self.hovered_buttons.values(), self.clicked_buttons.values())
+
+            # Show clipboard hint
+            cv2.rectangle(img, (600, 50), (1100, 100), (0, 0, 0), cv2.FILLED)
+            panel.glyphs.draw_text(img, "Copied: " + self.final_text[-10:], (610, 55), (0, 255, 0))
+
+        # Draw mode indicator
+        mode_colors = [(255, 200, 0), (0, 255, 255), (255, 0, 255), (0, 200, 255)]
+        cv2.rectangle(img, (20, 20), (220, 60), (0, 0, 0), cv2.FILLED)
+        cv2.rectangle(img, (20, 20), (220, 60), mode_colors[self.current_mode], 2)
+        cv2.putText(img, MODE_NAMES[self.current_mode], (30, 50), cv2.FONT_HERSHEY_PLAIN, 2, mode_colors[self.current_mode], 2)
+
+        # Re-draw cursors on top
+        for cx, cy in self.cursors_to_draw:
+            cv2.circle(img, (cx, cy), 8, (255, 0, 255), cv2.FILLED)
+
+        return img
@@ -0,0 +1,162 @@
+import mmap
+import os
+import re
+import struct
+
+import numpy as np
+
+WORDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "words.txt")
+
+# Compiled index layout (little endian):
+#   header: magic, version, word count n, blob length
+#   uint32 offsets[n + 1]   byte offsets of each word in the blob
+#   uint32 freqs[n]
+#   blob                    UTF-8 words, sorted bytewise, no separators
+MAGIC = b"AKWI"
+VERSION = 1
+HEADER = struct.Struct("<4sIII")
+
+WORD_TAIL = re.compile(r"[a-z']*$")
+
+
+def compile_index(source, index_path):
+    """Compile a "word count" text file into the binary index at index_path."""
+    counts = {}
+    with open(source, encoding="utf-8") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) != 2 or line.startswith("#"):
+                continue
+            word = parts[0].lower()
+            counts[word] = counts.get(word, 0) + int(parts[1])
+
+    entries = sorted((w.encode("utf-8"), c) for w, c in counts.items())
+    lengths = [len(w) for w, _ in entries]
+    offsets = np.zeros(len(entries) + 1, np.uint32)
+    np.cumsum(lengths, out=offsets[1:])
+    freqs = np.array([min(c, 0xFFFFFFFF) for _, c in entries], np.uint32)
+    blob = b"".join(w for w, _ in entries)
+
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(entries), len(blob)))
+        f.write(offsets.tobytes())
+        f.write(freqs.tobytes())
+        f.write(blob)
+    os.replace(tmp_path, index_path)
+
+
+class WordIndex:
+    """
+    Sorted, frequency-annotated word list memory-mapped from a compiled index.
+
+    Words sharing a prefix form one contiguous range, found by binary search,
+    so lookups touch only a few pages of the file and startup is just an mmap.
+    """
+
+    def __init__(self, index_path):
+        with open(index_path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, n, blob_len = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"'{index_path}' is not a version {VERSION} word index")
+
+        self.size = n
+        self.offsets = np.frombuffer(self.mm, np.uint32, n + 1, HEADER.size)
+        self.freqs = np.frombuffer(self.mm, np.uint32, n, HEADER.size + 4 * (n + 1))
+        self.blob_start = HEADER.size + 8 * n + 4
+        # Plain ints for the binary search, which runs in pure Python
+        self.starts = self.offsets.tolist()
+
+    @classmethod
+    def load(cls, source=WORDS_PATH, index_path=None):
+        """Map the compiled index for `source`, (re)compiling it if missing or stale."""
+        index_path = index_path or os.path.splitext(source)[0] + ".idx"
+        if (not os.path.exists(index_path) or
+                os.path.getmtime(index_path) < os.path.getmtime(source)):
+            compile_index(source, index_path)
+        return cls(index_path)
+
+    def word_bytes(self, i):
+        base = self.blob_start
+        return self.mm[base + self.starts[i]:base + self.starts[i + 1]]
+
+    def word(self, i):
+        return self.word_bytes(i).decode("utf-8")
+
+    def lower_bound(self, key, lo, hi):
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.word_bytes(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def prefix_range(self, prefix, lo=0, hi=None):
+        """[lo, hi) of the words starting with `prefix`, searched within [lo, hi)."""
+        hi = self.size if hi is None else hi
+        key = prefix.encode("utf-8")
+        lo = self.lower_bound(key, lo, hi)
+        # Every word with the prefix sorts below prefix + 0xff
+        hi = self.lower_bound(key + b"\xff", lo, hi)
+        return lo, hi
+
+    def top_k(self, lo, hi, k):
+        """Up to k words of [lo, hi), most frequent first."""
+        if hi <= lo:
+            return []
+        freqs = self.freqs[lo:hi]
+        if hi - lo > k:
+            best = np.argpartition(-freqs.astype(np.int64), k)[:k]
+        else:
+            best = np.arange(hi - lo)
+        best = best[np.argsort(-freqs[best].astype(np.int64), kind="stable")]
+        return [self.word(lo + int(i)) for i in best]
+
+    def close(self):
+        self.offsets = self.freqs = None
+        self.mm.close()
+
+
+class Autocomplete:
+    """
+    Top-k completions for the word being typed at the end of the text.
+
+    The prefix range of every character typed so far is kept on a stack, so
+    typing a letter only searches inside the previous range and backspace
+    just pops it.
+    """
+
+    def __init__(self, index, k=3):
+        self.index = index
+        self.k = k
+        self.prefix = ""
+        self.ranges = [(0, index.size)]
+        self.suggestions = []
+
+    def current_prefix(self, text):
+        return WORD_TAIL.search(text[-64:].lower()).group()
+
+    def update(self, text):
+        """Recompute suggestions for `text`; returns the list of suggested words."""
+        prefix = self.current_prefix(text)
+        if prefix == self.prefix:
+            return self.suggestions
+
+        # Keep the ranges of the part shared with the previous prefix
+        common = 0
+        while common < min(len(prefix), len(self.prefix)) and prefix[common] == self.prefix[common]:
+            common += 1
+        del self.ranges[common + 1:]
+        for i in range(common, len(prefix)):
+            lo, hi = self.ranges[-1]
+            self.ranges.append(self.index.prefix_range(prefix[:i + 1], lo, hi))
+
+        self.prefix = prefix
+        self.suggestions = self.index.top_k(*self.ranges[-1], self.k) if prefix else []
+        return self.suggestions
+
+    def completion(self, word):
+        """Characters still to type to turn the current prefix into `word`."""
+        return word[len(self.prefix):] if word.startswith(self.prefix) else word
@@ -0,0 +1,201 @@
+import math
+
+import numpy as np
+
+
+class ExponentialFilter:
+    """Fixed-weight exponential smoothing (the original `smoothing_factor` behaviour)."""
+
+    def __init__(self, smoothing_factor=2):
+        self.alpha = 1.0 / smoothing_factor
+        self.x = None
+        self.v = None
+        self.t = None
+
+    def reset(self):
+        self.x = None
+        self.v = None
+        self.t = None
+
+    def filter(self, x, t, horizon=0.0):
+        x = np.asarray(x, np.float64)
+        if self.x is None:
+            self.x = x.copy()
+            self.v = np.zeros_like(x)
+        else:
+            prev = self.x
+            self.x = prev + (x - prev) * self.alpha
+            dt = t - self.t
+            if dt > 0:
+                self.v = (self.x - prev) / dt
+        self.t = t
+        return self.predict(horizon)
+
+    def predict(self, horizon):
+        if horizon <= 0:
+            return self.x.copy()
+        return self.x + self.v * horizon
+
+
+class OneEuroFilter:
+    """
+    One Euro filter (Casiez et al.) over an array of coordinates.
+
+    The cutoff frequency rises with speed: heavy smoothing while the hand is
+    still, little lag during fast moves. `min_cutoff` trades jitter for lag
+    at rest, `beta` controls how quickly the cutoff opens up with speed.
+    """
+
+    def __init__(self, min_cutoff=1.0, beta=0.02, d_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.x = None
+        self.dx = None
+        self.t = None
+
+    @staticmethod
+    def smoothing(cutoff, dt):
+        r = 2 * math.pi * cutoff * dt
+        return r / (r + 1)
+
+    def reset(self):
+        self.x = None
+        self.dx = None
+        self.t = None
+
+    def filter(self, x, t, horizon=0.0):
+        x = np.asarray(x, np.float64)
+        if self.x is None:
+            self.x = x.copy()
+            self.dx = np.zeros_like(x)
+            self.t = t
+            return self.predict(horizon)
+
+        dt = t - self.t
+        if dt <= 0:
+            return self.predict(horizon)
+        self.t = t
+
+        a_d = self.smoothing(self.d_cutoff, dt)
+        self.dx += a_d * ((x - self.x) / dt - self.dx)
+
+        # Per-coordinate cutoff driven by the smoothed speed
+        cutoff = self.min_cutoff + self.beta * np.abs(self.dx)
+        r = 2 * np.pi * cutoff * dt
+        a = r / (r + 1)
+        self.x += a * (x - self.x)
+        return self.predict(horizon)
+
+    def predict(self, horizon):
+        if horizon <= 0:
+            return self.x.copy()
+        return self.x + self.dx * horizon
+
+
+class KalmanFilter:
+    """
+    Constant-velocity Kalman filter, run independently on every coordinate.
+
+    `process_noise` is the acceleration noise density (px/s^2)^2 / Hz and
+    `measurement_noise` the landmark jitter variance in px^2.
+    """
+
+    def __init__(self, process_noise=5e5, measurement_noise=4.0):
+        self.q = process_noise
+        self.r = measurement_noise
+        self.x = None
+        self.v = None
+        self.t = None
+
+    def reset(self):
+        self.x = None
+        self.t = None
+
+    def filter(self, z, t, horizon=0.0):
+        z = np.asarray(z, np.float64)
+        if self.x is None:
+            self.x = z.copy()
+            self.v = np.zeros_like(z)
+            # Covariance [[p00, p01], [p01, p11]] per coordinate
+            self.p00 = np.full_like(z, self.r)
+            self.p01 = np.zeros_like(z)
+            self.p11 = np.full_like(z, 1e6)
+            self.t = t
+            return self.predict(horizon)
+
+        dt = t - self.t
+        if dt > 0:
+            self.t = t
+            q = self.q
+            self.x += self.v * dt
+            self.p00 += dt * (2 * self.p01 + dt * self.p11) + q * dt ** 3 / 3
+            self.p01 += dt * self.p11 + q * dt ** 2 / 2
+            self.p11 += q * dt
+
+        s = self.p00 + self.r
+        k0 = self.p00 / s
+        k1 = self.p01 / s
+        y = z - self.x
+        self.x += k0 * y
+        self.v += k1 * y
+        self.p11 -= k1 * self.p01
+        self.p00 *= 1 - k0
+        self.p01 *= 1 - k0
+        return self.predict(horizon)
+
+    def predict(self, horizon):
+        if horizon <= 0:
+            return self.x.copy()
+        return self.x + self.v * horizon
+
+
+FILTERS = {
+    "exponential": ExponentialFilter,
+    "one_euro": OneEuroFilter,
+    "kalman": KalmanFilter,
+}
+
+
+def create_filter(kind="one_euro", **params):
+    try:
+        return FILTERS[kind](**params)
+    except KeyError:
+        raise ValueError(f"Unknown cursor filter '{kind}', expected one of {sorted(FILTERS)}")
+
+
+class CursorFilterBank:
+    """
+    One filter per tracked hand, each smoothing a (n_landmarks, 2) array.
+
+    `prediction` extrapolates the filtered positions forward by that many
+    seconds; pass prediction="latency" to use each frame's measured
+    capture-to-now delay instead, compensating pipeline lag.
+    """
+
+    def __init__(self, kind="one_euro", landmark_ids=(4, 8), prediction=0.0, **params):
+        self.kind = kind
+        self.landmark_ids = list(landmark_ids)
+        self.prediction = prediction
+        self.params = params
+        self.filters = {}
+
+    def filter(self, hand_id, points, t, now=None):
+        """Filter the configured landmarks of one hand; returns {landmark_id: (x, y)}."""
+        if hand_id not in self.filters:
+            self.filters[hand_id] = create_filter(self.kind, **self.params)
+
+        if self.prediction == "latency":
+            horizon = max(0.0, (now or t) - t)
+        else:
+            horizon = self.prediction
+
+        selected = np.asarray(points)[self.landmark_ids, :2]
+        smoothed = self.filters[hand_id].filter(selected, t, horizon)
+        return {lm_id: (smoothed[i, 0], smoothed[i, 1]) for i, lm_id in enumerate(self.landmark_ids)}
+
+    def prune(self, active_ids):
+        """Forget hands that are no longer tracked so they restart cleanly."""
+        for hand_id in list(self.filters):
+            if hand_id not in active_ids:
+                del self.filters[hand_id]
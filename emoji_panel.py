@@ -1,6 +1,8 @@
 import cv2
 import numpy as np
-import pyperclip
+from hit_test import HitTestIndex
+from layout_engine import compile_grid, frame_scale, load_spec, scale_box
+from text_renderer import GlyphCache
 
 class EmojiButton:
     def __init__(self, pos, emoji, size=[60, 60]):
@@ -9,116 +11,82 @@ class EmojiButton:
         self.emoji = emoji
 
 class EmojiPanel:
-    def __init__(self):
-        # Common emojis
-        self.emojis = [
-            "😀", "😂", "🤣", "😊", "😍",
-            "🥰", "😎", "🤔", "😮", "😢",
-            "😭", "😡", "👍", "👎", "👏",
-            "🙏", "💪", "✌️", "🤝", "❤️",
-            "🔥", "✨", "⭐", "💯", "✅",
-            "❌", "⚠️", "🎉", "🎊", "🎈"
-        ]
-        
-        # Special characters
-        self.special_chars = [
-            "@", "#", "$", "%", "^",
-            "&", "*", "(", ")", "-",
-            "_", "=", "+", "[", "]",
-            "{", "}", "|", "\\", ":",
-            ";", "'", '"', "<", ">",
-            ",", ".", "?", "/", "~"
-        ]
-        
-        self.button_list = []
-        self.special_button_list = []
-        self.create_buttons()
-        
-        self.show_emojis = True  # Toggle between emoji/special chars
-        
-    def create_buttons(self):
-        # Create emoji buttons (6x5 grid)
-        for i in range(5):
-            for j in range(6):
-                idx = i * 6 + j
-                if idx < len(self.emojis):
-                    self.button_list.append(
-                        EmojiButton([100 + j * 70, 100 + i * 70], self.emojis[idx])
-                    )
-        
-        # Create special char buttons (6x5 grid)
-        for i in range(5):
-            for j in range(6):
-                idx = i * 6 + j
-                if idx < len(self.special_chars):
-                    self.special_button_list.append(
-                        EmojiButton([100 + j * 70, 100 + i * 70], self.special_chars[idx])
-                    )
-    
-    def draw_panel(self, img, hovered_button=None, clicked_button=None):
-        # Background
-        overlay = img.copy()
-        cv2.rectangle(overlay, (50, 50), (550, 450), (0, 0, 0), cv2.FILLED)
+    def __init__(self, frame_size=(1280, 720), layout="emoji"):
+        # Pages of emoji / special characters and their grid come from data/layouts/emoji.json
+        spec = load_spec(layout)
+        scale = frame_scale(spec, frame_size)
+        self.scale = min(scale)
+        self.panel = scale_box(spec["panel"], scale)
+        self.switch_button = scale_box(spec["switch_button"], scale)
+
+        # (title, buttons, hit index) per page, all compiled up front
+        self.pages = []
+        for page in spec["pages"]:
+            rects = compile_grid(spec, page["keys"], frame_size)
+            buttons = [EmojiButton([int(x), int(y)], key, [int(w), int(h)]) for (x, y, w, h), key in zip(rects, page["keys"])]
+            self.pages.append((page["name"], buttons, HitTestIndex(buttons)))
+
+        self.page = 0  # Cycled by the SWITCH button
+        self.button_list = self.pages[0][1]
+
+        # Emoji need a real font, so labels come from a glyph atlas instead of cv2.putText
+        self.glyphs = GlyphCache(height=int(40 * self.scale))
+
+    def draw_panel(self, img, hovered_buttons=(), clicked_buttons=()):
+        # Background: darken the panel area in place
+        x0, y0, x1, y1 = self.panel
+        roi = img[max(y0, 0):y1 + 1, max(x0, 0):x1 + 1]
         alpha = 0.85
-        img = cv2.addWeighted(overlay, alpha, img, 1 - alpha, 0)
+        cv2.convertScaleAbs(roi, dst=roi, alpha=1 - alpha)
         
         # Title
-        title = "EMOJIS" if self.show_emojis else "SPECIAL"
-        cv2.putText(img, title, (220, 80), cv2.FONT_HERSHEY_PLAIN, 2, (255, 255, 0), 2)
+        title, buttons, _ = self.pages[self.page]
+        s = self.scale
+        cv2.putText(img, title, (int(220 * s), int(80 * s)), cv2.FONT_HERSHEY_PLAIN, 2 * s, (255, 255, 0), max(1, int(2 * s)))
         
         # Toggle button
-        cv2.rectangle(img, (450, 55), (540, 85), (100, 100, 100), cv2.FILLED)
-        cv2.putText(img, "SWITCH", (455, 75), cv2.FONT_HERSHEY_PLAIN, 1.5, (255, 255, 255), 1)
+        bx0, by0, bx1, by1 = self.switch_button
+        cv2.rectangle(img, (bx0, by0), (bx1, by1), (100, 100, 100), cv2.FILLED)
+        cv2.putText(img, "SWITCH", (bx0 + int(5 * s), by1 - int(10 * s)), cv2.FONT_HERSHEY_PLAIN, 1.5 * s, (255, 255, 255), 1)
         
         # Draw buttons
-        buttons = self.button_list if self.show_emojis else self.special_button_list
+        hovered_buttons = list(hovered_buttons)
+        clicked_buttons = list(clicked_buttons)
         
         for button in buttons:
             x, y = button.pos
             w, h = button.size
             
             color = (80, 80, 80)
-            if button == clicked_button:
+            if button in clicked_buttons:
                 color = (0, 255, 0)
-            elif button == hovered_button:
+            elif button in hovered_buttons:
                 color = (150, 0, 150)
             
             cv2.rectangle(img, (x, y), (x + w, y + h), color, cv2.FILLED)
             cv2.rectangle(img, (x, y), (x + w, y + h), (255, 200, 0), 2)
             
-            # Draw emoji/char (using text)
-            cv2.putText(img, button.emoji, (x + 15, y + 40),
-                       cv2.FONT_HERSHEY_PLAIN, 2, (255, 255, 255), 2)
+            # Draw emoji/char, centered in the key
+            cell = self.glyphs.get(button.emoji)
+            self.glyphs.blit(img, cell, x + (w - int(self.glyphs.widths[cell])) // 2, y + (h - self.glyphs.height) // 2)
         
         return img
     
     def check_click(self, x, y):
-        """Check if position clicks a button. Returns emoji/char or None."""
+        """Check if position clicks a button. Returns emoji/char or None (caller copies it)."""
         # Check toggle button
-        if 450 < x < 540 and 55 < y < 85:
-            self.show_emojis = not self.show_emojis
+        bx0, by0, bx1, by1 = self.switch_button
+        if bx0 < x < bx1 and by0 < y < by1:
+            self.page = (self.page + 1) % len(self.pages)
+            self.button_list = self.pages[self.page][1]
             return None
         
-        buttons = self.button_list if self.show_emojis else self.special_button_list
-        
-        for button in buttons:
-            bx, by = button.pos
-            bw, bh = button.size
-            if bx < x < bx + bw and by < y < by + bh:
-                # Copy to clipboard
-                pyperclip.copy(button.emoji)
-                return button.emoji
+        button = self.get_hovered_button(x, y)
+        if button:
+            return button.emoji
         
         return None
     
     def get_hovered_button(self, x, y):
         """Get button under cursor."""
-        buttons = self.button_list if self.show_emojis else self.special_button_list
-        
-        for button in buttons:
-            bx, by = button.pos
-            bw, bh = button.size
-            if bx < x < bx + bw and by < y < by + bh:
-                return button
-        
-        return None
+        return self.pages[self.page][2].hovered(x, y)
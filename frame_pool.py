@@ -0,0 +1,74 @@
+import collections
+import threading
+
+import numpy as np
+
+
+class FramePool:
+    """
+    Recycled full-size frame buffers.
+
+    Capture takes a buffer per frame and whoever finishes with the frame
+    (the render loop, or a queue dropping it) gives it back, so in steady
+    state no frame-sized array is allocated. `allocations` counts buffers
+    that had to be created; it stops growing once the pool is warm.
+    """
+
+    def __init__(self, size=6):
+        self.size = size
+        self.free = collections.deque()
+        self.shape = None
+        self.lock = threading.Lock()
+        self.allocations = 0
+        self.reuses = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+
+    def acquire(self, shape, dtype=np.uint8):
+        with self.lock:
+            if shape != self.shape:
+                # Resolution changed: old buffers are no longer useful
+                self.shape = shape
+                self.free.clear()
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+            if self.free:
+                self.reuses += 1
+                return self.free.pop()
+            self.allocations += 1
+        return np.empty(shape, dtype)
+
+    def release(self, buf):
+        with self.lock:
+            self.in_use -= 1
+            if buf.shape == self.shape and len(self.free) < self.size:
+                self.free.append(buf)
+
+    def stats(self):
+        with self.lock:
+            return {"allocations": self.allocations, "reuses": self.reuses,
+                    "in_use": self.in_use, "peak_in_use": self.peak_in_use}
+
+
+class ScratchBuffers:
+    """
+    Named work buffers (resized/RGB copies) that are reused across frames.
+
+    Each name owns one flat backing array; get() returns a contiguous view of
+    the requested shape and only reallocates when a larger size is needed,
+    so varying crop sizes do not allocate once the largest has been seen.
+    """
+
+    def __init__(self):
+        self.backing = {}
+        self.allocations = 0
+
+    def get(self, name, shape, dtype=np.uint8):
+        dtype = np.dtype(dtype)
+        n = int(np.prod(shape))
+        buf = self.backing.get(name)
+        if buf is None or buf.dtype != dtype or buf.size < n:
+            buf = np.empty(n, dtype)
+            self.backing[name] = buf
+            self.allocations += 1
+        return buf[:n].reshape(shape)
@@ -0,0 +1,170 @@
+import numpy as np
+
+# Landmark indices per finger (thumb, index, middle, ring, pinky)
+FINGER_TIPS = [4, 8, 12, 16, 20]
+FINGER_PIPS = [3, 6, 10, 14, 18]
+WRIST = 0
+MIDDLE_MCP = 9
+PINKY_MCP = 17
+FINGER_NAMES = ["thumb", "index", "middle", "ring", "pinky"]
+
+# Gesture configuration. Distances are normalized by hand size (wrist to
+# middle-finger MCP), times are in seconds. Each gesture is a finger pattern
+# (1 = extended, 0 = curled, None = don't care) plus how long it must be held
+# before it fires; held gestures re-arm after firing.
+DEFAULT_CONFIG = {
+    "pinch": {
+        "on": 0.25,        # pinch closes below this thumb-index distance
+        "off": 0.35,       # ...and only reopens above this one (hysteresis)
+        "debounce": 0.2,   # minimum time between two pinch clicks
+    },
+    "extension_margin": 0.1,  # tip must be this much farther from the wrist than the PIP joint
+    "gestures": {
+        "open_palm": {"fingers": [None, 1, 1, 1, 1], "hold": 2.0},
+        "fist": {"fingers": [0, 0, 0, 0, 0], "hold": 0.5},
+        "point": {"fingers": [None, 1, 0, 0, 0], "hold": 0.0},
+        "victory": {"fingers": [None, 1, 1, 0, 0], "hold": 1.0},  # cycles keyboard layouts
+    },
+}
+
+
+class GestureFrame:
+    """Batched gesture results for every hand in one frame (first `count` rows are valid)."""
+
+    def __init__(self, engine, count):
+        self.engine = engine
+        self.count = count
+        self.extended = engine.extended[:count]
+        self.pinch_distance = engine.pinch_distance[:count]
+        self.pinched = engine.pinched[:count]
+        self.clicked = engine.clicked[:count]
+        self.released = engine.released[:count]
+        self.matched = engine.matched[:count]
+        self.progress = engine.progress[:count]
+        self.triggered = engine.triggered[:count]
+
+    def gesture_index(self, name):
+        return self.engine.gesture_names.index(name)
+
+    def is_triggered(self, hand, name):
+        return hand < self.count and bool(self.triggered[hand, self.gesture_index(name)])
+
+    def hold_progress(self, hand, name):
+        """0..1 while `name` is being held on `hand`, None when it isn't."""
+        if hand >= self.count:
+            return None
+        g = self.gesture_index(name)
+        if not self.matched[hand, g]:
+            return None
+        return float(self.progress[hand, g])
+
+
+class GestureEngine:
+    """
+    Finger states, pinch detection and pattern gestures for all hands in one
+    NumPy pass per frame. Thresholds, hysteresis, debouncing and the gesture
+    set itself come from `config`, so adding a gesture is a config entry.
+
+    Outputs are per landmark row; state carried between frames is kept per
+    identity slot (`landmarks.ids`), so it follows a hand when rows reorder.
+    """
+
+    def __init__(self, max_hands=2, config=None):
+        self.config = config or DEFAULT_CONFIG
+        self.max_hands = max_hands
+
+        pinch = self.config["pinch"]
+        self.pinch_on = pinch["on"]
+        self.pinch_off = pinch["off"]
+        self.debounce = pinch["debounce"]
+        self.extension_margin = self.config["extension_margin"]
+
+        # Gesture table: pattern (G, 5), care mask (G, 5), hold times (G,)
+        gestures = self.config["gestures"]
+        self.gesture_names = list(gestures)
+        patterns = [g["fingers"] for g in gestures.values()]
+        self.pattern = np.array([[bool(v) for v in p] for p in patterns], bool)
+        self.care = np.array([[v is not None for v in p] for p in patterns], bool)
+        self.hold = np.array([g.get("hold", 0.0) for g in gestures.values()], np.float64)
+
+        n, g = max_hands, len(self.gesture_names)
+        # Per-frame outputs, one row per landmark row
+        self.extended = np.zeros((n, 5), bool)
+        self.pinch_distance = np.zeros(n, np.float32)
+        self.pinched = np.zeros(n, bool)
+        self.clicked = np.zeros(n, bool)
+        self.released = np.zeros(n, bool)
+        self.matched = np.zeros((n, g), bool)
+        self.progress = np.zeros((n, g), np.float64)
+        self.triggered = np.zeros((n, g), bool)
+        # State carried between frames, one row per identity slot
+        self.pinch_state = np.zeros(n, bool)
+        self.last_click = np.full(n, -np.inf)
+        self.match_since = np.full((n, g), np.nan)
+
+    def reset(self, hands=None):
+        """Clear carried state for the given identity slots (all when None)."""
+        hands = slice(None) if hands is None else hands
+        self.pinch_state[hands] = False
+        self.last_click[hands] = -np.inf
+        self.match_since[hands] = np.nan
+
+    def update(self, landmarks, now):
+        n = min(landmarks.count, self.max_hands)
+        slots = landmarks.ids[:n]
+        # Held gestures must be held continuously; pinch state survives short
+        # dropouts and is cleared by the owner through reset()
+        absent = np.ones(self.max_hands, bool)
+        absent[slots] = False
+        self.match_since[absent] = np.nan
+        self.clicked[:] = False
+        self.released[:] = False
+        self.triggered[:] = False
+        self.pinched[:] = False
+        if n == 0:
+            self.matched[:] = False
+            return GestureFrame(self, 0)
+
+        pts = landmarks.pixels[:n, :, :2]
+        wrist = pts[:, WRIST]
+        hand_size = np.linalg.norm(pts[:, MIDDLE_MCP] - wrist, axis=1)
+        hand_size = np.maximum(hand_size, 1e-6)
+
+        # Finger extension: tip farther from the palm anchor than its PIP joint.
+        # The thumb is measured from the pinky MCP so it reads as curled when tucked.
+        anchors = np.repeat(wrist[:, None, :], 5, axis=1)
+        anchors[:, 0] = pts[:, PINKY_MCP]
+        tip_dist = np.linalg.norm(pts[:, FINGER_TIPS] - anchors, axis=2)
+        pip_dist = np.linalg.norm(pts[:, FINGER_PIPS] - anchors, axis=2)
+        self.extended[:n] = tip_dist > pip_dist * (1 + self.extension_margin)
+
+        # Pinch with hysteresis and debounced click onset
+        dist = np.linalg.norm(pts[:, 4] - pts[:, 8], axis=1) / hand_size
+        self.pinch_distance[:n] = dist
+        was_pinched = self.pinch_state[slots]
+        pinched = np.where(was_pinched, dist < self.pinch_off, dist < self.pinch_on)
+        onset = pinched & ~was_pinched
+        last_click = self.last_click[slots]
+        click = onset & (now - last_click > self.debounce)
+        self.clicked[:n] = click
+        self.released[:n] = was_pinched & ~pinched
+        self.last_click[slots] = np.where(click, now, last_click)
+        self.pinch_state[slots] = pinched
+        self.pinched[:n] = pinched
+
+        # Pattern gestures, held for their configured time before firing
+        ext = self.extended[:n, None, :]
+        matched = ((ext == self.pattern) | ~self.care).all(axis=2)
+        match_since = self.match_since[slots]
+        since = np.where(matched, np.where(np.isnan(match_since), now, match_since), np.nan)
+        held = np.where(matched, now - since, 0.0)
+        fired = matched & (held >= self.hold)
+        self.matched[:n] = matched
+        self.matched[n:] = False
+        self.triggered[:n] = fired
+        hold = np.where(self.hold > 0, self.hold, 1.0)
+        self.progress[:n] = np.where(matched, np.minimum(held / hold, 1.0), 0.0)
+        # Re-arm fired gestures so holding again requires a full hold time
+        self.match_since[slots] = np.where(fired, now, since)
+
+        return GestureFrame(self, n)
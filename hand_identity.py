@@ -0,0 +1,75 @@
+import numpy as np
+
+# Palm center: wrist, index MCP and pinky MCP barely move while typing
+PALM = [0, 5, 17]
+
+
+class HandIdentityTracker:
+    """
+    Gives each detected hand a stable identity slot across frames.
+
+    MediaPipe reports hands in arbitrary order, so row 0 can be the left hand
+    in one frame and the right hand in the next. Each frame, hands are matched
+    to the slots seen last by palm-center distance (normalized coordinates),
+    with a penalty when the reported handedness disagrees. Slots survive brief
+    detection dropouts for `keep_alive` seconds.
+    """
+
+    def __init__(self, max_hands=2, max_distance=0.25, handedness_penalty=0.15, keep_alive=0.3):
+        self.max_hands = max_hands
+        self.max_distance = max_distance
+        self.handedness_penalty = handedness_penalty
+        self.keep_alive = keep_alive
+
+        self.active = np.zeros(max_hands, bool)
+        self.centers = np.zeros((max_hands, 2), np.float32)
+        self.handedness = np.full(max_hands, -1, np.int8)
+        self.last_seen = np.full(max_hands, -np.inf)
+
+    def active_ids(self):
+        return np.flatnonzero(self.active).tolist()
+
+    def assign(self, landmarks, now):
+        """
+        Write each hand's slot into landmarks.ids; returns the slots whose
+        per-hand state must be reset (expired, or taken over by a new hand).
+        """
+        n = min(landmarks.count, self.max_hands)
+        ids = np.full(n, -1, np.int32)
+        reset = []
+
+        if n:
+            centers = landmarks.normalized[:n][:, PALM, :2].mean(axis=1)
+            hands = landmarks.handedness[:n]
+
+            cost = np.linalg.norm(centers[:, None] - self.centers[None], axis=2)
+            mismatch = (hands[:, None] >= 0) & (self.handedness[None] >= 0) & (hands[:, None] != self.handedness[None])
+            cost += mismatch * self.handedness_penalty
+            cost[:, ~self.active] = np.inf
+            cost[cost > self.max_distance] = np.inf
+
+            # Greedy matching, cheapest pairs first (n is tiny)
+            for flat in np.argsort(cost, axis=None):
+                i, slot = divmod(int(flat), self.max_hands)
+                if not np.isfinite(cost[i, slot]):
+                    break
+                if ids[i] < 0 and slot not in ids:
+                    ids[i] = slot
+
+            # New hands take a free slot, preferring ones nobody is waiting on
+            free = sorted((s for s in range(self.max_hands) if s not in ids), key=lambda s: self.active[s])
+            for i in np.flatnonzero(ids < 0):
+                ids[i] = free.pop(0)
+                reset.append(int(ids[i]))
+
+            self.centers[ids] = centers
+            self.handedness[ids] = hands
+            self.last_seen[ids] = now
+            self.active[ids] = True
+
+        expired = self.active & (now - self.last_seen > self.keep_alive)
+        self.active &= ~expired
+        reset.extend(np.flatnonzero(expired).tolist())
+
+        landmarks.ids[:n] = ids
+        return reset
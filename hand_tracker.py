@@ -1,25 +1,159 @@
+import threading
+import time
+
 import cv2
-import mediapipe as mp
+import numpy as np
+from frame_pool import ScratchBuffers
+from profiler import NULL_PROFILER
+
+NUM_LANDMARKS = 21
+
+class HandLandmarks:
+    """Landmarks for every detected hand in a frame, as fixed-size float32 arrays."""
+
+    def __init__(self, max_hands):
+        self.normalized = np.zeros((max_hands, NUM_LANDMARKS, 3), np.float32)
+        self.pixels = np.zeros((max_hands, NUM_LANDMARKS, 3), np.float32)
+        self.handedness = np.full(max_hands, -1, np.int8)  # 0 = Left, 1 = Right, -1 = unknown
+        self.scores = np.zeros(max_hands, np.float32)
+        # Stable identity slot per row, filled in by hand_identity.HandIdentityTracker
+        self.ids = np.arange(max_hands, dtype=np.int32)
+        self.count = 0
+
+    def copy(self):
+        other = HandLandmarks.__new__(HandLandmarks)
+        other.normalized = self.normalized.copy()
+        other.pixels = self.pixels.copy()
+        other.handedness = self.handedness.copy()
+        other.scores = self.scores.copy()
+        other.ids = self.ids.copy()
+        other.count = self.count
+        return other
 
 class HandTracker:
-    def __init__(self, mode=False, max_hands=2, detection_confidence=0.5, track_confidence=0.5):
+    def __init__(self, mode=False, max_hands=2, detection_confidence=0.5, track_confidence=0.5,
+                 roi_tracking=False, roi_padding=0.3, redetect_interval=30, redetect_scale=0.5,
+                 model_complexity=1, input_scale=1.0, profiler=None, recorder=None):
         self.mode = mode
         self.max_hands = max_hands
+        self.model_complexity = model_complexity
+        # Frames (or ROI crops) are downscaled by this factor before inference
+        self.input_scale = input_scale
+        # Settings requested from other threads (quality controller, idle mode),
+        # merged until the next find_hands applies them
+        self.pending_settings = {}
+        self.settings_lock = threading.Lock()
         self.detection_confidence = detection_confidence
         self.track_confidence = track_confidence
+        self.profiler = profiler or NULL_PROFILER
+        # Optional trace_store.TraceStoreWriter: every frame's landmarks are appended to it
+        self.recorder = recorder
+        # Reused resize/RGB buffers, so inference input does not allocate per frame
+        self.scratch = ScratchBuffers()
+
+        # Region-of-interest tracking: once every hand (up to max_hands) is found,
+        # only a padded crop around the previous landmarks is fed to MediaPipe,
+        # through a separate graph that only ever sees crops: its tracking state
+        # stays in crop coordinates (the box holds still while the hand is well
+        # inside it), so like the full-frame graph it skips palm detection while
+        # it keeps the hand and runs only the landmark model. A downscaled
+        # full-frame pass re-detects every `redetect_interval` frames, on loss,
+        # or while fewer than max_hands hands are found.
+        self.roi_tracking = roi_tracking
+        self.roi_padding = roi_padding
+        self.redetect_interval = redetect_interval
+        self.redetect_scale = redetect_scale
+        self.roi_min_size = 160
+        self.roi_box = None  # (x0, y0, x1, y1) in full-frame pixels
+        self.frames_since_detect = 0
 
+        # Imported here rather than at module level: it takes about a second, and
+        # HandLandmarks users (replay, traces, the multi-process parent) never need it
+        import mediapipe as mp
         self.mp_hands = mp.solutions.hands
-        self.hands = self.mp_hands.Hands(
+        self.hands = self.create_hands()
+        self.roi_hands = self.create_hands() if roi_tracking else None
+        self.mp_draw = mp.solutions.drawing_utils
+        self.results = None
+
+        # Preallocated once, refilled by every find_hands call; sized for the
+        # initial max_hands, which later quality changes never exceed
+        self.landmarks = HandLandmarks(self.max_hands)
+
+    def create_hands(self):
+        return self.mp_hands.Hands(
             static_image_mode=self.mode,
             max_num_hands=self.max_hands,
+            model_complexity=self.model_complexity,
             min_detection_confidence=self.detection_confidence,
             min_tracking_confidence=self.track_confidence
         )
-        self.mp_draw = mp.solutions.drawing_utils
 
-    def find_hands(self, img, draw=True):
-        img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        self.results = self.hands.process(img_rgb)
+    def warm_up(self, frame_size=(1280, 720)):
+        """Run one unrecorded inference on a blank frame, so graph setup is not paid on the first camera frame."""
+        w, h = frame_size
+        recorder, self.recorder = self.recorder, None
+        self.find_hands(np.zeros((h, w, 3), np.uint8), draw=False)
+        if self.roi_hands is not None:
+            # No hand in a blank frame, so the crop graph would not have run yet
+            self.roi_hands.process(np.zeros((self.roi_min_size, self.roi_min_size, 3), np.uint8))
+        self.recorder = recorder
+        self.roi_box = None
+        self.frames_since_detect = 0
+
+    def request_settings(self, **settings):
+        """Thread-safe: queue input_scale / model_complexity / max_hands changes for the next frame."""
+        with self.settings_lock:
+            self.pending_settings.update(settings)
+
+    def apply_settings(self, input_scale=None, model_complexity=None, max_hands=None):
+        if input_scale is not None:
+            self.input_scale = input_scale
+
+        max_hands = None if max_hands is None else min(max_hands, len(self.landmarks.scores))
+        rebuild = ((model_complexity is not None and model_complexity != self.model_complexity) or
+                   (max_hands is not None and max_hands != self.max_hands))
+        if rebuild:
+            if model_complexity is not None:
+                self.model_complexity = model_complexity
+            if max_hands is not None:
+                self.max_hands = max_hands
+            self.hands.close()
+            self.hands = self.create_hands()
+            if self.roi_hands is not None:
+                self.roi_hands.close()
+                self.roi_hands = self.create_hands()
+            self.roi_box = None
+
+    def to_rgb(self, img, scale=1.0):
+        """Downscale (if scale < 1) and convert to RGB for MediaPipe, into reused buffers."""
+        with self.profiler.measure("cvtColor"):
+            if scale < 1.0:
+                h, w = img.shape[:2]
+                size = (max(1, int(round(w * scale))), max(1, int(round(h * scale))))
+                small = self.scratch.get("resized", (size[1], size[0], 3))
+                img = cv2.resize(img, size, dst=small, interpolation=cv2.INTER_AREA)
+            rgb = self.scratch.get("rgb", img.shape)
+            return cv2.cvtColor(img, cv2.COLOR_BGR2RGB, dst=rgb)
+
+    def find_hands(self, img, draw=True, timestamp=None):
+        """Detect hands in a BGR frame; `timestamp` (default: now) is the frame time given to the recorder."""
+        with self.settings_lock:
+            settings, self.pending_settings = self.pending_settings, {}
+        if settings:
+            self.apply_settings(**settings)
+
+        if self.roi_tracking:
+            self.results = self.process_tracked(img)
+        else:
+            # Normalized landmarks are scale-invariant, so no remapping is needed
+            img_rgb = self.to_rgb(img, self.input_scale)
+            with self.profiler.measure("hands.process"):
+                self.results = self.hands.process(img_rgb)
+
+        self.fill_landmarks(img.shape)
+        if self.recorder is not None:
+            self.recorder.append(self.landmarks, time.time() if timestamp is None else timestamp)
 
         if self.results.multi_hand_landmarks:
             for hand_lms in self.results.multi_hand_landmarks:
@@ -27,17 +161,112 @@ class HandTracker:
                     self.mp_draw.draw_landmarks(img, hand_lms, self.mp_hands.HAND_CONNECTIONS)
         return img
 
+    def fill_landmarks(self, shape):
+        """Copy this frame's landmarks, handedness and scores into self.landmarks."""
+        h, w = shape[:2]
+        out = self.landmarks
+        out.count = 0
+        if not self.results.multi_hand_landmarks:
+            return out
+
+        handedness = self.results.multi_handedness or []
+        for i, hand_lms in enumerate(self.results.multi_hand_landmarks[:len(out.scores)]):
+            out.normalized[i] = [(lm.x, lm.y, lm.z) for lm in hand_lms.landmark]
+            if i < len(handedness):
+                cls = handedness[i].classification[0]
+                out.handedness[i] = 1 if cls.label == "Right" else 0
+                out.scores[i] = cls.score
+            else:
+                out.handedness[i] = -1
+                out.scores[i] = 0
+            out.count = i + 1
+
+        n = out.count
+        np.multiply(out.normalized[:n], np.array([w, h, w], np.float32), out=out.pixels[:n])
+        return out
+
+    def process_tracked(self, img):
+        """Run MediaPipe on the tracked ROI; landmarks are returned normalized to the full frame."""
+        h, w, c = img.shape
+
+        if self.roi_box is not None and self.frames_since_detect < self.redetect_interval:
+            x0, y0, x1, y1 = self.roi_box
+            crop_rgb = self.to_rgb(img[y0:y1, x0:x1], self.input_scale)
+            with self.profiler.measure("hands.process"):
+                results = self.roi_hands.process(crop_rgb)
+
+            # A hand missing from the crop may have left it or never been in it
+            if results.multi_hand_landmarks and len(results.multi_hand_landmarks) >= self.max_hands:
+                self.map_to_frame(results, x0, y0, x1 - x0, y1 - y0, w, h)
+                self.frames_since_detect += 1
+                self.update_roi(results, w, h)
+                return results
+
+        # Initial detection, periodic re-detection, hand lost in the ROI or fewer
+        # than max_hands hands. Normalized landmarks are scale-invariant, so no
+        # remapping is needed.
+        small_rgb = self.to_rgb(img, self.redetect_scale * self.input_scale)
+        with self.profiler.measure("hands.process"):
+            results = self.hands.process(small_rgb)
+        self.frames_since_detect = 0
+        self.roi_box = None
+        # Crops only once every hand is found; until then each frame is a full-frame pass
+        if len(results.multi_hand_landmarks or ()) >= self.max_hands:
+            self.update_roi(results, w, h)
+        return results
+
+    def map_to_frame(self, results, x0, y0, crop_w, crop_h, w, h):
+        """Convert landmarks normalized to a crop into landmarks normalized to the frame."""
+        sx, sy = crop_w / w, crop_h / h
+        ox, oy = x0 / w, y0 / h
+        for hand_lms in results.multi_hand_landmarks:
+            for lm in hand_lms.landmark:
+                lm.x = lm.x * sx + ox
+                lm.y = lm.y * sy + oy
+                lm.z = lm.z * sx
+
+    def update_roi(self, results, w, h):
+        if not results.multi_hand_landmarks:
+            self.roi_box = None
+            return
+
+        xs = [lm.x for hand_lms in results.multi_hand_landmarks for lm in hand_lms.landmark]
+        ys = [lm.y for hand_lms in results.multi_hand_landmarks for lm in hand_lms.landmark]
+        bx0, bx1 = min(xs) * w, max(xs) * w
+        by0, by1 = min(ys) * h, max(ys) * h
+
+        # Keep the current box while the hand stays well inside it; a stable crop
+        # also keeps MediaPipe's own frame-to-frame tracking consistent.
+        if self.roi_box is not None:
+            x0, y0, x1, y1 = self.roi_box
+            margin = 0.25 * self.roi_padding * min(x1 - x0, y1 - y0)
+            if bx0 > x0 + margin and by0 > y0 + margin and bx1 < x1 - margin and by1 < y1 - margin:
+                return
+
+        pad = max(bx1 - bx0, by1 - by0) * self.roi_padding
+        cx, cy = (bx0 + bx1) / 2, (by0 + by1) / 2
+        half_w = max((bx1 - bx0) / 2 + pad, self.roi_min_size / 2)
+        half_h = max((by1 - by0) / 2 + pad, self.roi_min_size / 2)
+
+        x0 = max(0, int(cx - half_w))
+        y0 = max(0, int(cy - half_h))
+        x1 = min(w, int(cx + half_w))
+        y1 = min(h, int(cy + half_h))
+        if x1 - x0 < 2 or y1 - y0 < 2:
+            self.roi_box = None
+            return
+        self.roi_box = (x0, y0, x1, y1)
+
     def find_position(self, img, hand_no=0, draw=True):
         lm_list = []
-        if self.results.multi_hand_landmarks:
-            try:
-                my_hand = self.results.multi_hand_landmarks[hand_no]
-                for id, lm in enumerate(my_hand.landmark):
-                    h, w, c = img.shape
-                    cx, cy = int(lm.x * w), int(lm.y * h)
-                    lm_list.append([id, cx, cy])
-                    if draw:
-                        cv2.circle(img, (cx, cy), 5, (255, 0, 255), cv2.FILLED)
-            except IndexError:
-                pass
+        if hand_no < self.landmarks.count:
+            h, w, c = img.shape
+            # float64 keeps the truncation identical to int(lm.x * w)
+            norm = self.landmarks.normalized[hand_no].astype(np.float64)
+            xs = (norm[:, 0] * w).astype(np.int64).tolist()
+            ys = (norm[:, 1] * h).astype(np.int64).tolist()
+            for id in range(NUM_LANDMARKS):
+                lm_list.append([id, xs[id], ys[id]])
+                if draw:
+                    cv2.circle(img, (xs[id], ys[id]), 5, (255, 0, 255), cv2.FILLED)
         return lm_list
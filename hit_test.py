@@ -0,0 +1,81 @@
+import math
+
+
+class HitTestIndex:
+    """
+    Uniform grid over a set of buttons (anything with .pos and .size).
+
+    Each cell stores the few buttons whose rectangle, grown by the magnet
+    radius, overlaps it, so hover and nearest-key queries only look at a
+    bounded handful of candidates no matter how many keys the layout has.
+    """
+
+    def __init__(self, buttons, cell_size=20, magnet_radius=60):
+        self.buttons = list(buttons)
+        self.cell_size = cell_size
+        self.magnet_radius = magnet_radius
+        self.centers = [(b.pos[0] + b.size[0] // 2, b.pos[1] + b.size[1] // 2) for b in self.buttons]
+
+        self.cols = 0
+        self.rows = 0
+        self.cells = []
+        if self.buttons:
+            self.build()
+
+    def build(self):
+        r = self.magnet_radius
+        self.x0 = min(b.pos[0] for b in self.buttons) - r
+        self.y0 = min(b.pos[1] for b in self.buttons) - r
+        x1 = max(b.pos[0] + b.size[0] for b in self.buttons) + r
+        y1 = max(b.pos[1] + b.size[1] for b in self.buttons) + r
+
+        self.cols = int((x1 - self.x0) // self.cell_size) + 1
+        self.rows = int((y1 - self.y0) // self.cell_size) + 1
+        cells = [[] for _ in range(self.rows * self.cols)]
+
+        for idx, button in enumerate(self.buttons):
+            bx, by = button.pos
+            bw, bh = button.size
+            c0, r0 = self.cell_of(bx - r, by - r)
+            c1, r1 = self.cell_of(bx + bw + r, by + bh + r)
+            for row in range(max(r0, 0), min(r1, self.rows - 1) + 1):
+                for col in range(max(c0, 0), min(c1, self.cols - 1) + 1):
+                    cells[row * self.cols + col].append(idx)
+
+        # Candidates stay in layout order so ties resolve like a linear scan
+        self.cells = [tuple(c) for c in cells]
+
+    def cell_of(self, x, y):
+        return int((x - self.x0) // self.cell_size), int((y - self.y0) // self.cell_size)
+
+    def candidates(self, x, y):
+        if not self.cells:
+            return ()
+        col, row = self.cell_of(x, y)
+        if col < 0 or row < 0 or col >= self.cols or row >= self.rows:
+            return ()
+        return self.cells[row * self.cols + col]
+
+    def hovered(self, x, y):
+        """Button whose rectangle strictly contains (x, y), or None."""
+        for idx in self.candidates(x, y):
+            button = self.buttons[idx]
+            bx, by = button.pos
+            bw, bh = button.size
+            if bx < x < bx + bw and by < y < by + bh:
+                return button
+        return None
+
+    def nearest(self, x, y, radius=None):
+        """Button whose center is closest to (x, y) and within radius, or None."""
+        if radius is None or radius > self.magnet_radius:
+            radius = self.magnet_radius
+        closest_button = None
+        min_dist = radius
+        for idx in self.candidates(x, y):
+            cx_key, cy_key = self.centers[idx]
+            dist_to_key = math.hypot(x - cx_key, y - cy_key)
+            if dist_to_key < min_dist:
+                min_dist = dist_to_key
+                closest_button = self.buttons[idx]
+        return closest_button
@@ -0,0 +1,87 @@
+import time
+
+STATE_ACTIVE = "active"
+STATE_IDLE = "idle"
+
+
+class IdleController:
+    """
+    Throttles the pipeline while nobody is in front of the camera.
+
+    After `idle_after` seconds without a detected hand the controller goes
+    idle: capture only lets `idle_fps` frames per second through to inference
+    (the rest are grabbed without decoding) and the tracker's input scale
+    drops to `idle_input_scale`. The first processed frame with a hand
+    switches back, so full-rate, full-resolution tracking resumes on the
+    next frame.
+
+    should_process() is called from the capture thread, update() from
+    whichever thread has just run inference. CPU time of this process is
+    accounted to the state it was spent in, for stats().
+    """
+
+    def __init__(self, idle_after=3.0, idle_fps=5.0, idle_input_scale=0.5, cpu_clock=None):
+        self.idle_after = idle_after
+        self.idle_fps = idle_fps
+        self.idle_input_scale = idle_input_scale
+
+        self.state = STATE_ACTIVE
+        self.last_hand = None
+        self.next_sample = {}  # per capture source (camera)
+        self.saved_input_scale = None
+        self.transitions = 0
+        self.skipped_frames = 0
+
+        self.cpu_clock = cpu_clock or time.process_time
+        self.usage = {STATE_ACTIVE: [0.0, 0.0], STATE_IDLE: [0.0, 0.0]}  # [cpu seconds, wall seconds]
+        self.usage_mark = (time.perf_counter(), self.cpu_clock())
+
+    @property
+    def idle(self):
+        return self.state == STATE_IDLE
+
+    def should_process(self, now, source=0):
+        """False for captured frames that idle mode skips; each source is sampled at idle_fps."""
+        if self.state == STATE_ACTIVE:
+            return True
+        if now >= self.next_sample.get(source, 0.0):
+            self.next_sample[source] = now + 1.0 / self.idle_fps
+            return True
+        self.skipped_frames += 1
+        return False
+
+    def update(self, hands_present, now, input_scale=1.0):
+        """Record one processed frame; returns tracker settings to request on a state change, else None."""
+        if hands_present or self.last_hand is None:
+            self.last_hand = now
+
+        if self.state == STATE_IDLE and hands_present:
+            self.set_state(STATE_ACTIVE)
+            return {"input_scale": self.saved_input_scale}
+        if self.state == STATE_ACTIVE and now - self.last_hand >= self.idle_after:
+            self.saved_input_scale = input_scale
+            self.next_sample = {}
+            self.set_state(STATE_IDLE)
+            return {"input_scale": min(input_scale, self.idle_input_scale)}
+        return None
+
+    def set_state(self, state):
+        self.account()
+        self.state = state
+        self.transitions += 1
+
+    def account(self):
+        wall, cpu = time.perf_counter(), self.cpu_clock()
+        usage = self.usage[self.state]
+        usage[0] += cpu - self.usage_mark[1]
+        usage[1] += wall - self.usage_mark[0]
+        self.usage_mark = (wall, cpu)
+
+    def stats(self):
+        """Current state, transitions, skipped frames, and CPU use (% of one core) and seconds per state."""
+        self.account()
+        report = {"state": self.state, "transitions": self.transitions, "skipped_frames": self.skipped_frames}
+        for state, (cpu, wall) in self.usage.items():
+            report[state + "_seconds"] = round(wall, 1)
+            report[state + "_cpu_percent"] = round(100 * cpu / wall, 1) if wall > 0 else 0.0
+        return report
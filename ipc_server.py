@@ -0,0 +1,279 @@
+"""
+Local event stream for other applications (kiosk UIs, accessibility tools...).
+
+Clients connect to a Unix socket, or to a localhost TCP port when the address
+is "host:port", and receive newline-delimited JSON events with timestamps:
+
+    {"type": "key", "t": 1718000000.12, "key": "a"}
+    {"type": "text", "t": ..., "delete": 0, "insert": "o"}
+    {"type": "gesture", "t": ..., "hand": 0, "gesture": "pinch", "x": 640, "y": 360}
+    {"type": "mode", "t": ..., "mode": "KEYBOARD"}
+    {"type": "cursor", "t": ..., "cursors": [{"hand": 0, "x": 640, "y": 360}], "mouse": {"x": 960, "y": 540}}
+
+plus "layout", "click" and "clipboard" events. "text" events are edits to the
+output text, which starts out empty: remove `delete` characters from its end,
+then append `insert`.
+Cursor and mouse positions arrive every frame, so only the latest per hand is
+kept and sent as one "cursor" batch every 1 / cursor_rate seconds. A client
+may send {"subscribe": ["key", "text"]} to receive only those event types,
+and may then shut down its sending side; it keeps receiving events.
+"""
+import asyncio
+import collections
+import errno
+import json
+import os
+import socket
+import threading
+import time
+
+# High-rate event kinds, coalesced into periodic "cursor" batches
+BATCHED = ("cursor", "mouse")
+
+
+class Client:
+    """One subscriber: its own bounded queue, drained by its own writer task."""
+
+    def __init__(self, writer, max_queue):
+        self.writer = writer
+        self.max_queue = max_queue
+        self.queue = collections.deque()
+        self.ready = asyncio.Event()
+        self.types = None  # None: every event type
+        self.closed = False
+        self.dropped = 0
+
+    def push(self, kind, line):
+        """Queue one encoded event; False if the client is too far behind to keep."""
+        if self.types is not None and kind not in self.types:
+            return True
+        if len(self.queue) >= self.max_queue:
+            # Shed a stale cursor batch first; other events are never dropped silently
+            for i, (queued_kind, _) in enumerate(self.queue):
+                if queued_kind == "cursor":
+                    del self.queue[i]
+                    self.dropped += 1
+                    break
+            else:
+                return False
+        self.queue.append((kind, line))
+        self.ready.set()
+        return True
+
+    def close(self, abort=False):
+        self.closed = True
+        self.ready.set()
+        if abort:
+            # Also wakes a writer stuck waiting for this client to drain
+            self.writer.transport.abort()
+
+
+class IpcServer:
+    """
+    asyncio server on its own thread; publish() may be called from any thread.
+
+    Each client has a queue of at most `max_queue` events and a writer that
+    sends everything queued in one write, then waits for the socket to drain,
+    so a slow consumer only delays itself. A client whose queue is full of
+    events that cannot be dropped is disconnected.
+    """
+
+    def __init__(self, address, max_queue=1024, cursor_rate=30.0):
+        self.address = address
+        self.max_queue = max_queue
+        self.cursor_interval = 1.0 / cursor_rate
+        host, sep, port = address.rpartition(":")
+        self.tcp = bool(sep) and port.isdigit()
+        self.host, self.port = (host or "127.0.0.1", int(port)) if self.tcp else (None, None)
+
+        self.loop = None
+        self.clients = set()
+        self.started = threading.Event()
+        self.error = None  # exception raised while binding, re-raised by start()
+        self.thread = None
+        self.stop_event = None
+
+        self.lock = threading.Lock()
+        self.latest = {}  # (kind, hand) -> event, for batched kinds
+
+        self.published = 0
+        self.coalesced = 0
+        self.disconnected = 0
+
+    # Lifecycle
+
+    def start(self, timeout=5.0):
+        """Run the server thread; raises if the address cannot be bound."""
+        self.thread = threading.Thread(target=lambda: asyncio.run(self.serve()), daemon=True)
+        self.thread.start()
+        if not self.started.wait(timeout):
+            raise TimeoutError(f"Event server did not start within {timeout} s")
+        if self.error is not None:
+            raise self.error
+        where = f"{self.host}:{self.port}" if self.tcp else self.address
+        print(f"Event server listening on {where}")
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        self.stop_event = asyncio.Event()
+        try:
+            if self.tcp:
+                server = await asyncio.start_server(self.handle, self.host, self.port)
+            else:
+                self.remove_stale_socket()
+                server = await asyncio.start_unix_server(self.handle, self.address)
+        except Exception as error:
+            self.error = error
+            self.started.set()
+            return
+        self.started.set()
+
+        flusher = asyncio.create_task(self.flush_batches())
+        async with server:
+            await self.stop_event.wait()
+        flusher.cancel()
+        for client in list(self.clients):
+            client.close(abort=True)
+        if not self.tcp and os.path.exists(self.address):
+            os.unlink(self.address)
+
+    def remove_stale_socket(self):
+        """Unlink a socket file left by an earlier run; fail if a server is still listening on it."""
+        if not os.path.exists(self.address):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.address)
+        except ConnectionRefusedError:
+            os.unlink(self.address)
+            return
+        finally:
+            probe.close()
+        raise OSError(errno.EADDRINUSE, f"Another event server is listening on {self.address}")
+
+    def stop(self, timeout=1.0):
+        loop = self.loop
+        if loop is not None and not loop.is_closed() and self.stop_event is not None:
+            try:
+                loop.call_soon_threadsafe(self.stop_event.set)
+            except RuntimeError:
+                pass  # the loop closed in the meantime
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    # Clients
+
+    async def handle(self, reader, writer):
+        client = Client(writer, self.max_queue)
+        self.clients.add(client)
+        commands = asyncio.create_task(self.read_commands(reader, client))
+        try:
+            while True:
+                await client.ready.wait()
+                client.ready.clear()
+                if client.closed:
+                    break
+                writer.write(b"".join(line for _, line in client.queue))
+                client.queue.clear()
+                await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self.clients.discard(client)
+            commands.cancel()
+            writer.close()
+
+    async def read_commands(self, reader, client):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    # Half-closed: the client is done sending commands but still
+                    # reads events, until a write to it fails
+                    return
+                try:
+                    types = json.loads(line).get("subscribe")
+                except (ValueError, AttributeError):
+                    continue
+                client.types = None if types is None else set(types)
+        except (ConnectionError, OSError):
+            pass
+        client.close()
+
+    # Publishing
+
+    def publish(self, kind, t=None, **fields):
+        """Send an event to every subscriber (thread-safe, never blocks)."""
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            return
+        event = {"type": kind, "t": time.time() if t is None else t, **fields}
+        if kind in BATCHED:
+            with self.lock:
+                key = (kind, fields.get("hand"))
+                self.coalesced += key in self.latest
+                self.latest[key] = event
+            return
+        self.published += 1
+        try:
+            loop.call_soon_threadsafe(self.broadcast, kind, (json.dumps(event) + "\n").encode())
+        except RuntimeError:
+            pass  # the server stopped between the check and the call
+
+    def broadcast(self, kind, line):
+        for client in list(self.clients):
+            if not client.closed and not client.push(kind, line):
+                self.disconnected += 1
+                client.close(abort=True)
+
+    async def flush_batches(self):
+        while True:
+            await asyncio.sleep(self.cursor_interval)
+            with self.lock:
+                latest, self.latest = self.latest, {}
+            if not latest:
+                continue
+            batch = {"type": "cursor", "t": max(e["t"] for e in latest.values()), "cursors": []}
+            for (kind, hand), event in sorted(latest.items(), key=lambda item: (item[0][0], item[0][1] or 0)):
+                if kind == "mouse":
+                    batch["mouse"] = {"x": event["x"], "y": event["y"]}
+                else:
+                    batch["cursors"].append({"hand": hand, "x": event["x"], "y": event["y"]})
+            self.published += 1
+            self.broadcast("cursor", (json.dumps(batch) + "\n").encode())
+
+    def stats(self):
+        return {"clients": len(self.clients), "published": self.published, "coalesced": self.coalesced,
+                "disconnected": self.disconnected, "dropped": sum(c.dropped for c in self.clients)}
+
+
+class IpcSink:
+    """Sink wrapper that publishes every output event; `backend` may be None to run headless."""
+
+    def __init__(self, backend, server):
+        self.backend = backend
+        self.server = server
+
+    def tap_key(self, key):
+        self.server.publish("key", key=key)
+        if self.backend is not None:
+            self.backend.tap_key(key)
+
+    def move_mouse(self, x, y):
+        self.server.publish("mouse", x=x, y=y)
+        if self.backend is not None:
+            self.backend.move_mouse(x, y)
+
+    def click_mouse(self):
+        self.server.publish("click")
+        if self.backend is not None:
+            self.backend.click_mouse()
+
+    def play_click(self):
+        if self.backend is not None:
+            self.backend.play_click()
+
+    def copy_to_clipboard(self, text):
+        self.server.publish("clipboard", text=text)
+        if self.backend is not None:
+            self.backend.copy_to_clipboard(text)
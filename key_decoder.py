@@ -0,0 +1,160 @@
+import numpy as np
+
+from hit_test import HitTestIndex
+
+ALPHABET = "abcdefghijklmnopqrstuvwxyz "
+OTHER = len(ALPHABET)  # digits, punctuation and anything else share one symbol
+SPACE = ALPHABET.index(" ")
+
+
+def char_index(ch):
+    ch = ch.lower()
+    if ch in "\n\t":
+        return SPACE
+    i = ALPHABET.find(ch)
+    return OTHER if i < 0 else i
+
+
+class CharNgram:
+    """
+    Character n-gram model (order 3 by default) trained on a word list.
+
+    Words are counted with their frequencies and a space on either side, and
+    the interpolated, add-k smoothed log-probabilities of every next character
+    are precomputed into one (A,) * order table, so a lookup is one row index.
+    """
+
+    def __init__(self, words, freqs, order=3, weights=(0.1, 0.3, 0.6), k=0.1):
+        self.order = order
+        size = OTHER + 1
+        counts = [np.zeros((size,) * n) for n in range(1, order + 1)]
+        for word, freq in zip(words, freqs):
+            seq = [SPACE] * (order - 1) + [char_index(c) for c in word] + [SPACE]
+            for i in range(order - 1, len(seq)):
+                for n in range(1, order + 1):
+                    counts[n - 1][tuple(seq[i - n + 1:i + 1])] += freq
+
+        # P(c | context) = sum_n w_n * P_n(c | last n-1 chars), broadcast up to the full order
+        table = np.zeros((size,) * order)
+        for n, (count, weight) in enumerate(zip(counts, weights), start=1):
+            probs = (count + k) / (count.sum(axis=-1, keepdims=True) + k * size)
+            table += weight * probs.reshape((1,) * (order - n) + probs.shape)
+        self.log_probs = np.log(table / table.sum(axis=-1, keepdims=True)).astype(np.float32)
+
+    def next_log_probs(self, text):
+        """Log-probability of every alphabet symbol following `text`."""
+        context = [SPACE] * (self.order - 1) + [char_index(c) for c in text[-(self.order - 1):]]
+        return self.log_probs[tuple(context[-(self.order - 1):])]
+
+
+def key_char(button):
+    """
+    Alphabet index a key types, or -1 for keys the n-gram does not model: the
+    word list has no digits, punctuation or line breaks, and SHIFT / BACK type nothing.
+    """
+    if button.text == "SPACE":
+        return SPACE
+    if len(button.text) == 1 and char_index(button.text) != OTHER:
+        return char_index(button.text)
+    return -1
+
+
+class KeyDecoder:
+    """
+    Picks the intended key of a pinch from its position and the text before it.
+
+    Each key has a 2D Gaussian touch model of where its taps land relative to
+    its center, starting from a prior proportional to the key size and
+    updated from taps the user kept or corrected (learn()). A pinch scores
+    every key within `radius` by touch log-likelihood plus `lm_weight` times
+    the character n-gram log-probability, so ambiguous taps between keys go
+    to the likelier letter. Keys the n-gram does not model (digits,
+    punctuation, SHIFT, BACK, ENTER) compete on touch alone: they get the LM
+    score of the closest modelled candidate, so the LM never pulls a pinch
+    onto or off them. Per-key parameters are kept precomputed, so
+    decode() is a few vector operations over a handful of candidates.
+    """
+
+    def __init__(self, buttons, ngram, radius=90, lm_weight=0.5, sigma_scale=0.3, prior_count=5.0,
+                 min_sigma=4.0):
+        self.buttons = list(buttons)
+        self.ngram = ngram
+        self.radius = radius
+        self.lm_weight = lm_weight
+        self.index = HitTestIndex(self.buttons, magnet_radius=radius)
+        self.key_of = {id(b): i for i, b in enumerate(self.buttons)}
+        self.centers = np.array(self.index.centers, np.float32).reshape(-1, 2)
+        self.chars = np.array([key_char(b) for b in self.buttons], np.int32)
+
+        # Prior: unbiased taps with a spread proportional to the key size
+        n = len(self.buttons)
+        sizes = np.array([b.size for b in self.buttons], np.float32).reshape(-1, 2)
+        self.prior_count = prior_count
+        self.prior_cov = np.zeros((n, 2, 2), np.float32)
+        self.prior_cov[:, 0, 0] = (sigma_scale * sizes[:, 0]) ** 2
+        self.prior_cov[:, 1, 1] = (sigma_scale * sizes[:, 1]) ** 2
+        self.min_var = min_sigma ** 2
+
+        # Sufficient statistics of learned tap offsets
+        self.counts = np.zeros(n, np.float32)
+        self.sums = np.zeros((n, 2), np.float32)
+        self.outer = np.zeros((n, 2, 2), np.float32)
+
+        # Precomputed per key: mean offset, inverse covariance, log normalizer
+        self.means = np.zeros((n, 2), np.float32)
+        self.inv_cov = np.zeros((n, 2, 2), np.float32)
+        self.log_norm = np.zeros(n, np.float32)
+        for i in range(n):
+            self.refresh(i)
+
+    def refresh(self, i):
+        total = self.prior_count + self.counts[i]
+        mean = self.sums[i] / total
+        cov = (self.prior_count * self.prior_cov[i] + self.outer[i]) / total - np.outer(mean, mean)
+        cov = cov + np.eye(2, dtype=np.float32) * self.min_var
+        self.means[i] = mean
+        self.inv_cov[i] = np.linalg.inv(cov)
+        self.log_norm[i] = 0.5 * np.log(np.linalg.det(cov)) + np.log(2 * np.pi)
+
+    def candidates(self, x, y):
+        idx = np.array(self.index.candidates(x, y), np.intp)
+        if not len(idx):
+            return idx
+        d = self.centers[idx] - (x, y)
+        return idx[(d * d).sum(axis=1) <= self.radius ** 2]
+
+    def scores(self, x, y, context, idx):
+        d = np.array((x, y), np.float32) - self.centers[idx] - self.means[idx]
+        maha = np.einsum("ni,nij,nj->n", d, self.inv_cov[idx], d)
+        touch = -0.5 * maha - self.log_norm[idx]
+        row = self.ngram.next_log_probs(context)
+        chars = self.chars[idx]
+        modelled = chars >= 0
+        lm = row[np.maximum(chars, 0)]
+        # Unmodelled keys take the LM score of the modelled key nearest by touch,
+        # so between the two, touch alone decides
+        neutral = lm[modelled][np.argmax(touch[modelled])] if modelled.any() else 0.0
+        lm = np.where(modelled, lm, neutral)
+        return touch + self.lm_weight * lm
+
+    def decode(self, x, y, context=""):
+        """Most probable key for a pinch at (x, y) after `context`, or None if no key is in range."""
+        idx = self.candidates(x, y)
+        if not len(idx):
+            return None
+        if len(idx) == 1:
+            return self.buttons[idx[0]]
+        return self.buttons[idx[np.argmax(self.scores(x, y, context, idx))]]
+
+    def learn(self, button, x, y):
+        """Add a tap at (x, y) that was meant for `button` to its touch model."""
+        i = self.key_of.get(id(button))
+        if i is None:
+            return
+        d = np.array((x, y), np.float32) - self.centers[i]
+        if d @ d > self.radius ** 2:
+            return
+        self.counts[i] += 1
+        self.sums[i] += d
+        self.outer[i] += np.outer(d, d)
+        self.refresh(i)
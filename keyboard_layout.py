@@ -1,5 +1,7 @@
 import cv2
 import numpy as np
+from hit_test import HitTestIndex
+from layout_engine import ArtifactCache, compile_rows, frame_scale, keyboard_layouts, load_spec, scale_box
 
 class Button:
     def __init__(self, pos, text, size=[85, 85]):
@@ -7,110 +9,206 @@ class Button:
         self.size = size
         self.text = text
 
+class CompiledLayout:
+    """Buttons, hit-test index, panel box and cached overlays of one layout at one frame size."""
+
+    def __init__(self, name, title, button_list, hit_index, panel, overlays):
+        self.name = name
+        self.title = title
+        self.button_list = button_list
+        self.hit_index = hit_index
+        self.panel = panel
+        self.overlays = overlays
+
 class KeyboardLayout:
-    def __init__(self):
-        self.keys = [
-            ["1", "2", "3", "4", "5", "6", "7", "8", "9", "0"],
-            ["Q", "W", "E", "R", "T", "Y", "U", "I", "O", "P"],
-            ["A", "S", "D", "F", "G", "H", "J", "K", "L", ";"],
-            ["Z", "X", "C", "V", "B", "N", "M", ",", ".", "/"]
-        ]
+    def __init__(self, layout="qwerty", frame_size=(1280, 720), layouts=None, artifacts=None):
+        self.frame_size = frame_size
         self.button_list = []
-        self.create_buttons()
 
-    def create_buttons(self):
-        self.button_list = []
-        # Standard Grid
-        # Starting Y at 50, X at 50. 
-        # Keys are 85x85, gap is 15. Total step 100.
-        
-        for i in range(len(self.keys)):
-            for j, key in enumerate(self.keys[i]):
-                self.button_list.append(Button([100 * j + 50, 100 * i + 50], key))
-        
-        # Modifier Row (Y = 450)
-        # Shift, Space, Backspace, Enter
-        # Total width approx 1000px (10 keys * 100)
-        
-        # Shift: Left side
-        self.button_list.append(Button([50, 450], "SHIFT", [185, 85]))
-        
-        # Space: Center
-        self.button_list.append(Button([250, 450], "SPACE", [485, 85]))
-        
-        # Backspace
-        self.button_list.append(Button([750, 450], "BACK", [135, 85]))
-        
-        # Enter
-        self.button_list.append(Button([900, 450], "ENTER", [135, 85]))
-
-    def draw_keyboard(self, img, hovered_button=None, clicked_button=None):
         # High-Tech Style Configuration
-        color_base = (40, 40, 40)       # Darker Gray
-        color_border = (255, 200, 0)    # Cyan/Teal mix (BGR) -> actually let's go Cyan (255, 255, 0)
-        color_text = (255, 255, 255)    # White
-        color_hover = (255, 0, 255)     # Magenta
-        color_click = (0, 255, 0)       # Green
-        
-        # Create overlay for transparency
-        overlay = img.copy()
-        
-        # Draw Background Panel (HUD style)
-        cv2.rectangle(overlay, (25, 25), (1085, 560), (0, 0, 0), cv2.FILLED)
-        
-        # Apply transparency to background
-        alpha = 0.7 # Darker background for better contrast
-        img = cv2.addWeighted(overlay, alpha, img, 1 - alpha, 0)
-
-        for button in self.button_list:
-            x, y = button.pos
-            w, h = button.size
-            
-            # Determine colors based on state
-            current_border = color_border
-            current_fill = color_base
-            current_text = color_text
-            
-            if button == clicked_button:
-                current_border = color_click
-                current_fill = (0, 150, 0) 
-                current_text = (0, 0, 0)
-            elif button == hovered_button:
-                current_border = color_hover
-                current_fill = (80, 0, 80) 
-            
-            # Draw Button Fill (Rounded effect by drawing filled rect slightly smaller + circles? 
-            # OpenCV doesn't have native rounded rect. Let's stick to clean rects but with "corner cuts" for sci-fi look)
-            
-            # Sci-Fi "Cut Corner" Box
-            cut_len = 15
-            pts = np.array([
-                [x + cut_len, y],
-                [x + w - cut_len, y],
-                [x + w, y + cut_len],
-                [x + w, y + h - cut_len],
-                [x + w - cut_len, y + h],
-                [x + cut_len, y + h],
-                [x, y + h - cut_len],
-                [x, y + cut_len]
-            ], np.int32)
-            pts = pts.reshape((-1, 1, 2))
-            
-            cv2.fillPoly(img, [pts], current_fill)
-            cv2.polylines(img, [pts], True, current_border, 2)
-
-            # Draw Text
-            font_scale = 2
-            thickness = 2
-            if len(button.text) > 1: 
-                font_scale = 1.5
-                thickness = 2
-            
-            text_size = cv2.getTextSize(button.text, cv2.FONT_HERSHEY_PLAIN, font_scale, thickness)[0]
-            text_x = x + (w - text_size[0]) // 2
-            text_y = y + (h + text_size[1]) // 2
-            
-            cv2.putText(img, button.text, (text_x, text_y),
-                        cv2.FONT_HERSHEY_PLAIN, font_scale, current_text, thickness)
-            
+        self.color_base = (40, 40, 40)       # Darker Gray
+        self.color_border = (255, 200, 0)    # Cyan/Teal mix (BGR)
+        self.color_text = (255, 255, 255)    # White
+        self.color_hover = (255, 0, 255)     # Magenta
+        self.color_click = (0, 255, 0)       # Green
+
+        # Everything is designed at 1280x720 and scaled to the camera frame
+        self.scale = min(frame_size[0] / 1280, frame_size[1] / 720)
+
+        # HUD background panel (per layout, see data/layouts)
+        self.panel_top_left = (25, 25)
+        self.panel_bottom_right = (1085, 560)
+        self.panel_alpha = 0.7  # Darker background for better contrast
+
+        # Pre-rendered (layer, background mask) per shift state of the current layout
+        self.overlay_cache = {}
+
+        # Magnetic snapping: cursor snaps to a key whose center is within this radius
+        self.magnet_radius = int(round(60 * self.scale))
+        self.hit_index = None
+
+        # Word suggestion keys to the right of the panel; empty slots are hidden and not hit
+        sx, sy = frame_size[0] / 1280, frame_size[1] / 720
+        self.suggestion_buttons = [Button([int(1100 * sx), int((150 + 100 * i) * sy)], "", [int(170 * sx), int(85 * sy)])
+                                   for i in range(3)]
+        self.suggestion_index = HitTestIndex([], magnet_radius=self.magnet_radius)
+
+        # Every layout is compiled (or loaded from its cached artifact) up front,
+        # so switching layouts only swaps references
+        self.artifacts = ArtifactCache() if artifacts is None else artifacts
+        self.layout_names = list(layouts or keyboard_layouts())
+        if layout not in self.layout_names:
+            self.layout_names.insert(0, layout)
+        self.layouts = {name: self.compile(name) for name in self.layout_names}
+        self.layout = None
+        self.set_layout(layout)
+
+    def compile(self, name):
+        spec = load_spec(name)
+        cached = self.artifacts.load(name, self.frame_size) if self.artifacts else None
+        if cached is not None:
+            rects, texts = cached["rects"], cached["texts"].tolist()
+            panel = tuple(int(v) for v in cached["panel"])
+        else:
+            rects, texts = compile_rows(spec, self.frame_size)
+            panel = scale_box(spec["panel"], frame_scale(spec, self.frame_size))
+
+        button_list = [Button([int(x), int(y)], text, [int(w), int(h)]) for (x, y, w, h), text in zip(rects, texts)]
+        hit_index = HitTestIndex(button_list, magnet_radius=self.magnet_radius)
+
+        if cached is not None:
+            overlays = {shift: (cached[f"layer_{int(shift)}"], cv2.merge([cached[f"mask_{int(shift)}"]] * 3))
+                        for shift in (True, False)}
+        else:
+            overlays = {shift: self.build_overlay(shift, button_list, panel) for shift in (True, False)}
+            if self.artifacts:
+                arrays = {"rects": rects, "texts": np.array(texts), "panel": np.array(panel, np.int32)}
+                for shift, (layer, bg_mask) in overlays.items():
+                    arrays[f"layer_{int(shift)}"] = layer
+                    arrays[f"mask_{int(shift)}"] = bg_mask[..., 0]
+                self.artifacts.save(name, self.frame_size, arrays)
+
+        return CompiledLayout(name, spec.get("name", name.upper()), button_list, hit_index, panel, overlays)
+
+    def set_layout(self, name):
+        """Switch to a compiled layout; no geometry or overlay is rebuilt."""
+        layout = self.layouts[name]
+        self.layout = layout
+        self.button_list = layout.button_list
+        self.hit_index = layout.hit_index
+        self.overlay_cache = layout.overlays
+        x0, y0, x1, y1 = layout.panel
+        self.panel_top_left = (x0, y0)
+        self.panel_bottom_right = (x1, y1)
+
+    def next_layout(self):
+        i = self.layout_names.index(self.layout.name)
+        self.set_layout(self.layout_names[(i + 1) % len(self.layout_names)])
+        return self.layout
+
+    def get_hovered_button(self, x, y):
+        """Get button under cursor."""
+        return self.hit_index.hovered(x, y)
+
+    def get_closest_button(self, x, y):
+        """Get the key (or word suggestion) the cursor magnetically snaps to, if any."""
+        return self.hit_index.nearest(x, y) or self.suggestion_index.nearest(x, y)
+
+    def set_suggestions(self, words):
+        """Show up to len(suggestion_buttons) words; only called when the suggestions change."""
+        for i, button in enumerate(self.suggestion_buttons):
+            button.text = words[i] if i < len(words) else ""
+        active = [b for b in self.suggestion_buttons if b.text]
+        self.suggestion_index = HitTestIndex(active, magnet_radius=self.magnet_radius)
+
+    def key_label(self, button, shift=True):
+        if not shift and len(button.text) == 1:
+            return button.text.lower()
+        return button.text
+
+    def draw_button(self, img, button, fill, border, text_color, shift=True, offset=(0, 0)):
+        x, y = button.pos
+        x, y = x - offset[0], y - offset[1]
+        w, h = button.size
+
+        # Sci-Fi "Cut Corner" Box
+        cut_len = int(round(15 * self.scale))
+        pts = np.array([
+            [x + cut_len, y],
+            [x + w - cut_len, y],
+            [x + w, y + cut_len],
+            [x + w, y + h - cut_len],
+            [x + w - cut_len, y + h],
+            [x + cut_len, y + h],
+            [x, y + h - cut_len],
+            [x, y + cut_len]
+        ], np.int32)
+        pts = pts.reshape((-1, 1, 2))
+
+        cv2.fillPoly(img, [pts], fill)
+        cv2.polylines(img, [pts], True, border, 2)
+
+        # Draw Text
+        text = self.key_label(button, shift)
+        font_scale = 2 * self.scale
+        thickness = max(1, int(round(2 * self.scale)))
+        if len(text) > 1:
+            font_scale = 1.5 * self.scale
+
+        text_size = cv2.getTextSize(text, cv2.FONT_HERSHEY_PLAIN, font_scale, thickness)[0]
+        text_x = x + (w - text_size[0]) // 2
+        text_y = y + (h + text_size[1]) // 2
+
+        cv2.putText(img, text, (text_x, text_y),
+                    cv2.FONT_HERSHEY_PLAIN, font_scale, text_color, thickness)
+        return pts
+
+    def build_overlay(self, shift=True, button_list=None, panel=None):
+        """Rasterize the static panel and all idle keys once into a BGR layer + background mask."""
+        button_list = self.button_list if button_list is None else button_list
+        x0, y0, x1, y1 = panel or (self.panel_top_left + self.panel_bottom_right)
+        # cv2.rectangle is inclusive of the bottom-right corner
+        layer = np.zeros((y1 - y0 + 1, x1 - x0 + 1, 3), np.uint8)
+        key_mask = np.zeros(layer.shape, np.uint8)
+
+        for button in button_list:
+            pts = self.draw_button(layer, button, self.color_base, self.color_border,
+                                   self.color_text, shift, offset=(x0, y0))
+            cv2.fillPoly(key_mask, [pts], (255, 255, 255))
+            cv2.polylines(key_mask, [pts], True, (255, 255, 255), 2)
+
+        # 255 where the camera shows through the panel, 0 under opaque keys
+        return layer, cv2.bitwise_not(key_mask)
+
+    def draw_keyboard(self, img, hovered_buttons=(), clicked_buttons=(), shift=True):
+        # Static keyboard is cached per shift state; only hover/click keys are redrawn
+        if shift not in self.overlay_cache:
+            self.overlay_cache[shift] = self.build_overlay(shift)
+        layer, bg_mask = self.overlay_cache[shift]
+
+        # Composite over the panel ROI only (clipped to the frame)
+        x0, y0 = self.panel_top_left
+        x1, y1 = self.panel_bottom_right
+        roi = img[y0:y1 + 1, x0:x1 + 1]
+        rh, rw = roi.shape[:2]
+        layer, bg_mask = layer[:rh, :rw], bg_mask[:rh, :rw]
+
+        # Clear pixels under the keys, then darken the rest and add the key layer in one pass
+        cv2.bitwise_and(roi, bg_mask, dst=roi)
+        cv2.addWeighted(roi, 1 - self.panel_alpha, layer, 1, 0, dst=roi)
+
+        # Suggestions change per keystroke, so they are drawn live rather than cached
+        for button in self.suggestion_index.buttons:
+            self.draw_button(img, button, self.color_base, self.color_border, self.color_text, shift)
+
+        # One hovered/clicked key per hand
+        clicked_buttons = list(clicked_buttons)
+        for button in hovered_buttons:
+            if button not in clicked_buttons:
+                self.draw_button(img, button, (80, 0, 80), self.color_hover,
+                                 self.color_text, shift)
+        for button in clicked_buttons:
+            self.draw_button(img, button, (0, 150, 0), self.color_click,
+                             (0, 0, 0), shift)
+
         return img
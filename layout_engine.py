@@ -0,0 +1,115 @@
+import json
+import os
+
+import numpy as np
+
+LAYOUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "layouts")
+ARTIFACT_DIR = os.path.join(LAYOUT_DIR, "compiled")
+# Bump when compiled geometry or overlay rendering changes, to invalidate old artifacts
+ARTIFACT_VERSION = 1
+
+
+def layout_path(name):
+    return os.path.join(LAYOUT_DIR, name + ".json")
+
+
+def load_spec(name):
+    with open(layout_path(name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def keyboard_layouts():
+    """Names of the key-row layouts in LAYOUT_DIR, QWERTY first."""
+    names = []
+    for filename in sorted(os.listdir(LAYOUT_DIR)):
+        name, ext = os.path.splitext(filename)
+        if ext == ".json" and "rows" in load_spec(name):
+            names.append(name)
+    return sorted(names, key=lambda n: n != "qwerty")
+
+
+def frame_scale(spec, frame_size):
+    """(sx, sy) from the layout's design resolution to the actual frame."""
+    dw, dh = spec.get("design_size", (1280, 720))
+    return frame_size[0] / dw, frame_size[1] / dh
+
+
+def scale_rects(rects, scale):
+    sx, sy = scale
+    rects = np.asarray(rects, np.float64).reshape(-1, 4)
+    return np.rint(rects * [sx, sy, sx, sy]).astype(np.int32)
+
+
+def compile_rows(spec, frame_size):
+    """
+    Key rectangles (N, 4) as x, y, w, h in frame pixels, plus labels.
+
+    Rows are laid out left to right from `origin`; a key is a label, or a
+    dict with "text" and optional "width" / "x" in design pixels.
+    """
+    ox, oy = spec["origin"]
+    kw, kh = spec["key_size"]
+    gap = spec["gap"]
+    rects, texts = [], []
+    for i, row in enumerate(spec["rows"]):
+        x = ox
+        y = oy + i * (kh + gap)
+        for key in row:
+            if isinstance(key, str):
+                key = {"text": key}
+            x = key.get("x", x)
+            w = key.get("width", kw)
+            rects.append((x, y, w, kh))
+            texts.append(key["text"])
+            x += w + gap
+    return scale_rects(rects, frame_scale(spec, frame_size)), texts
+
+
+def compile_grid(spec, keys, frame_size):
+    """Rectangles for `keys` laid out in a grid of spec["columns"] columns."""
+    ox, oy = spec["origin"]
+    kw, kh = spec["key_size"]
+    gap = spec["gap"]
+    cols = spec["columns"]
+    rects = [(ox + (i % cols) * (kw + gap), oy + (i // cols) * (kh + gap), kw, kh) for i in range(len(keys))]
+    return scale_rects(rects, frame_scale(spec, frame_size))
+
+
+def scale_box(box, scale):
+    """Scale an (x0, y0, x1, y1) box given in design pixels."""
+    sx, sy = scale
+    x0, y0, x1, y1 = box
+    return int(round(x0 * sx)), int(round(y0 * sy)), int(round(x1 * sx)), int(round(y1 * sy))
+
+
+class ArtifactCache:
+    """
+    Compiled layouts (geometry plus pre-rendered overlays) saved as .npz per
+    layout and frame size, and reused while the source .json is unchanged.
+    """
+
+    def __init__(self, directory=ARTIFACT_DIR):
+        self.directory = directory
+
+    def path(self, name, frame_size):
+        return os.path.join(self.directory, f"{name}.{frame_size[0]}x{frame_size[1]}.npz")
+
+    def load(self, name, frame_size):
+        """Arrays of a valid artifact, or None when missing, stale or unreadable."""
+        path = self.path(name, frame_size)
+        try:
+            if os.path.getmtime(path) < os.path.getmtime(layout_path(name)):
+                return None
+            with np.load(path) as data:
+                if int(data["version"]) != ARTIFACT_VERSION:
+                    return None
+                return {key: data[key] for key in data.files}
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def save(self, name, frame_size, arrays):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(name, frame_size)
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, version=ARTIFACT_VERSION, **arrays)
+        os.replace(tmp_path, path)
@@ -1,3 +1,7 @@
+import time
+# Startup phases are timed from here
+STARTED = time.perf_counter()
+
 import os
 import warnings
 
@@ -5,291 +9,297 @@ import warnings
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
 warnings.filterwarnings('ignore')
 
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import cv2
-import time
-import math
 import numpy as np
-from pynput.keyboard import Controller, Key
-from pynput.mouse import Controller as MouseController, Button
 from hand_tracker import HandTracker
-from keyboard_layout import KeyboardLayout
-from emoji_panel import EmojiPanel
+from pipeline import Pipeline
+from multiprocess_inference import MultiProcessPipeline
+from air_keyboard import AirKeyboard
+from profiler import StageProfiler, StartupTimer
+from output_dispatcher import OutputDispatcher, ClickSound
+from adaptive_quality import AdaptiveQualityController
+from idle_mode import IdleController
+from ipc_server import IpcServer, IpcSink
+from trace_store import TraceStoreWriter, TraceSink
+
+WINDOW_NAME = "Air Keyboard V4"
+
+# Profiling: per-stage timings HUD (toggle with 'p') and periodic export (.json lines or .csv)
+PROFILER_HUD = False
+PROFILER_EXPORT_PATH = os.environ.get("AIR_KEYBOARD_PROFILE_LOG")
+PROFILER_EXPORT_INTERVAL = 5.0  # seconds
+
+# Session recording: landmarks and output events appended to this trace directory
+# (replay with `python replay.py <dir>`)
+TRACE_PATH = os.environ.get("AIR_KEYBOARD_TRACE")
+
+# Adaptive quality: trade inference resolution, model complexity, max hands
+# and redraw rate for frame rate to hold TARGET_FPS
+ADAPTIVE_QUALITY = True
+TARGET_FPS = 30
+
+# Event stream for other applications: a Unix socket path, or "host:port" for
+# localhost TCP (see ipc_server.py). HEADLESS runs without a window or desktop
+# input and only publishes events, on IPC_ADDRESS or a default address.
+IPC_ADDRESS = os.environ.get("AIR_KEYBOARD_IPC")
+HEADLESS = os.environ.get("AIR_KEYBOARD_HEADLESS") == "1"
+DEFAULT_IPC_ADDRESS = "127.0.0.1:8765" if os.name == "nt" else "/tmp/air_keyboard.sock"
+
+# Idle mode: after idle_after seconds without a hand, detect at idle_fps on
+# frames scaled by idle_input_scale, and skip the HUD, until a hand appears
+IDLE_MODE = True
+IDLE_PARAMS = {"idle_after": 3.0, "idle_fps": 5.0, "idle_input_scale": 0.5}
+
+# Cameras to track; the first is displayed. With more than one camera, or
+# INFERENCE_WORKERS > 0, MediaPipe runs in worker processes (that many per
+# camera) and each hand is taken from whichever camera sees it best.
+CAMERAS = [0]
+INFERENCE_WORKERS = 0
+
+# Keyboard layout at startup (a file in data/layouts); cycle with 'l' or a held victory sign
+KEYBOARD_LAYOUT = "qwerty"
+
+
+def screen_size(default=(1920, 1080)):
+    """Desktop resolution for trackpad mode, via tkinter when available."""
+    try:
+        import tkinter
+        root = tkinter.Tk()
+        root.withdraw()
+        size = (root.winfo_screenwidth(), root.winfo_screenheight())
+        root.destroy()
+        return size
+    except Exception:
+        return default
+
+
+class DesktopSink:
+    """
+    Sends AirKeyboard output to the local desktop via pynput.
+
+    pynput and pyperclip are imported on first use (on the output thread),
+    so they never delay startup and modes that don't need them never load them.
+    """
+
+    def __init__(self):
+        self.sound = ClickSound()
+        self.keyboard = None
+        self.mouse = None
+        self.special_keys = {}
+
+    def keyboard_controller(self):
+        if self.keyboard is None:
+            from pynput.keyboard import Controller, Key
+            self.special_keys = {"space": Key.space, "enter": Key.enter, "backspace": Key.backspace}
+            self.keyboard = Controller()
+        return self.keyboard
+
+    def mouse_controller(self):
+        if self.mouse is None:
+            from pynput.mouse import Controller
+            self.mouse = Controller()
+        return self.mouse
+
+    def tap_key(self, key):
+        keyboard = self.keyboard_controller()
+        key = self.special_keys.get(key, key)
+        keyboard.press(key)
+        keyboard.release(key)
+
+    def move_mouse(self, x, y):
+        self.mouse_controller().position = (x, y)
 
-# Initialize Controllers
-keyboard_controller = Controller()
-mouse_controller = MouseController()
+    def click_mouse(self):
+        from pynput.mouse import Button
+        self.mouse_controller().click(Button.left)
+
+    def play_click(self):
+        self.sound.play()
+
+    def copy_to_clipboard(self, text):
+        import pyperclip
+        pyperclip.copy(text)
+
+
+def show_splash(size=(1280, 720)):
+    """Open the window right away with a placeholder while the camera and model load."""
+    w, h = size
+    img = np.zeros((h, w, 3), np.uint8)
+    cv2.putText(img, "Starting camera and hand tracking...", (w // 2 - 330, h // 2), cv2.FONT_HERSHEY_PLAIN, 2,
+                (255, 255, 255), 2)
+    cv2.imshow(WINDOW_NAME, img)
+    cv2.waitKey(1)
+
+
+def open_cameras(indices, startup):
+    with startup.phase("camera"):
+        caps = [cv2.VideoCapture(index) for index in indices]
+        for cap in caps:
+            cap.set(3, 1280) # Width
+            cap.set(4, 720)  # Height
+    return caps
+
+
+def create_tracker(startup, profiler, recorder):
+    with startup.phase("model"):
+        tracker = HandTracker(detection_confidence=0.8, roi_tracking=True, profiler=profiler, recorder=recorder)
+    # The first inference builds MediaPipe's graph; pay for it before the first camera frame
+    with startup.phase("warm-up"):
+        tracker.warm_up()
+    return tracker
 
-# Mode constants
-MODE_KEYBOARD = 0
-MODE_TRACKPAD = 1
-MODE_EMOJI = 2
 
 def main():
     print("Starting Air Keyboard V4... Press 'q' to quit.")
-    # Initialize Camera
-    cap = cv2.VideoCapture(0)
-    cap.set(3, 1280) # Width
-    cap.set(4, 720)  # Height
-
-    # Initialize Hand Tracker
-    tracker = HandTracker(detection_confidence=0.8)
-
-    # Initialize Layouts
-    keyboard = KeyboardLayout()
-    emoji_panel = EmojiPanel()
-    
-    final_text = ""
-    
-    # Mode state
-    current_mode = MODE_KEYBOARD
-    mode_switch_start_time = None
-    mode_switch_threshold = 2.0  # seconds
-    
-    # Smoothing variables
-    hands_state = {}
-    smoothing_factor = 2
-    
-    is_shift = False
+    startup = StartupTimer(origin=STARTED)
+    startup.mark("imports")
+    if HEADLESS:
+        # No window to press 'q' in: stop on Ctrl+C or SIGTERM instead
+        stop_requested = threading.Event()
+        signal.signal(signal.SIGINT, lambda *args: stop_requested.set())
+        signal.signal(signal.SIGTERM, lambda *args: stop_requested.set())
+    else:
+        with startup.phase("window"):
+            show_splash()
+
+    profiler = StageProfiler(export_path=PROFILER_EXPORT_PATH, export_interval=PROFILER_EXPORT_INTERVAL)
+    show_profiler = PROFILER_HUD
+    multiprocess = len(CAMERAS) > 1 or INFERENCE_WORKERS > 0
+
+    # Camera opening and model loading (plus warm-up) overlap; the rest of the
+    # UI is built here meanwhile. The recorder is attached once the frame size is known.
+    init = ThreadPoolExecutor(max_workers=2)
+    cameras = init.submit(open_cameras, CAMERAS, startup)
+    tracker = None if multiprocess else init.submit(create_tracker, startup, profiler, None)
+
+    with startup.phase("desktop"):
+        size = screen_size()
+        # Key presses, mouse, sounds and clipboard run on their own worker thread
+        sink = None if HEADLESS else DesktopSink()
+
+    caps = cameras.result()
+    cap = caps[0]
+    # Layouts are scaled to whatever resolution the camera actually delivers
+    frame_size = (int(cap.get(3)) or 1280, int(cap.get(4)) or 720)
+    recorder = TraceStoreWriter(TRACE_PATH, frame_size=frame_size) if TRACE_PATH else None
+    address = IPC_ADDRESS or (DEFAULT_IPC_ADDRESS if HEADLESS else None)
+    server = IpcServer(address) if address else None
+    if server:
+        server.start()
+        sink = IpcSink(sink, server)
+    if recorder:
+        sink = TraceSink(sink, recorder)
+    output = OutputDispatcher(sink, profiler=profiler)
+    # Output queue backpressure in the profiler export and HUD
+    profiler.add_source("output", output.stats, lambda s: f"q{s['depth']} {s['lag_p99_ms']:4.1f}ms")
+    with startup.phase("keyboard"):
+        app = AirKeyboard(output, screen_size=size, frame_size=frame_size, layout=KEYBOARD_LAYOUT,
+                          profiler=profiler, events=server.publish if server else None)
+
+    idle = IdleController(**IDLE_PARAMS) if IDLE_MODE else None
+    if multiprocess:
+        # Workers load and warm up their own models; start() waits for them
+        with startup.phase("workers"):
+            pipeline = MultiProcessPipeline(caps, frame_size, workers_per_camera=max(1, INFERENCE_WORKERS),
+                                            tracker_kwargs={"detection_confidence": 0.8, "roi_tracking": True},
+                                            recorder=recorder, idle=idle)
+            pipeline.start()
+    else:
+        tracker = tracker.result()
+        tracker.recorder = recorder
+        # Capture and inference run on background threads; this thread renders
+        pipeline = Pipeline(cap, tracker, profiler=profiler, idle=idle)
+        pipeline.start()
+    init.shutdown()
+
+    quality = AdaptiveQualityController(target_fps=TARGET_FPS) if ADAPTIVE_QUALITY else None
+    render_interval = 1
+    frame_count = 0
 
     while True:
-        success, img = cap.read()
-        if not success:
-            print("Error: Could not access the camera. Please check permissions.")
+        # Checked before reading: with no camera frames the read below keeps timing out
+        if HEADLESS and stop_requested.is_set():
             break
+        packet = pipeline.read(timeout=1.0)
+        if packet is None:
+            if pipeline.is_finished():
+                if pipeline.failed:
+                    print("Error: Could not access the camera. Please check permissions.")
+                break
+            continue
+
+        # Frame is already flipped and has hand landmarks drawn
+        work_start = time.perf_counter()
+        app.update(packet.landmarks, packet.capture_time)
 
-        # Flip image for mirror view
-        img = cv2.flip(img, 1)
-
-        # Detect Hands
-        img = tracker.find_hands(img, draw=True)
-        
-        hovered_button = None
-        clicked_button = None
-        cursors_to_draw = []
-        
-        # Mode Switching Logic: Detect open palm (all 5 fingers extended)
-        if tracker.results.multi_hand_landmarks and len(tracker.results.multi_hand_landmarks) >= 1:
-            # Check first hand for open palm gesture
-            hand_lms = tracker.results.multi_hand_landmarks[0]
-            h, w, c = img.shape
-            
-            # Get fingertips and bases
-            thumb_tip = hand_lms.landmark[4]
-            index_tip = hand_lms.landmark[8]
-            middle_tip = hand_lms.landmark[12]
-            ring_tip = hand_lms.landmark[16]
-            pinky_tip = hand_lms.landmark[20]
-            
-            # Get palm base (wrist)
-            wrist = hand_lms.landmark[0]
-            
-            # Check if all fingers are extended (tips are above bases)
-            fingers_extended = (
-                index_tip.y < hand_lms.landmark[6].y and  # Index
-                middle_tip.y < hand_lms.landmark[10].y and  # Middle
-                ring_tip.y < hand_lms.landmark[14].y and  # Ring
-                pinky_tip.y < hand_lms.landmark[18].y  # Pinky
-            )
-            
-            if fingers_extended:
-                if mode_switch_start_time is None:
-                    mode_switch_start_time = time.time()
-                elif time.time() - mode_switch_start_time >= mode_switch_threshold:
-                    # Switch mode
-                    current_mode = (current_mode + 1) % 3
-                    mode_switch_start_time = None
-                    print(f"Switched to mode: {['KEYBOARD', 'TRACKPAD', 'EMOJI'][current_mode]}")
-            else:
-                mode_switch_start_time = None
+        is_idle = idle is not None and idle.idle
+        if HEADLESS:
+            # Output only goes to event subscribers
+            pass
+        elif is_idle:
+            # No hand, so nothing in the HUD can have changed: show the camera with a badge only
+            img = packet.img
+            cv2.putText(img, "IDLE - show a hand to start", (50, 50), cv2.FONT_HERSHEY_PLAIN, 2, (0, 255, 255), 2)
+            cv2.imshow(WINDOW_NAME, img)
+        elif frame_count % render_interval == 0:
+            img = app.render(packet.img)
+
+            if show_profiler:
+                profiler.draw_overlay(img)
+
+            # Display
+            with profiler.measure("imshow"):
+                cv2.imshow(WINDOW_NAME, img)
+        if frame_count == 0:
+            startup.mark("first frame")
+            print(startup.report())
+        frame_count += 1
+
+        if HEADLESS:
+            key = 0xFF
         else:
-            mode_switch_start_time = None
-        
-        # Draw mode switch progress indicator
-        if mode_switch_start_time is not None:
-            progress = min(1.0, (time.time() - mode_switch_start_time) / mode_switch_threshold)
-            bar_width = int(200 * progress)
-            cv2.rectangle(img, (540, 20), (740, 40), (50, 50, 50), cv2.FILLED)
-            cv2.rectangle(img, (540, 20), (540 + bar_width, 40), (0, 255, 255), cv2.FILLED)
-            cv2.putText(img, "SWITCHING MODE...", (545, 35), cv2.FONT_HERSHEY_PLAIN, 1, (255, 255, 255), 1)
-        
-
-        if tracker.results.multi_hand_landmarks:
-            for hand_idx, hand_lms in enumerate(tracker.results.multi_hand_landmarks):
-                if hand_idx not in hands_state:
-                    hands_state[hand_idx] = {'prev_x': 0, 'prev_y': 0, 'clicked': False, 'last_click_time': 0}
-                
-                state = hands_state[hand_idx]
-                
-                # Get landmarks
-                h, w, c = img.shape
-                lm_list = []
-                for id, lm in enumerate(hand_lms.landmark):
-                    cx, cy = int(lm.x * w), int(lm.y * h)
-                    lm_list.append([id, cx, cy])
-                
-                if lm_list:
-                    raw_x8, raw_y8 = lm_list[8][1], lm_list[8][2]
-                    x4, y4 = lm_list[4][1], lm_list[4][2]
-                    
-                    # Smoothing
-                    if state['prev_x'] == 0: state['prev_x'], state['prev_y'] = raw_x8, raw_y8
-                    
-                    curr_x = state['prev_x'] + (raw_x8 - state['prev_x']) / smoothing_factor
-                    curr_y = state['prev_y'] + (raw_y8 - state['prev_y']) / smoothing_factor
-                    
-                    x8, y8 = int(curr_x), int(curr_y)
-                    state['prev_x'], state['prev_y'] = curr_x, curr_y
-                    
-                    cursors_to_draw.append((x8, y8))
-                    
-                    # MODE-SPECIFIC LOGIC
-                    if current_mode == MODE_KEYBOARD:
-                        # Magnetic Key Logic
-                        closest_button = None
-                        min_dist = 10000
-                        
-                        for button in keyboard.button_list:
-                            bx, by = button.pos
-                            bw, bh = button.size
-                            cx_key, cy_key = bx + bw // 2, by + bh // 2
-                            dist_to_key = math.hypot(x8 - cx_key, y8 - cy_key)
-                            
-                            if dist_to_key < 60 and dist_to_key < min_dist:
-                                min_dist = dist_to_key
-                                closest_button = button
-                        
-                        if closest_button:
-                            hovered_button = closest_button
-                        
-                        # Click Logic
-                        if hovered_button:
-                            button = hovered_button
-                            length = math.hypot(x8 - x4, y8 - y4)
-                            current_time = time.time()
-                            
-                            if length < 30:
-                                if not state['clicked'] and (current_time - state['last_click_time'] > 0.2):
-                                    clicked_button = button
-                                    state['clicked'] = True
-                                    state['last_click_time'] = current_time
-                                    os.system('afplay /System/Library/Sounds/Tink.aiff &')
-                                    
-                                    try:
-                                        if button.text == "SPACE":
-                                            final_text += " "
-                                            keyboard_controller.press(Key.space)
-                                            keyboard_controller.release(Key.space)
-                                        elif button.text == "ENTER":
-                                            final_text += "\n"
-                                            keyboard_controller.press(Key.enter)
-                                            keyboard_controller.release(Key.enter)
-                                        elif button.text == "BACK":
-                                            final_text = final_text[:-1]
-                                            keyboard_controller.press(Key.backspace)
-                                            keyboard_controller.release(Key.backspace)
-                                        elif button.text == "SHIFT":
-                                            is_shift = not is_shift
-                                        else:
-                                            char_to_type = button.text
-                                            if not is_shift:
-                                                char_to_type = char_to_type.lower()
-                                            final_text += char_to_type
-                                            keyboard_controller.press(char_to_type)
-                                            keyboard_controller.release(char_to_type)
-                                    except Exception as e:
-                                        print(f"Error: {e}")
-                                        
-                            elif length > 40:
-                                state['clicked'] = False
-                    
-                    elif current_mode == MODE_TRACKPAD:
-                        # Trackpad Mode: Control mouse cursor
-                        # Map hand position to screen coordinates
-                        screen_x = int(x8 * 1920 / 1280)  # Adjust to screen resolution
-                        screen_y = int(y8 * 1080 / 720)
-                        
-                        mouse_controller.position = (screen_x, screen_y)
-                        
-                        # Click detection
-                        length = math.hypot(x8 - x4, y8 - y4)
-                        current_time = time.time()
-                        
-                        if length < 30:
-                            if not state['clicked'] and (current_time - state['last_click_time'] > 0.2):
-                                mouse_controller.click(Button.left)
-                                state['clicked'] = True
-                                state['last_click_time'] = current_time
-                                os.system('afplay /System/Library/Sounds/Tink.aiff &')
-                        elif length > 40:
-                            state['clicked'] = False
-                    
-                    elif current_mode == MODE_EMOJI:
-                        # Emoji Mode
-                        emoji_hovered = emoji_panel.get_hovered_button(x8, y8)
-                        if emoji_hovered:
-                            hovered_button = emoji_hovered
-                        
-                        length = math.hypot(x8 - x4, y8 - y4)
-                        current_time = time.time()
-                        
-                        if length < 30:
-                            if not state['clicked'] and (current_time - state['last_click_time'] > 0.2):
-                                result = emoji_panel.check_click(x8, y8)
-                                if result:
-                                    print(f"Copied to clipboard: {result}")
-                                    final_text += result
-                                state['clicked'] = True
-                                state['last_click_time'] = current_time
-                                os.system('afplay /System/Library/Sounds/Tink.aiff &')
-                        elif length > 40:
-                            state['clicked'] = False
-
-
-        # Draw mode-specific UI
-        if current_mode == MODE_KEYBOARD:
-            img = keyboard.draw_keyboard(img, hovered_button, clicked_button)
-            
-            if is_shift:
-                cv2.putText(img, "SHIFT ON", (1100, 100), cv2.FONT_HERSHEY_PLAIN, 2, (0, 255, 255), 2)
-            
-            # Display Output Text
-            cv2.rectangle(img, (50, 600), (1230, 700), (0, 0, 0), cv2.FILLED)
-            cv2.rectangle(img, (50, 600), (1230, 700), (255, 255, 0), 2)
-            cv2.putText(img, final_text[-50:], (60, 675), cv2.FONT_HERSHEY_PLAIN, 4, (255, 255, 255), 4)
-        
-        elif current_mode == MODE_TRACKPAD:
-            # Draw trackpad indicator
-            cv2.rectangle(img, (50, 50), (350, 150), (0, 0, 0), cv2.FILLED)
-            cv2.rectangle(img, (50, 50), (350, 150), (0, 255, 255), 2)
-            cv2.putText(img, "TRACKPAD MODE", (60, 90), cv2.FONT_HERSHEY_PLAIN, 2, (0, 255, 255), 2)
-            cv2.putText(img, "Pinch to Click", (60, 120), cv2.FONT_HERSHEY_PLAIN, 1.5, (255, 255, 255), 1)
-        
-        elif current_mode == MODE_EMOJI:
-            img = emoji_panel.draw_panel(img, hovered_button, clicked_button)
-            
-            # Show clipboard hint
-            cv2.rectangle(img, (600, 50), (1100, 100), (0, 0, 0), cv2.FILLED)
-            cv2.putText(img, "Copied: " + final_text[-10:], (610, 80), cv2.FONT_HERSHEY_PLAIN, 2, (0, 255, 0), 2)
-        
-        # Draw mode indicator
-        mode_names = ["KEYBOARD", "TRACKPAD", "EMOJI"]
-        mode_colors = [(255, 200, 0), (0, 255, 255), (255, 0, 255)]
-        cv2.rectangle(img, (20, 20), (220, 60), (0, 0, 0), cv2.FILLED)
-        cv2.rectangle(img, (20, 20), (220, 60), mode_colors[current_mode], 2)
-        cv2.putText(img, mode_names[current_mode], (30, 50), cv2.FONT_HERSHEY_PLAIN, 2, mode_colors[current_mode], 2)
-        
-        # Re-draw cursors on top
-        for cx, cy in cursors_to_draw:
-            cv2.circle(img, (cx, cy), 8, (255, 0, 255), cv2.FILLED)
-
-        # Display
-        cv2.imshow("Air Keyboard V4", img)
-
-        if cv2.waitKey(1) & 0xFF == ord('q'):
+            with profiler.measure("waitKey"):
+                key = cv2.waitKey(1) & 0xFF
+        # Displayed; the frame buffer goes back to the capture pool
+        pipeline.release(packet)
+        profiler.tick()
+        profiler.maybe_export()
+
+        if quality and not is_idle:
+            # Throughput is bounded by the slower of inference and this thread
+            stage_time = max(packet.inference_duration, time.perf_counter() - work_start)
+            settings = quality.update(stage_time)
+            if settings:
+                pipeline.request_settings(input_scale=settings["input_scale"],
+                                          model_complexity=settings["model_complexity"],
+                                          max_hands=settings["max_hands"])
+                render_interval = settings["render_interval"]
+                print(f"Quality level {quality.level}: {settings}")
+
+        if key == ord('q'):
             break
+        if key == ord('p'):
+            show_profiler = not show_profiler
+        if key == ord('l'):
+            app.next_layout()
 
-    cap.release()
-    cv2.destroyAllWindows()
+    pipeline.stop()
+    print(f"Frame buffers: {pipeline.allocation_stats()}")
+    if idle:
+        print(f"Idle mode: {idle.stats()}")
+    output.close()
+    if server:
+        print(f"Event server: {server.stats()}")
+        server.stop()
+    if recorder:
+        recorder.close()
+    for cap in caps:
+        cap.release()
+    if not HEADLESS:
+        cv2.destroyAllWindows()
 
 if __name__ == "__main__":
     main()
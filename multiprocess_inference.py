@@ -0,0 +1,413 @@
+"""
+Multi-process inference for multi-camera (or multi-core single-camera) setups.
+
+Capture threads in the main process write frames into shared-memory rings;
+worker processes, each with its own HandTracker, run MediaPipe on a ring
+slot and send back only the landmark arrays. With several cameras, a fusion
+stage keeps the best view of each hand and maps it into the primary
+camera's frame. MultiProcessPipeline has the same read()/release() interface
+as pipeline.Pipeline, so main() drives either one.
+"""
+import multiprocessing
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from hand_tracker import HandLandmarks
+from pipeline import DroppingQueue, FramePacket
+
+# Palm-center landmarks used to tell unlabelled hands apart across views
+PALM = [0, 5, 17]
+
+
+class SharedFrameRing:
+    """
+    `slots` frames of one camera in a single shared-memory block.
+
+    The owning process hands out free slots to its capture thread and takes
+    them back via release(view), which is what FramePacket.release() calls.
+    When no slot is free the newest frame is dropped rather than waited for.
+    """
+
+    def __init__(self, shape, slots=4, name=None):
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.frame_bytes = int(np.prod(self.shape))
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=self.frame_bytes * slots)
+        else:
+            # Spawned workers share the parent's resource tracker, so only the owner unlinks
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.frames = np.ndarray((slots,) + self.shape, np.uint8, buffer=self.shm.buf)
+        self.base = self.frames.__array_interface__["data"][0]
+
+        self.free = queue.Queue()
+        if self.owner:
+            for slot in range(slots):
+                self.free.put(slot)
+        self.dropped = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def acquire(self):
+        try:
+            return self.free.get_nowait()
+        except queue.Empty:
+            self.dropped += 1
+            return None
+
+    def release_slot(self, slot):
+        self.free.put(slot)
+
+    def release(self, view):
+        self.release_slot((view.__array_interface__["data"][0] - self.base) // self.frame_bytes)
+
+    def close(self):
+        self.frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def inference_worker(ring_name, shape, slots, tasks, results, tracker_kwargs, draw, tracker_factory=None):
+    """Worker process: run a HandTracker on ring slots named by `tasks` until a None task arrives."""
+    if tracker_factory is None:
+        from hand_tracker import HandTracker as tracker_factory
+    ring = SharedFrameRing(shape, slots, name=ring_name)
+    tracker = tracker_factory(**tracker_kwargs)
+    tracker.warm_up((shape[1], shape[0]))
+    settings_version = 0
+    results.put(None)  # ready: model loaded and warmed up
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            cam, slot, frame_id, capture_time, (version, settings) = task
+            if version != settings_version:
+                tracker.request_settings(**settings)
+                settings_version = version
+
+            start = time.perf_counter()
+            tracker.find_hands(ring.frames[slot], draw=draw)
+            duration = time.perf_counter() - start
+            lm = tracker.landmarks
+            n = lm.count
+            results.put((cam, slot, frame_id, capture_time, duration,
+                         lm.normalized[:n].copy(), lm.handedness[:n].copy(), lm.scores[:n].copy()))
+    finally:
+        ring.close()
+
+
+class ViewFusion:
+    """
+    Merges the latest landmarks of every camera into one set for the primary camera.
+
+    Each hand is taken from whichever view detected it with the highest
+    score; views are matched by handedness, or by palm position when
+    handedness is unknown. `homographies` map each camera's normalized x, y
+    into the primary camera's (identity when cameras are co-located).
+    """
+
+    def __init__(self, n_cameras, max_hands=2, frame_size=(1280, 720), homographies=None, max_skew=0.05,
+                 match_distance=0.15):
+        self.max_hands = max_hands
+        self.frame_size = frame_size
+        self.homographies = homographies or [None] * n_cameras
+        self.max_skew = max_skew
+        self.match_distance = match_distance
+        self.views = [None] * n_cameras
+
+    def update(self, cam, capture_time, normalized, handedness, scores):
+        h = self.homographies[cam]
+        if h is not None and len(normalized):
+            normalized = normalized.copy()
+            xy = cv2.perspectiveTransform(normalized[:, :, :2].reshape(-1, 1, 2).astype(np.float32), np.asarray(h, np.float32))
+            normalized[:, :, :2] = xy.reshape(len(normalized), -1, 2)
+        self.views[cam] = (capture_time, normalized, handedness, scores)
+
+    def same_hand(self, hand_a, norm_a, hand_b, norm_b):
+        if hand_a >= 0 and hand_b >= 0:
+            return hand_a == hand_b
+        palm_a = norm_a[PALM, :2].mean(axis=0)
+        palm_b = norm_b[PALM, :2].mean(axis=0)
+        return np.linalg.norm(palm_a - palm_b) < self.match_distance
+
+    def fuse(self, capture_time):
+        candidates = []
+        for cam, view in enumerate(self.views):
+            if view is None or abs(view[0] - capture_time) > self.max_skew:
+                continue
+            _, normalized, handedness, scores = view
+            for i in range(len(normalized)):
+                candidates.append((-float(scores[i]), cam, int(handedness[i]), normalized[i], float(scores[i])))
+        candidates.sort(key=lambda c: (c[0], c[1]))
+
+        out = HandLandmarks(self.max_hands)
+        for _, cam, hand, norm, score in candidates:
+            n = out.count
+            if n == self.max_hands:
+                break
+            if any(self.same_hand(hand, norm, int(out.handedness[j]), out.normalized[j]) for j in range(n)):
+                continue
+            out.normalized[n] = norm
+            out.handedness[n] = hand
+            out.scores[n] = score
+            out.count = n + 1
+
+        w, h = self.frame_size
+        np.multiply(out.normalized[:out.count], np.array([w, h, w], np.float32), out=out.pixels[:out.count])
+        return out
+
+
+class CameraCapture(threading.Thread):
+    """Reads one camera into free ring slots and queues them for the inference workers."""
+
+    def __init__(self, cam, cap, ring, tasks, pipeline, flip=True, idle=None):
+        super().__init__(daemon=True)
+        self.idle = idle
+        self.cam = cam
+        self.cap = cap
+        self.ring = ring
+        self.tasks = tasks
+        self.pipeline = pipeline
+        self.flip = flip
+        self.stop_event = threading.Event()
+        self.failed = False
+        self.read_buffer = None
+        self.resized = None  # only used if the camera delivers another size than it reported
+        self.frame_count = 0
+
+    def run(self):
+        while not self.stop_event.is_set():
+            if self.idle is not None and not self.idle.should_process(time.time(), self.cam):
+                if not self.cap.grab():
+                    self.failed = True
+                    break
+                continue
+            success, self.read_buffer = self.cap.read(self.read_buffer)
+            if not success:
+                self.failed = True
+                break
+            capture_time = time.time()
+            source = self.fit_to_ring(self.read_buffer)
+            if source is None:
+                self.failed = True
+                break
+
+            slot = self.ring.acquire()
+            if slot is None:
+                continue
+            frame = self.ring.frames[slot]
+            if self.flip:
+                cv2.flip(source, 1, dst=frame)
+            else:
+                frame[:] = source
+
+            self.pipeline.task_started()
+            self.tasks.put((self.cam, slot, self.frame_count, capture_time, self.pipeline.settings))
+            self.frame_count += 1
+
+    def fit_to_ring(self, img):
+        """
+        The frame as it must be written to a ring slot: resized if the camera
+        delivers another size than cap.get() reported (otherwise cv2.flip would
+        allocate a new array and leave the slot unwritten), None if it cannot be used.
+        """
+        if img.shape == self.ring.shape:
+            return img
+        if img.shape[2:] != self.ring.shape[2:]:
+            print(f"Error: camera {self.cam} delivers {img.shape} frames, expected {self.ring.shape}")
+            return None
+        if self.resized is None:
+            print(f"Warning: camera {self.cam} delivers {img.shape[1]}x{img.shape[0]} frames, "
+                  f"not the reported {self.ring.shape[1]}x{self.ring.shape[0]}; resizing")
+        h, w = self.ring.shape[:2]
+        self.resized = cv2.resize(img, (w, h), dst=self.resized)
+        return self.resized
+
+
+class MultiProcessPipeline:
+    """
+    Capture -> multi-process inference -> fusion -> render.
+
+    `caps` are opened cv2.VideoCapture objects, the first being the primary
+    (displayed) camera. Each camera gets `workers_per_camera` worker
+    processes sharing its task queue; with one camera and several workers,
+    consecutive frames are processed in parallel and stale results dropped.
+    Such workers each see only every N-th frame, so their trackers run in
+    static mode without ROI tracking.
+    """
+
+    def __init__(self, caps, frame_size=(1280, 720), workers_per_camera=1, tracker_kwargs=None, flip=True,
+                 draw=True, homographies=None, queue_size=1, recorder=None, tracker_factory=None,
+                 startup_timeout=30.0, idle=None):
+        self.caps = list(caps)
+        self.workers_per_camera = workers_per_camera
+        self.tracker_kwargs = tracker_kwargs or {}
+        self.flip = flip
+        self.draw = draw
+        self.recorder = recorder
+        self.tracker_factory = tracker_factory
+        self.startup_timeout = startup_timeout
+        # Optional idle_mode.IdleController, throttling every camera while no hand is seen
+        self.idle = idle
+        self.shapes = [(int(cap.get(4)) or frame_size[1], int(cap.get(3)) or frame_size[0], 3) for cap in self.caps]
+        primary_size = (self.shapes[0][1], self.shapes[0][0])
+        self.fusion = ViewFusion(len(self.caps), self.tracker_kwargs.get("max_hands", 2), primary_size,
+                                 homographies=homographies)
+
+        # (version, settings) sent with every task so each worker applies changes once
+        self.settings = (0, {})
+        self.outstanding = 0
+        self.lock = threading.Lock()
+        self.last_frame_id = -1
+        self.stale_results = 0
+
+        self.result_queue = DroppingQueue(queue_size, on_drop=FramePacket.release)
+        self.rings = []
+        self.processes = []
+        self.captures = []
+        self.stop_event = threading.Event()
+
+    def start(self):
+        ctx = multiprocessing.get_context("spawn")
+        self.results = ctx.Queue()
+        self.task_queues = []
+        tracker_kwargs = self.tracker_kwargs
+        if self.workers_per_camera > 1:
+            # Consecutive frames go to different workers: frame-to-frame tracking state would be stale
+            tracker_kwargs = {**tracker_kwargs, "mode": True, "roi_tracking": False}
+        for cam, (cap, shape) in enumerate(zip(self.caps, self.shapes)):
+            # A slot per worker, one queued per worker, one being displayed and one being captured
+            ring = SharedFrameRing(shape, slots=2 * self.workers_per_camera + 2)
+            tasks = ctx.Queue()
+            self.rings.append(ring)
+            self.task_queues.append(tasks)
+            for _ in range(self.workers_per_camera):
+                process = ctx.Process(target=inference_worker, daemon=True,
+                                      args=(ring.name, shape, ring.slots, tasks, self.results,
+                                            tracker_kwargs, self.draw, self.tracker_factory))
+                process.start()
+                self.processes.append(process)
+            self.captures.append(CameraCapture(cam, cap, ring, tasks, self, flip=self.flip, idle=self.idle))
+
+        # Don't start capturing until every worker has loaded its model
+        self.wait_for_workers()
+
+        self.collector = threading.Thread(target=self.collect, daemon=True)
+        self.collector.start()
+        for capture in self.captures:
+            capture.start()
+
+    def wait_for_workers(self):
+        """Wait for every worker's ready signal; raises as soon as one exits, or gives up after startup_timeout."""
+        deadline = time.time() + self.startup_timeout
+        ready = 0
+        while ready < len(self.processes) and time.time() < deadline:
+            try:
+                self.results.get(timeout=0.1)
+                ready += 1
+            except queue.Empty:
+                dead = [process for process in self.processes if process.exitcode is not None]
+                if dead:
+                    for process in self.processes:
+                        process.terminate()
+                    for ring in self.rings:
+                        ring.close()
+                    raise RuntimeError(f"Inference worker exited during startup (exit code {dead[0].exitcode})")
+
+    def task_started(self):
+        with self.lock:
+            self.outstanding += 1
+
+    def request_settings(self, **settings):
+        """Forward quality settings to every worker's HandTracker, merged into those already requested."""
+        # Called from the main thread (quality) and the collector (idle mode)
+        with self.lock:
+            version, current = self.settings
+            self.settings = (version + 1, {**current, **settings})
+
+    def collect(self):
+        while not self.stop_event.is_set():
+            try:
+                result = self.results.get(timeout=0.1)
+            except queue.Empty:
+                if not any(c.is_alive() for c in self.captures) and self.outstanding == 0:
+                    break
+                continue
+            if result is None:
+                # Late ready signal from a slow-starting worker
+                continue
+            cam, slot, frame_id, capture_time, duration, normalized, handedness, scores = result
+            with self.lock:
+                self.outstanding -= 1
+
+            ring = self.rings[cam]
+            self.fusion.update(cam, capture_time, normalized, handedness, scores)
+            if cam != 0 or frame_id <= self.last_frame_id:
+                # Secondary views only feed fusion; late primary frames are stale
+                self.stale_results += cam == 0
+                ring.release_slot(slot)
+                continue
+            self.last_frame_id = frame_id
+
+            packet = FramePacket(frame_id, ring.frames[slot], capture_time, ring)
+            packet.landmarks = self.fusion.fuse(capture_time)
+            packet.inference_duration = duration
+            packet.inference_time = time.time()
+            if self.recorder is not None:
+                self.recorder.append(packet.landmarks, capture_time)
+            if self.idle is not None:
+                input_scale = self.settings[1].get("input_scale", 1.0)
+                settings = self.idle.update(packet.landmarks.count > 0, capture_time, input_scale)
+                if settings:
+                    self.request_settings(**settings)
+            self.result_queue.put(packet)
+        self.result_queue.close()
+
+    def read(self, timeout=None):
+        """Return the next processed FramePacket, or None if none is ready."""
+        return self.result_queue.get(timeout)
+
+    def release(self, packet):
+        packet.release()
+
+    @property
+    def failed(self):
+        return any(c.failed for c in self.captures)
+
+    def is_finished(self):
+        return self.result_queue.is_finished()
+
+    def dropped_frames(self):
+        return sum(r.dropped for r in self.rings) + self.result_queue.dropped + self.stale_results
+
+    def allocation_stats(self):
+        # Frames live in fixed shared-memory rings; nothing is allocated per frame
+        return {"rings": len(self.rings), "slots": sum(r.slots for r in self.rings),
+                "workers": len(self.processes), "dropped": self.dropped_frames()}
+
+    def stop(self):
+        for capture in self.captures:
+            capture.stop_event.set()
+        for capture in self.captures:
+            capture.join(timeout=1.0)
+        for tasks in self.task_queues:
+            for _ in range(self.workers_per_camera):
+                tasks.put(None)
+        for process in self.processes:
+            process.join(timeout=2.0)
+            if process.is_alive():
+                process.terminate()
+        self.stop_event.set()
+        self.collector.join(timeout=1.0)
+        for ring in self.rings:
+            ring.close()
@@ -0,0 +1,164 @@
+import collections
+import shutil
+import subprocess
+import threading
+import time
+
+import numpy as np
+
+from profiler import NULL_PROFILER
+
+try:
+    # Optional (see README): plays the click from memory instead of spawning a process
+    import simpleaudio
+except ImportError:
+    simpleaudio = None
+
+
+class ClickSound:
+    """
+    Key-click feedback, prepared once at startup.
+
+    With `simpleaudio` installed a short synthesized tick is kept in memory
+    and played in-process. Otherwise falls back to `afplay` on macOS (spawned
+    directly, no shell), or stays silent.
+    """
+
+    def __init__(self, path="/System/Library/Sounds/Tink.aiff", sample_rate=44100):
+        self.path = path
+        self.wave = None
+        self.player = None
+
+        if simpleaudio is not None:
+            t = np.arange(int(sample_rate * 0.03)) / sample_rate
+            tick = np.sin(2 * np.pi * 2200 * t) * np.exp(-t * 180)
+            pcm = (tick * 0.4 * 32767).astype(np.int16)
+            self.wave = simpleaudio.WaveObject(pcm.tobytes(), 1, 2, sample_rate)
+        else:
+            self.player = shutil.which("afplay")
+            print("Warning: simpleaudio is not installed; key clicks " +
+                  ("spawn afplay" if self.player else "are silent"))
+
+    def play(self):
+        if self.wave is not None:
+            self.wave.play()
+        elif self.player:
+            subprocess.Popen([self.player, self.path],
+                             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+class OutputDispatcher:
+    """
+    Runs output side effects (keys, mouse, sound, clipboard) on a worker thread.
+
+    Implements the same sink interface as the backend it wraps, so it can be
+    handed straight to AirKeyboard. Events execute in order; consecutive
+    mouse moves still waiting in the queue collapse into the latest one.
+    """
+
+    def __init__(self, backend, max_pending=256, profiler=None):
+        self.backend = backend
+        self.max_pending = max_pending
+        self.profiler = profiler or NULL_PROFILER
+
+        self.pending = collections.deque()
+        self.cond = threading.Condition()
+        self.closed = False
+
+        # Backpressure metrics
+        self.enqueued = 0
+        self.dispatched = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.errors = 0
+        self.max_depth = 0
+        self.lag = collections.deque(maxlen=300)
+
+        self.worker = threading.Thread(target=self.run, daemon=True)
+        self.worker.start()
+
+    # Sink interface
+
+    def tap_key(self, key):
+        self.submit("tap_key", key)
+
+    def move_mouse(self, x, y):
+        self.submit("move_mouse", x, y)
+
+    def click_mouse(self):
+        self.submit("click_mouse")
+
+    def play_click(self):
+        self.submit("play_click")
+
+    def copy_to_clipboard(self, text):
+        self.submit("copy_to_clipboard", text)
+
+    # Queue
+
+    def submit(self, method, *args):
+        now = time.perf_counter()
+        with self.cond:
+            if self.closed:
+                return
+            if method == "move_mouse" and self.pending and self.pending[-1][0] == "move_mouse":
+                self.pending[-1] = (method, args, self.pending[-1][2])
+                self.coalesced += 1
+                return
+
+            if len(self.pending) >= self.max_pending:
+                # Shed stale mouse moves first; never drop keys or clicks
+                for i, event in enumerate(self.pending):
+                    if event[0] == "move_mouse":
+                        del self.pending[i]
+                        self.dropped += 1
+                        break
+
+            self.pending.append((method, args, now))
+            self.enqueued += 1
+            self.max_depth = max(self.max_depth, len(self.pending))
+            self.cond.notify()
+
+    def run(self):
+        while True:
+            with self.cond:
+                while not self.pending and not self.closed:
+                    self.cond.wait()
+                if not self.pending:
+                    return
+                method, args, queued_at = self.pending.popleft()
+
+            start = time.perf_counter()
+            self.lag.append(start - queued_at)
+            try:
+                getattr(self.backend, method)(*args)
+            except Exception as e:
+                self.errors += 1
+                print(f"Error: {e}")
+            self.profiler.record("output", time.perf_counter() - start)
+            self.dispatched += 1
+
+    def depth(self):
+        with self.cond:
+            return len(self.pending)
+
+    def stats(self):
+        lag_ms = np.asarray(self.lag) * 1000
+        return {
+            "depth": self.depth(),
+            "max_depth": self.max_depth,
+            "enqueued": self.enqueued,
+            "dispatched": self.dispatched,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "lag_p50_ms": float(np.percentile(lag_ms, 50)) if len(lag_ms) else 0.0,
+            "lag_p99_ms": float(np.percentile(lag_ms, 99)) if len(lag_ms) else 0.0,
+        }
+
+    def close(self, timeout=1.0):
+        """Stop accepting events, flush what is queued and stop the worker."""
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        self.worker.join(timeout)
@@ -0,0 +1,210 @@
+import collections
+import threading
+import time
+
+import cv2
+
+from frame_pool import FramePool
+from profiler import NULL_PROFILER
+
+
+class FramePacket:
+    def __init__(self, frame_id, img, capture_time, pool=None):
+        self.frame_id = frame_id
+        self.img = img
+        self.capture_time = capture_time
+        self.pool = pool
+        self.results = None
+        self.landmarks = None
+        self.inference_time = None
+        self.inference_duration = 0.0
+
+    def release(self):
+        """Return the frame buffer to its pool; the packet's image must not be used afterwards."""
+        if self.pool is not None and self.img is not None:
+            self.pool.release(self.img)
+        self.img = None
+
+
+class DroppingQueue:
+    """Bounded queue that drops the oldest item instead of blocking the producer."""
+
+    def __init__(self, maxsize=1, on_drop=None):
+        self.maxsize = maxsize
+        self.on_drop = on_drop
+        self.items = collections.deque()
+        self.cond = threading.Condition()
+        self.closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self.cond:
+            if len(self.items) >= self.maxsize:
+                dropped = self.items.popleft()
+                self.dropped += 1
+                if self.on_drop is not None:
+                    self.on_drop(dropped)
+            self.items.append(item)
+            self.cond.notify()
+
+    def get(self, timeout=None):
+        """Return the oldest item, or None on timeout / when closed and empty."""
+        deadline = None if timeout is None else time.time() + timeout
+        with self.cond:
+            while not self.items and not self.closed:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    break
+                self.cond.wait(remaining)
+            if self.items:
+                return self.items.popleft()
+            return None
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def is_finished(self):
+        with self.cond:
+            return self.closed and not self.items
+
+
+class CaptureStage(threading.Thread):
+    """Reads the camera as fast as it delivers; only the latest frame is kept."""
+
+    def __init__(self, cap, output, flip=True, profiler=None, pool=None, idle=None):
+        super().__init__(daemon=True)
+        self.cap = cap
+        self.output = output
+        self.flip = flip
+        self.idle = idle
+        self.profiler = profiler or NULL_PROFILER
+        self.pool = pool or FramePool()
+        # Camera frames are decoded into this buffer and mirrored into a pooled one
+        self.read_buffer = None
+        self.stop_event = threading.Event()
+        self.failed = False
+        self.frame_count = 0
+
+    def run(self):
+        while not self.stop_event.is_set():
+            if self.idle is not None and not self.idle.should_process(time.time()):
+                # Idle: keep the camera drained without decoding frames nobody will look at
+                if not self.cap.grab():
+                    self.failed = True
+                    break
+                continue
+            with self.profiler.measure("capture"):
+                success, self.read_buffer = self.cap.read(self.read_buffer)
+            if not success:
+                self.failed = True
+                break
+            capture_time = time.time()
+
+            # Flip image for mirror view (straight into a pooled buffer)
+            img = self.pool.acquire(self.read_buffer.shape)
+            if self.flip:
+                with self.profiler.measure("flip"):
+                    cv2.flip(self.read_buffer, 1, dst=img)
+            else:
+                img[:] = self.read_buffer
+
+            self.output.put(FramePacket(self.frame_count, img, capture_time, self.pool))
+            self.frame_count += 1
+        self.output.close()
+
+
+class InferenceStage(threading.Thread):
+    """Runs the hand tracker on the freshest captured frame."""
+
+    def __init__(self, tracker, input_queue, output, draw=True, idle=None):
+        super().__init__(daemon=True)
+        self.tracker = tracker
+        self.input_queue = input_queue
+        self.output = output
+        self.draw = draw
+        self.idle = idle
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            packet = self.input_queue.get(timeout=0.1)
+            if packet is None:
+                if self.input_queue.is_finished():
+                    break
+                continue
+
+            start = time.perf_counter()
+            packet.img = self.tracker.find_hands(packet.img, draw=self.draw, timestamp=packet.capture_time)
+            packet.inference_duration = time.perf_counter() - start
+            packet.results = self.tracker.results
+            # Snapshot: the tracker refills its arrays on the next frame
+            packet.landmarks = self.tracker.landmarks.copy()
+            packet.inference_time = time.time()
+            if self.idle is not None:
+                settings = self.idle.update(packet.landmarks.count > 0, packet.capture_time, self.tracker.input_scale)
+                if settings:
+                    self.tracker.request_settings(**settings)
+            self.output.put(packet)
+        self.output.close()
+
+
+class Pipeline:
+    """
+    Capture -> inference -> render pipeline.
+
+    Capture and inference run on their own threads and hand frames over
+    through bounded dropping queues, so a slow stage skips stale frames
+    instead of queueing them. The render/UI stage is whoever calls read()
+    (normally the main thread, since cv2.imshow must stay there). An optional
+    idle_mode.IdleController throttles capture and inference while no hand is seen.
+    """
+
+    def __init__(self, cap, tracker, queue_size=1, flip=True, draw=True, profiler=None, idle=None):
+        # Frame buffers are recycled: dropped packets and packets passed to
+        # release() go back to the pool
+        self.pool = FramePool(size=2 * queue_size + 4)
+        self.tracker = tracker
+        self.capture_queue = DroppingQueue(queue_size, on_drop=FramePacket.release)
+        self.result_queue = DroppingQueue(queue_size, on_drop=FramePacket.release)
+        self.idle = idle
+        self.capture = CaptureStage(cap, self.capture_queue, flip=flip, profiler=profiler, pool=self.pool, idle=idle)
+        self.inference = InferenceStage(tracker, self.capture_queue, self.result_queue, draw=draw, idle=idle)
+
+    def start(self):
+        self.capture.start()
+        self.inference.start()
+
+    def read(self, timeout=None):
+        """Return the next processed FramePacket, or None if none is ready."""
+        return self.result_queue.get(timeout)
+
+    @property
+    def failed(self):
+        return self.capture.failed
+
+    def is_finished(self):
+        return self.result_queue.is_finished()
+
+    def release(self, packet):
+        """Hand a packet from read() back once it has been displayed."""
+        packet.release()
+
+    def request_settings(self, **settings):
+        self.tracker.request_settings(**settings)
+
+    def dropped_frames(self):
+        return self.capture_queue.dropped + self.result_queue.dropped
+
+    def allocation_stats(self):
+        """Frame-sized allocations so far; both counters stay flat in steady state."""
+        stats = self.pool.stats()
+        stats["scratch_allocations"] = self.tracker.scratch.allocations
+        return stats
+
+    def stop(self):
+        self.capture.stop_event.set()
+        self.inference.stop_event.set()
+        self.capture.join(timeout=1.0)
+        self.inference.join(timeout=1.0)
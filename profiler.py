@@ -0,0 +1,205 @@
+import collections
+import contextlib
+import csv
+import json
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+# Histogram bucket edges in milliseconds (last bucket is open-ended)
+HISTOGRAM_EDGES_MS = [0, 1, 2, 4, 8, 16, 33, 66, 133, float("inf")]
+
+
+class StageProfiler:
+    """
+    Rolling per-stage timings for the hot path.
+
+    Stages can be recorded from any thread (capture, inference, render).
+    Keeps the last `window` samples per stage for percentiles/histograms,
+    counts frames for FPS, and can draw a HUD or export periodic
+    snapshots to a JSON-lines or CSV file. Other components can add their
+    own metrics (queue depths, drop counts...) with add_source().
+    """
+
+    def __init__(self, window=300, export_path=None, export_interval=5.0):
+        self.window = window
+        self.samples = {}
+        self.frame_times = collections.deque(maxlen=window)
+        self.lock = threading.Lock()
+        self.sources = {}  # name -> (stats callback, HUD summary callback or None)
+
+        self.export_path = export_path
+        self.export_interval = export_interval
+        self.last_export = time.time()
+
+    def record(self, stage, seconds):
+        with self.lock:
+            if stage not in self.samples:
+                self.samples[stage] = collections.deque(maxlen=self.window)
+            self.samples[stage].append(seconds)
+
+    def add_source(self, name, stats, summary=None):
+        """
+        Include `stats()` (a dict of numbers) in JSON exports under "sources";
+        `summary(stats)`, if given, is a short string shown in the HUD.
+        """
+        self.sources[name] = (stats, summary)
+
+    def source_stats(self):
+        return {name: stats() for name, (stats, _) in self.sources.items()}
+
+    @contextlib.contextmanager
+    def measure(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def tick(self, now=None):
+        """Mark the end of a displayed frame."""
+        self.frame_times.append(time.perf_counter() if now is None else now)
+
+    def fps(self):
+        times = list(self.frame_times)
+        if len(times) < 2 or times[-1] <= times[0]:
+            return 0.0
+        return (len(times) - 1) / (times[-1] - times[0])
+
+    def stats(self):
+        """{stage: {count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}} over the rolling window."""
+        with self.lock:
+            snapshot = {stage: np.asarray(values) for stage, values in self.samples.items()}
+        report = {}
+        for stage, values in snapshot.items():
+            if not len(values):
+                continue
+            ms = values * 1000
+            p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+            report[stage] = {
+                "count": len(ms),
+                "mean_ms": float(ms.mean()),
+                "p50_ms": float(p50),
+                "p95_ms": float(p95),
+                "p99_ms": float(p99),
+                "max_ms": float(ms.max()),
+            }
+        return report
+
+    def histogram(self, stage):
+        """Counts per HISTOGRAM_EDGES_MS bucket over the rolling window."""
+        with self.lock:
+            values = np.asarray(self.samples.get(stage, ()))
+        counts, _ = np.histogram(values * 1000, bins=HISTOGRAM_EDGES_MS)
+        return counts.tolist()
+
+    def draw_overlay(self, img, origin=(1095, 440)):
+        x, y = origin
+        stats = self.stats()
+        lines = [f"FPS {self.fps():5.1f}"]
+        lines += [f"{stage[:10]:<10}{s['mean_ms']:6.1f}ms" for stage, s in stats.items()]
+        lines += [f"{name[:10]:<10}{summary(source())}" for name, (source, summary) in self.sources.items() if summary]
+
+        height = 20 * len(lines) + 10
+        cv2.rectangle(img, (x, y), (x + 180, y + height), (0, 0, 0), cv2.FILLED)
+        cv2.rectangle(img, (x, y), (x + 180, y + height), (0, 255, 255), 1)
+        for i, line in enumerate(lines):
+            cv2.putText(img, line, (x + 6, y + 20 + 20 * i), cv2.FONT_HERSHEY_PLAIN, 1,
+                        (0, 255, 255) if i == 0 else (255, 255, 255), 1)
+        return img
+
+    def maybe_export(self, now=None):
+        """Append a snapshot to export_path if export_interval has elapsed."""
+        if not self.export_path:
+            return False
+        now = time.time() if now is None else now
+        if now - self.last_export < self.export_interval:
+            return False
+        self.last_export = now
+        self.export(now)
+        return True
+
+    def export(self, now=None):
+        now = time.time() if now is None else now
+        stats = self.stats()
+        fps = self.fps()
+
+        if self.export_path.endswith(".csv"):
+            new_file = not os.path.exists(self.export_path)
+            with open(self.export_path, "a", newline="") as f:
+                writer = csv.writer(f)
+                if new_file:
+                    writer.writerow(["timestamp", "fps", "stage", "count", "mean_ms",
+                                     "p50_ms", "p95_ms", "p99_ms", "max_ms"])
+                for stage, s in stats.items():
+                    writer.writerow([f"{now:.3f}", f"{fps:.2f}", stage, s["count"], f"{s['mean_ms']:.3f}",
+                                     f"{s['p50_ms']:.3f}", f"{s['p95_ms']:.3f}", f"{s['p99_ms']:.3f}",
+                                     f"{s['max_ms']:.3f}"])
+        else:
+            record = {
+                "timestamp": now,
+                "fps": fps,
+                "stages": stats,
+                "histograms_ms": {stage: self.histogram(stage) for stage in stats},
+                "histogram_edges_ms": HISTOGRAM_EDGES_MS[:-1],
+                "sources": self.source_stats(),
+            }
+            with open(self.export_path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+
+
+class NullProfiler:
+    """Drop-in profiler that records nothing; the default when profiling is off."""
+
+    def record(self, stage, seconds):
+        pass
+
+    def measure(self, stage):
+        return contextlib.nullcontext()
+
+    def tick(self, now=None):
+        pass
+
+    def add_source(self, name, stats, summary=None):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class StartupTimer:
+    """
+    Wall-clock phases of application startup, relative to `origin`.
+
+    Phases may run concurrently on different threads, so each is reported
+    with its start and end offsets rather than as a running total.
+    """
+
+    def __init__(self, origin=None):
+        self.origin = time.perf_counter() if origin is None else origin
+        self.phases = []
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.mark(name, start)
+
+    def mark(self, name, start=None):
+        """Record a phase from `start` (default: origin) until now."""
+        end = time.perf_counter()
+        start = self.origin if start is None else start
+        with self.lock:
+            self.phases.append((name, start - self.origin, end - self.origin))
+
+    def report(self):
+        lines = ["Startup phases (ms):"]
+        for name, start, end in sorted(self.phases, key=lambda p: (p[1], p[2])):
+            lines.append(f"  {name:<12} {start * 1000:7.0f} -> {end * 1000:7.0f}  ({(end - start) * 1000:.0f})")
+        return "\n".join(lines)
@@ -0,0 +1,316 @@
+"""
+Headless replay and benchmark harness.
+
+Feeds a recorded video (through HandTracker) or a recorded landmark trace
+through the same gesture logic, hit-testing and HUD rendering as main(),
+with a stub output sink instead of pynput, and reports per-stage timings,
+FPS, latency percentiles and keystroke accuracy.
+
+    python replay.py session.mp4 --expected "hello world" --record session.npz
+    python replay.py session.npz --expected "hello world" --json
+"""
+import os
+
+# Suppress MediaPipe/TensorFlow logs
+os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
+
+import argparse
+import json
+import time
+
+import cv2
+import numpy as np
+
+from air_keyboard import AirKeyboard
+from hand_tracker import HandLandmarks, NUM_LANDMARKS
+from trace_store import TraceStoreReader, TraceStoreWriter
+
+
+class StubSink:
+    """Records AirKeyboard output instead of touching the desktop."""
+
+    def __init__(self):
+        self.events = []
+
+    def emit(self, kind, value=None):
+        self.events.append((kind, value, time.perf_counter()))
+
+    def tap_key(self, key):
+        self.emit("key", key)
+
+    def move_mouse(self, x, y):
+        self.emit("mouse_move", (x, y))
+
+    def click_mouse(self):
+        self.emit("mouse_click")
+
+    def play_click(self):
+        pass
+
+    def copy_to_clipboard(self, text):
+        self.emit("clipboard", text)
+
+
+class StageTimer:
+    def __init__(self):
+        self.samples = {}
+
+    def add(self, stage, seconds):
+        self.samples.setdefault(stage, []).append(seconds)
+
+    def summary(self):
+        report = {}
+        for stage, values in self.samples.items():
+            ms = np.asarray(values) * 1000
+            report[stage] = {
+                "mean_ms": float(ms.mean()),
+                "p50_ms": float(np.percentile(ms, 50)),
+                "p99_ms": float(np.percentile(ms, 99)),
+                "max_ms": float(ms.max()),
+            }
+        return report
+
+
+class TraceWriter:
+    """Collects per-frame landmarks from a video run and saves them as an .npz trace."""
+
+    def __init__(self, max_hands, frame_size):
+        self.max_hands = max_hands
+        self.frame_size = frame_size
+        self.timestamps = []
+        self.normalized = []
+        self.handedness = []
+        self.scores = []
+        self.counts = []
+
+    def append(self, landmarks, timestamp):
+        self.timestamps.append(timestamp)
+        self.normalized.append(landmarks.normalized[:self.max_hands].copy())
+        self.handedness.append(landmarks.handedness[:self.max_hands].copy())
+        self.scores.append(landmarks.scores[:self.max_hands].copy())
+        self.counts.append(landmarks.count)
+
+    def save(self, path, expected_text=None):
+        arrays = {
+            "timestamps": np.asarray(self.timestamps, np.float64),
+            "normalized": np.asarray(self.normalized, np.float32).reshape(-1, self.max_hands, NUM_LANDMARKS, 3),
+            "handedness": np.asarray(self.handedness, np.int8).reshape(-1, self.max_hands),
+            "scores": np.asarray(self.scores, np.float32).reshape(-1, self.max_hands),
+            "counts": np.asarray(self.counts, np.int32),
+            "frame_size": np.asarray(self.frame_size, np.int32),
+        }
+        if expected_text is not None:
+            arrays["expected_text"] = np.asarray(expected_text)
+        np.savez_compressed(path, **arrays)
+
+
+def iter_video(path, timer, tracker, flip=True, writer=None):
+    """Yield (img, landmarks, timestamp, frame_start) per video frame, timing capture, flip and inference."""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video '{path}'")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+    frame_idx = 0
+    read_buffer = frame = None
+    try:
+        while True:
+            t0 = time.perf_counter()
+            success, read_buffer = cap.read(read_buffer)
+            if not success:
+                break
+            t1 = time.perf_counter()
+            img = read_buffer
+            if flip:
+                # Same buffer reuse as pipeline.CaptureStage
+                if frame is None or frame.shape != read_buffer.shape:
+                    frame = np.empty_like(read_buffer)
+                img = cv2.flip(read_buffer, 1, dst=frame)
+            t2 = time.perf_counter()
+            # Video time, not processing time, so a recorded trace replays at the video's pace
+            timestamp = frame_idx / fps
+            img = tracker.find_hands(img, draw=True, timestamp=timestamp)
+            t3 = time.perf_counter()
+
+            timer.add("capture", t1 - t0)
+            timer.add("flip", t2 - t1)
+            timer.add("inference", t3 - t2)
+
+            if writer is not None:
+                writer.append(tracker.landmarks, timestamp)
+            frame_idx += 1
+            yield img, tracker.landmarks, timestamp, t0
+    finally:
+        cap.release()
+
+
+def iter_trace(path, timer):
+    """Yield (img, landmarks, timestamp, frame_start) per recorded frame over a blank canvas."""
+    with np.load(path) as trace:
+        w, h = (int(v) for v in trace["frame_size"])
+        timestamps = trace["timestamps"]
+        normalized = trace["normalized"]
+        handedness = trace["handedness"]
+        scores = trace["scores"]
+        counts = trace["counts"]
+
+    landmarks = HandLandmarks(normalized.shape[1])
+    scale = np.array([w, h, w], np.float32)
+    canvas = np.zeros((h, w, 3), np.uint8)
+
+    for i in range(len(timestamps)):
+        t0 = time.perf_counter()
+        n = int(counts[i])
+        landmarks.count = n
+        landmarks.normalized[:] = normalized[i]
+        landmarks.handedness[:] = handedness[i]
+        landmarks.scores[:] = scores[i]
+        np.multiply(landmarks.normalized[:n], scale, out=landmarks.pixels[:n])
+        canvas[:] = 0
+        timer.add("capture", time.perf_counter() - t0)
+        yield canvas, landmarks, float(timestamps[i]), t0
+
+
+def iter_store(reader, timer):
+    """Yield (img, landmarks, timestamp, frame_start) per frame of a memory-mapped trace store."""
+    w, h = reader.frame_size
+    canvas = np.zeros((h, w, 3), np.uint8)
+    frames = reader.iter_landmarks()
+    while True:
+        t0 = time.perf_counter()
+        try:
+            landmarks, timestamp = next(frames)
+        except StopIteration:
+            return
+        canvas[:] = 0
+        timer.add("capture", time.perf_counter() - t0)
+        yield canvas, landmarks, timestamp, t0
+
+
+def edit_distance(a, b):
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        prev = cur
+    return prev[-1]
+
+
+def run(frames, app, sink, timer, render=True):
+    """Drive `app` over `frames` and return a benchmark report."""
+    frame_latencies = []
+    key_latencies = []
+    n_frames = 0
+    start = time.perf_counter()
+
+    for img, landmarks, timestamp, frame_start in frames:
+        n_events = len(sink.events)
+
+        t0 = time.perf_counter()
+        app.update(landmarks, timestamp, now=timestamp)
+        t1 = time.perf_counter()
+        timer.add("logic", t1 - t0)
+
+        if render:
+            app.render(img)
+            timer.add("render", time.perf_counter() - t1)
+
+        frame_latencies.append(time.perf_counter() - frame_start)
+        for kind, value, emitted in sink.events[n_events:]:
+            if kind == "key":
+                key_latencies.append(emitted - frame_start)
+        n_frames += 1
+
+    elapsed = time.perf_counter() - start
+    frame_ms = np.asarray(frame_latencies or [0.0]) * 1000
+    key_ms = np.asarray(key_latencies or [0.0]) * 1000
+    return {
+        "frames": n_frames,
+        "elapsed_s": elapsed,
+        "fps": n_frames / elapsed if elapsed > 0 else 0.0,
+        "latency_p50_ms": float(np.percentile(frame_ms, 50)),
+        "latency_p99_ms": float(np.percentile(frame_ms, 99)),
+        "keystrokes": len(key_latencies),
+        "keystroke_latency_p50_ms": float(np.percentile(key_ms, 50)),
+        "keystroke_latency_p99_ms": float(np.percentile(key_ms, 99)),
+        "stages": timer.summary(),
+        "text": app.final_text,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded session headlessly and benchmark it.")
+    parser.add_argument("source", help="video file, .npz landmark trace, or trace store directory")
+    parser.add_argument("--expected", help="text the user meant to type, for keystroke accuracy")
+    parser.add_argument("--record", help="when replaying a video, save its landmarks to this .npz trace "
+                                         "(or trace store directory)")
+    parser.add_argument("--no-render", action="store_true", help="skip HUD rendering")
+    parser.add_argument("--no-flip", action="store_true", help="video is already mirrored")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    timer = StageTimer()
+    sink = StubSink()
+    writer = None
+    expected = args.expected
+
+    recorded_keys = None
+    if os.path.isdir(args.source):
+        reader = TraceStoreReader(args.source)
+        frame_size = reader.frame_size
+        recorded_keys = int((reader.events["kind"] == b"key").sum())
+        frames = iter_store(reader, timer)
+    elif args.source.endswith(".npz"):
+        with np.load(args.source) as trace:
+            frame_size = tuple(int(v) for v in trace["frame_size"])
+            if expected is None and "expected_text" in trace:
+                expected = str(trace["expected_text"])
+        frames = iter_trace(args.source, timer)
+    else:
+        from hand_tracker import HandTracker
+        tracker = HandTracker(detection_confidence=0.8, roi_tracking=True)
+        cap = cv2.VideoCapture(args.source)
+        frame_size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        cap.release()
+        if args.record and args.record.endswith(".npz"):
+            writer = TraceWriter(tracker.max_hands, frame_size)
+        elif args.record:
+            tracker.recorder = TraceStoreWriter(args.record, tracker.max_hands, frame_size)
+        frames = iter_video(args.source, timer, tracker, flip=not args.no_flip, writer=writer)
+
+    app = AirKeyboard(sink, frame_size=frame_size)
+    report = run(frames, app, sink, timer, render=not args.no_render)
+
+    if expected is not None:
+        report["expected"] = expected
+        errors = edit_distance(expected, report["text"])
+        report["keystroke_accuracy"] = 1.0 - errors / max(len(expected), 1)
+
+    if recorded_keys is not None:
+        report["recorded_keystrokes"] = recorded_keys
+
+    if writer is not None:
+        writer.save(args.record, expected)
+    elif args.record:
+        tracker.recorder.close()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"Frames: {report['frames']}  FPS: {report['fps']:.1f}")
+    print(f"Frame latency p50/p99: {report['latency_p50_ms']:.2f} / {report['latency_p99_ms']:.2f} ms")
+    print(f"Keystrokes: {report['keystrokes']}  latency p50/p99: "
+          f"{report['keystroke_latency_p50_ms']:.2f} / {report['keystroke_latency_p99_ms']:.2f} ms")
+    for stage, stats in report["stages"].items():
+        print(f"  {stage:<10} mean {stats['mean_ms']:7.2f} ms  p50 {stats['p50_ms']:7.2f}  p99 {stats['p99_ms']:7.2f}")
+    if recorded_keys is not None:
+        print(f"Keystrokes in the recorded session: {recorded_keys}")
+    print(f"Typed: {report['text']!r}")
+    if "keystroke_accuracy" in report:
+        print(f"Keystroke accuracy: {report['keystroke_accuracy'] * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import numpy as np
+
+
+def resample(points, n):
+    """Resample a polyline to n points evenly spaced along its length."""
+    points = np.asarray(points, np.float32).reshape(-1, 2)
+    seg = np.linalg.norm(np.diff(points, axis=0), axis=1)
+    dist = np.concatenate(([0.0], np.cumsum(seg)))
+    if dist[-1] <= 0:
+        return np.repeat(points[:1], n, axis=0)
+    t = np.linspace(0.0, dist[-1], n)
+    return np.stack([np.interp(t, dist, points[:, 0]), np.interp(t, dist, points[:, 1])], axis=1).astype(np.float32)
+
+
+def path_length(points):
+    return float(np.linalg.norm(np.diff(points, axis=0), axis=1).sum())
+
+
+class SwipeDecoder:
+    """
+    Shape-writing decoder: matches a finger trail against the key-center
+    polyline of every lexicon word.
+
+    Templates are resampled once at construction. Each decode prunes them by
+    start key, end key and path length, then scores the survivors in one
+    vectorized pass (mean point-to-point distance, plus a word-frequency prior).
+    """
+
+    def __init__(self, buttons, words, freqs, n_samples=32, key_radius=90, sigma=20.0, lm_weight=0.3):
+        self.n_samples = n_samples
+        self.key_radius = key_radius
+        self.sigma = sigma
+        self.lm_weight = lm_weight
+
+        # Single-character keys only; letters match case-insensitively
+        keys = [b for b in buttons if len(b.text) == 1]
+        self.key_centers = np.array([(b.pos[0] + b.size[0] / 2, b.pos[1] + b.size[1] / 2) for b in keys], np.float32)
+        key_of = {b.text.lower(): i for i, b in enumerate(keys)}
+
+        self.words = []
+        templates, starts, ends, log_freqs = [], [], [], []
+        for word, freq in zip(words, freqs):
+            if len(word) < 2 or any(c not in key_of for c in word):
+                continue
+            path = self.key_centers[[key_of[c] for c in word]]
+            self.words.append(word)
+            templates.append(resample(path, n_samples))
+            starts.append(key_of[word[0]])
+            ends.append(key_of[word[-1]])
+            log_freqs.append(np.log(max(int(freq), 1)))
+
+        self.templates = np.array(templates, np.float32).reshape(-1, n_samples, 2)
+        self.start_keys = np.array(starts, np.int32)
+        self.end_keys = np.array(ends, np.int32)
+        self.lengths = np.array([path_length(t) for t in self.templates], np.float32)
+        log_freqs = np.array(log_freqs, np.float32)
+        self.prior = log_freqs - (log_freqs.max() if len(log_freqs) else 0)
+
+    def near_keys(self, point):
+        return np.linalg.norm(self.key_centers - point, axis=1) < self.key_radius
+
+    def decode(self, trail, top_n=3):
+        """Most likely words for a trail of (x, y) points, best first."""
+        if len(trail) < 2 or not self.words:
+            return []
+        trail = resample(trail, self.n_samples)
+        length = path_length(trail)
+
+        # Prune by start/end key and overall path length before any distance work
+        candidates = self.near_keys(trail[0])[self.start_keys] & self.near_keys(trail[-1])[self.end_keys]
+        candidates &= np.abs(self.lengths - length) < 0.5 * length + self.key_radius
+        idx = np.flatnonzero(candidates)
+        if len(idx) == 0:
+            return []
+
+        dist = np.linalg.norm(self.templates[idx] - trail, axis=2).mean(axis=1)
+        score = -0.5 * (dist / self.sigma) ** 2 + self.lm_weight * self.prior[idx]
+        order = np.argsort(-score)[:top_n]
+        return [self.words[idx[i]] for i in order]
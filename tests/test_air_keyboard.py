@@ -0,0 +1,40 @@
+import numpy as np
+
+from air_keyboard import AirKeyboard, MODE_KEYBOARD
+from hand_tracker import HandLandmarks
+from test_gesture_engine import hand_points
+
+FRAME_SIZE = (1280, 720)
+
+
+class StubSink:
+    def __getattr__(self, name):
+        return lambda *args: None
+
+
+def frame(*hands):
+    landmarks = HandLandmarks(2)
+    landmarks.count = len(hands)
+    w, h = FRAME_SIZE
+    for i, (pts, handedness) in enumerate(hands):
+        landmarks.pixels[i] = pts
+        landmarks.normalized[i] = pts / np.array([w, h, w], np.float32)
+        landmarks.handedness[i] = handedness
+    return landmarks
+
+
+def test_open_palm_switches_mode_when_hand_rows_alternate():
+    app = AirKeyboard(StubSink(), frame_size=FRAME_SIZE)
+    palm = (hand_points((1, 1, 1, 1, 1), dx=-200), 0)
+    fist = (hand_points((0, 0, 0, 0, 0), dx=400), 1)
+    progress = []
+    for i in range(75):  # 2.5 s at 30 fps
+        hands = (palm, fist) if i % 2 == 0 else (fist, palm)
+        app.update(frame(*hands), i / 30, now=i / 30)
+        if app.current_mode != MODE_KEYBOARD:
+            break
+        progress.append(app.mode_switch_progress)
+    assert app.current_mode != MODE_KEYBOARD
+    assert i / 30 >= 2.0
+    # The hold bar follows the palm's hold instead of jumping between hands
+    assert None not in progress and progress == sorted(progress)
@@ -0,0 +1,80 @@
+import os
+
+import numpy as np
+import pytest
+
+from autocomplete import Autocomplete, WordIndex
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    rng = np.random.default_rng(0)
+    letters = list("abcdet'")
+    words = sorted({"".join(rng.choice(letters, rng.integers(1, 7))) for _ in range(600)} | {"café", "cafe"})
+    # Distinct frequencies, so the top-k order is unambiguous
+    freqs = dict(zip(words, rng.permutation(len(words)) * 10 + 1))
+    source = tmp_path / "words.txt"
+    source.write_text("# word count\n" + "".join(f"{w} {freqs[w]}\n" for w in words), encoding="utf-8")
+    index = WordIndex.load(str(source))
+    yield index, freqs
+    index.close()
+
+
+def naive_top_k(freqs, prefix, k):
+    matches = [w for w in freqs if w.startswith(prefix)]
+    return sorted(matches, key=lambda w: -freqs[w])[:k]
+
+
+def test_index_round_trips_words_and_frequencies(corpus):
+    index, freqs = corpus
+    assert index.size == len(freqs)
+    words = [index.word(i) for i in range(index.size)]
+    assert words == sorted(freqs, key=lambda w: w.encode("utf-8"))
+    assert [int(f) for f in index.freqs] == [freqs[w] for w in words]
+
+
+def test_prefix_ranges_match_a_naive_scan(corpus):
+    index, freqs = corpus
+    words = [index.word(i) for i in range(index.size)]
+    prefixes = {w[:n] for w in words for n in range(len(w) + 1)} | {"x", "tz", "caf", "café", "'"}
+    for prefix in prefixes:
+        lo, hi = index.prefix_range(prefix)
+        assert words[lo:hi] == [w for w in words if w.startswith(prefix)], prefix
+
+
+def test_incremental_suggestions_match_a_naive_scan(corpus):
+    index, freqs = corpus
+    complete = Autocomplete(index, k=3)
+    rng = np.random.default_rng(1)
+    text = ""
+    for _ in range(500):
+        if text and rng.random() < 0.3:
+            text = text[:-1]
+        else:
+            text += rng.choice(list("abcdet' x"))
+        prefix = complete.current_prefix(text)
+        assert complete.update(text) == (naive_top_k(freqs, prefix, 3) if prefix else []), text
+
+
+def test_completion_types_the_rest_of_the_word(corpus):
+    index, _ = corpus
+    complete = Autocomplete(index)
+    complete.update("Hello CAF")
+    assert complete.prefix == "caf"
+    assert complete.completion("café") == "é"
+    assert complete.completion("tea") == "tea"
+
+
+def test_stale_index_is_recompiled(tmp_path):
+    source = tmp_path / "words.txt"
+    source.write_text("alpha 5\n", encoding="utf-8")
+    index = WordIndex.load(str(source))
+    assert index.size == 1
+    index.close()
+    source.write_text("alpha 5\nbeta 3\n", encoding="utf-8")
+    idx = tmp_path / "words.idx"
+    old = idx.stat().st_mtime
+    os.utime(idx, (old - 10, old - 10))
+    index = WordIndex.load(str(source))
+    assert [index.word(i) for i in range(index.size)] == ["alpha", "beta"]
+    index.close()
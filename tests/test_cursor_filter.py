@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from cursor_filter import CursorFilterBank, ExponentialFilter, KalmanFilter, OneEuroFilter, create_filter
+
+FILTER_TYPES = [ExponentialFilter, OneEuroFilter, KalmanFilter]
+
+
+@pytest.mark.parametrize("filter_type", FILTER_TYPES)
+def test_first_sample_passes_through_and_still_input_stays_put(filter_type):
+    f = filter_type()
+    point = np.array([[320.0, 240.0]])
+    np.testing.assert_allclose(f.filter(point, 0.0), point)
+    for i in range(1, 30):
+        out = f.filter(point, i / 30)
+    np.testing.assert_allclose(out, point, atol=1e-6)
+
+
+@pytest.mark.parametrize("kind, params", [("exponential", {}), ("one_euro", {}),
+                                           # The default process noise favours low lag over smoothing
+                                           ("kalman", {"process_noise": 1e3})])
+def test_jitter_is_reduced_on_a_still_hand(kind, params):
+    rng = np.random.default_rng(0)
+    f = create_filter(kind, **params)
+    truth = np.array([[500.0, 300.0]])
+    raw = truth + rng.normal(0, 4.0, (300, 1, 2))
+    out = np.array([f.filter(z, i / 30) for i, z in enumerate(raw)])[50:]
+    assert np.std(out - truth) < 0.6 * np.std(raw[50:] - truth)
+
+
+@pytest.mark.parametrize("filter_type", [OneEuroFilter, KalmanFilter])
+def test_constant_velocity_is_tracked_and_extrapolated(filter_type):
+    f = filter_type()
+    velocity = np.array([[600.0, -300.0]])  # px/s
+    for i in range(120):
+        t = i / 60
+        out = f.filter(velocity * t, t)
+    future = velocity * (t + 0.05)
+    # Prediction 50 ms ahead lands closer to where the hand will be than the estimate itself
+    assert np.linalg.norm(f.predict(0.05) - future) < 0.5 * np.linalg.norm(out - future)
+
+
+def test_non_increasing_timestamps_do_not_update_the_one_euro_state():
+    f = OneEuroFilter()
+    f.filter(np.array([[0.0, 0.0]]), 1.0)
+    out = f.filter(np.array([[100.0, 100.0]]), 1.0)
+    np.testing.assert_allclose(out, [[0.0, 0.0]])
+
+
+def test_create_filter_rejects_unknown_kinds():
+    assert isinstance(create_filter("kalman"), KalmanFilter)
+    with pytest.raises(ValueError):
+        create_filter("median")
+
+
+def test_bank_keeps_one_filter_per_hand_and_prunes_inactive_hands():
+    bank = CursorFilterBank("exponential", landmark_ids=(8,), smoothing_factor=2)
+    points = np.zeros((21, 3))
+    points[8, :2] = (100, 100)
+    assert bank.filter(0, points, 0.0) == {8: (100.0, 100.0)}
+    points[8, :2] = (200, 200)
+    assert bank.filter(0, points, 0.1) == {8: (150.0, 150.0)}
+    # A new hand starts from its own first sample
+    assert bank.filter(1, points, 0.1) == {8: (200.0, 200.0)}
+    bank.prune([1])
+    assert list(bank.filters) == [1]
+
+
+def test_latency_prediction_uses_the_capture_delay():
+    bank = CursorFilterBank("exponential", landmark_ids=(8,), prediction="latency", smoothing_factor=1)
+    points = np.zeros((21, 3))
+    bank.filter(0, points, 0.0, now=0.0)
+    points[8, :2] = (10, 0)
+    # Moving 10 px per 0.1 s, shown 0.05 s after capture: 5 px ahead
+    x, y = bank.filter(0, points, 0.1, now=0.15)[8]
+    assert x == pytest.approx(15.0) and y == pytest.approx(0.0)
@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+
+from gesture_engine import GestureEngine
+from hand_tracker import HandLandmarks
+
+# Hand size (wrist to middle MCP) is 100 px, so pinch distances are in hundredths
+WRIST = (500, 500)
+
+
+def hand_points(extended=(1, 1, 1, 1, 1), pinch=None, dx=0):
+    """Pixel landmarks of a hand pointing up; `pinch` places the thumb tip that far (in hand sizes) from the index tip."""
+    pts = np.zeros((21, 3), np.float32)
+    pts[0, :2] = WRIST
+    pts[9, :2] = (500, 400)
+    pts[17, :2] = (560, 420)
+    # Index to pinky: PIP 150 px above the wrist, tip 250 px up when extended, back near the palm when curled
+    for finger, x in zip(range(1, 5), (460, 490, 520, 550)):
+        pip, tip = 4 * finger + 2, 4 * finger + 4
+        pts[pip, :2] = (x, 350)
+        pts[tip, :2] = (x, 250) if extended[finger] else (x, 440)
+    # Thumb, measured from the pinky MCP
+    pts[3, :2] = (420, 430)
+    pts[4, :2] = (360, 420) if extended[0] else (520, 440)
+    if pinch is not None:
+        pts[4, :2] = pts[8, :2] + (pinch * 100, 0)
+    pts[:, 0] += dx
+    return pts
+
+
+def frame(*hands, ids=None):
+    landmarks = HandLandmarks(2)
+    landmarks.count = len(hands)
+    for i, pts in enumerate(hands):
+        landmarks.pixels[i] = pts
+    if ids is not None:
+        landmarks.ids[:len(ids)] = ids
+    return landmarks
+
+
+def test_finger_states_and_patterns():
+    engine = GestureEngine()
+    result = engine.update(frame(hand_points((0, 0, 0, 0, 0)), hand_points((1, 1, 1, 1, 1), dx=300)), 0.0)
+    np.testing.assert_array_equal(result.extended, [[0, 0, 0, 0, 0], [1, 1, 1, 1, 1]])
+    fist, palm = result.gesture_index("fist"), result.gesture_index("open_palm")
+    assert result.matched[0, fist] and not result.matched[0, palm]
+    assert result.matched[1, palm] and not result.matched[1, fist]
+    point = engine.update(frame(hand_points((0, 1, 0, 0, 0))), 1.0)
+    assert point.is_triggered(0, "point")  # no hold time
+
+
+def test_pinch_hysteresis_edges():
+    engine = GestureEngine()
+    events = []
+    for t, distance in enumerate([0.5, 0.3, 0.2, 0.3, 0.34, 0.36, 0.3, 0.24]):
+        result = engine.update(frame(hand_points(pinch=distance)), float(t))
+        events.append((bool(result.pinched[0]), bool(result.clicked[0]), bool(result.released[0])))
+    assert events == [
+        (False, False, False),  # open
+        (False, False, False),  # between the thresholds, still open
+        (True, True, False),    # closes below "on"
+        (True, False, False),   # stays closed up to "off"
+        (True, False, False),
+        (False, False, True),   # reopens above "off"
+        (False, False, False),  # between the thresholds, still open
+        (True, True, False),
+    ]
+
+
+def test_pinch_clicks_are_debounced():
+    engine = GestureEngine()
+    closed, opened = hand_points(pinch=0.1), hand_points(pinch=0.5)
+    assert engine.update(frame(closed), 0.0).clicked[0]
+    engine.update(frame(opened), 0.05)
+    # Closing again within the 0.2 s debounce pinches without clicking
+    result = engine.update(frame(closed), 0.1)
+    assert result.pinched[0] and not result.clicked[0]
+    engine.update(frame(opened), 0.2)
+    assert engine.update(frame(closed), 0.35).clicked[0]
+
+
+def test_held_gesture_fires_once_per_full_hold():
+    engine = GestureEngine()
+    palm = hand_points((1, 1, 1, 1, 1))
+    fired = []
+    for t in np.arange(0.0, 4.5, 0.5):
+        result = engine.update(frame(palm), float(t))
+        fired.append(result.is_triggered(0, "open_palm"))
+        if t == 1.0:
+            assert result.hold_progress(0, "open_palm") == pytest.approx(0.5)
+    # Fires after 2 s, then re-arms and needs another full 2 s
+    assert [t for t, f in zip(np.arange(0.0, 4.5, 0.5), fired) if f] == [2.0, 4.0]
+
+
+def test_hold_restarts_when_the_hand_disappears_or_the_pattern_breaks():
+    engine = GestureEngine()
+    palm, fist = hand_points((1, 1, 1, 1, 1)), hand_points((0, 0, 0, 0, 0))
+    engine.update(frame(palm), 0.0)
+    engine.update(frame(), 1.5)
+    assert engine.update(frame(palm), 2.0).hold_progress(0, "open_palm") == 0.0
+    engine.update(frame(fist), 3.0)
+    assert engine.update(frame(palm), 3.5).hold_progress(0, "open_palm") == 0.0
+    assert engine.update(frame(fist), 3.6).hold_progress(0, "open_palm") is None
+
+
+def test_pinch_state_follows_the_identity_slot_when_rows_reorder():
+    engine = GestureEngine()
+    pinched, opened = hand_points(pinch=0.1), hand_points(pinch=0.5, dx=300)
+    engine.update(frame(pinched, opened, ids=[0, 1]), 0.0)
+    # Same hands, reported in the other order: no new click, no release
+    result = engine.update(frame(opened, pinched, ids=[1, 0]), 1.0)
+    np.testing.assert_array_equal(result.pinched, [False, True])
+    assert not result.clicked.any() and not result.released.any()
+    engine.reset([0])
+    assert engine.update(frame(opened, pinched, ids=[1, 0]), 2.0).clicked[1]
@@ -0,0 +1,69 @@
+import numpy as np
+
+from hand_identity import HandIdentityTracker
+from hand_tracker import HandLandmarks
+
+LEFT, RIGHT = 0, 1
+
+
+def frame(*hands):
+    """Landmarks with every point of each hand at its (x, y, handedness)."""
+    landmarks = HandLandmarks(2)
+    landmarks.count = len(hands)
+    for i, (x, y, handedness) in enumerate(hands):
+        landmarks.normalized[i, :, :2] = (x, y)
+        landmarks.handedness[i] = handedness
+    return landmarks
+
+
+def test_identities_follow_hands_when_rows_reorder():
+    tracker = HandIdentityTracker()
+    first = frame((0.3, 0.5, LEFT), (0.7, 0.5, RIGHT))
+    assert sorted(tracker.assign(first, 0.0)) == [0, 1]
+    left_id, right_id = first.ids[:2]
+
+    swapped = frame((0.72, 0.5, RIGHT), (0.31, 0.5, LEFT))
+    assert tracker.assign(swapped, 0.03) == []
+    assert list(swapped.ids[:2]) == [right_id, left_id]
+
+
+def test_handedness_disagreement_is_penalized():
+    tracker = HandIdentityTracker(max_distance=0.25, handedness_penalty=0.15)
+    first = frame((0.4, 0.5, LEFT), (0.6, 0.5, RIGHT))
+    tracker.assign(first, 0.0)
+    left_id, right_id = first.ids[:2]
+    # The right hand is now closer to the left hand's last position; handedness keeps them apart
+    moved = frame((0.45, 0.5, RIGHT), (0.3, 0.5, LEFT))
+    assert tracker.assign(moved, 0.03) == []
+    assert list(moved.ids[:2]) == [right_id, left_id]
+
+
+def test_brief_dropouts_keep_the_slot_and_long_ones_reset_it():
+    tracker = HandIdentityTracker(keep_alive=0.3)
+    hand = frame((0.5, 0.5, RIGHT))
+    tracker.assign(hand, 0.0)
+    slot = hand.ids[0]
+
+    assert tracker.assign(frame(), 0.2) == []
+    assert tracker.active_ids() == [slot]
+    back = frame((0.52, 0.5, RIGHT))
+    assert tracker.assign(back, 0.25) == [] and back.ids[0] == slot
+
+    assert tracker.assign(frame(), 0.7) == [slot]
+    assert tracker.active_ids() == []
+
+
+def test_new_hands_take_free_slots_and_far_jumps_are_new_hands():
+    tracker = HandIdentityTracker(max_distance=0.25)
+    hand = frame((0.2, 0.5, -1))
+    tracker.assign(hand, 0.0)
+    slot = hand.ids[0]
+    # A second hand appears: it gets the other slot, which starts fresh
+    both = frame((0.21, 0.5, -1), (0.8, 0.5, -1))
+    assert tracker.assign(both, 0.03) == [1 - slot]
+    assert list(both.ids[:2]) == [slot, 1 - slot]
+    # The first hand vanishes and one appears far away: not matched to the waiting slot
+    jumped = frame((0.81, 0.5, -1), (0.6, 0.9, -1))
+    reset = tracker.assign(jumped, 0.06)
+    assert jumped.ids[0] == 1 - slot and reset == [slot]
+    assert np.unique(jumped.ids[:2]).size == 2
@@ -0,0 +1,63 @@
+import math
+
+import numpy as np
+
+from hit_test import HitTestIndex
+from keyboard_layout import Button
+
+
+def random_buttons(rng, n=60):
+    return [Button([int(x), int(y)], str(i), [int(w), int(h)])
+            for i, (x, y, w, h) in enumerate(zip(rng.integers(0, 1200, n), rng.integers(0, 700, n),
+                                                 rng.integers(30, 120, n), rng.integers(30, 120, n)))]
+
+
+def brute_nearest(buttons, x, y, radius):
+    best, best_dist = None, radius
+    for b in buttons:
+        dist = math.hypot(x - (b.pos[0] + b.size[0] // 2), y - (b.pos[1] + b.size[1] // 2))
+        if dist < best_dist:
+            best, best_dist = b, dist
+    return best
+
+
+def brute_hovered(buttons, x, y):
+    for b in buttons:
+        if b.pos[0] < x < b.pos[0] + b.size[0] and b.pos[1] < y < b.pos[1] + b.size[1]:
+            return b
+    return None
+
+
+def test_nearest_and_hovered_match_a_linear_scan():
+    rng = np.random.default_rng(0)
+    buttons = random_buttons(rng)
+    index = HitTestIndex(buttons, cell_size=20, magnet_radius=60)
+    for x, y in rng.uniform(-100, 1400, (5000, 2)):
+        assert index.nearest(x, y) is brute_nearest(buttons, x, y, 60)
+        assert index.hovered(x, y) is brute_hovered(buttons, x, y)
+
+
+def test_nearest_radius_is_capped_by_the_magnet_radius():
+    rng = np.random.default_rng(1)
+    buttons = random_buttons(rng)
+    index = HitTestIndex(buttons, magnet_radius=60)
+    for x, y in rng.uniform(0, 1300, (2000, 2)):
+        assert index.nearest(x, y, radius=25) is brute_nearest(buttons, x, y, 25)
+        assert index.nearest(x, y, radius=500) is brute_nearest(buttons, x, y, 60)
+
+
+def test_ties_resolve_to_the_first_button_in_layout_order():
+    a = Button([0, 0], "a", [40, 40])
+    b = Button([60, 0], "b", [40, 40])
+    index = HitTestIndex([a, b], magnet_radius=60)
+    # Exactly halfway between the two centers
+    assert index.nearest(50, 20) is a
+    assert HitTestIndex([b, a], magnet_radius=60).nearest(50, 20) is b
+
+
+def test_empty_index_and_points_outside_the_grid():
+    assert HitTestIndex([]).nearest(10, 10) is None
+    assert HitTestIndex([]).hovered(10, 10) is None
+    index = HitTestIndex([Button([100, 100], "a", [40, 40])], magnet_radius=60)
+    assert index.nearest(-1000, -1000) is None
+    assert index.candidates(5000, 5000) == ()
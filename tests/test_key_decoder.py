@@ -0,0 +1,159 @@
+import numpy as np
+import pytest
+
+from autocomplete import WordIndex
+from key_decoder import ALPHABET, OTHER, SPACE, CharNgram, KeyDecoder, char_index
+from keyboard_layout import KeyboardLayout
+
+
+class StubSink:
+    def __getattr__(self, name):
+        return lambda *args: None
+
+
+@pytest.fixture(scope="module")
+def lexicon():
+    index = WordIndex.load()
+    return [index.word(i) for i in range(index.size)], index.freqs
+
+
+@pytest.fixture(scope="module")
+def ngram(lexicon):
+    return CharNgram(*lexicon)
+
+
+def test_char_index_folds_case_whitespace_and_symbols():
+    assert char_index("a") == char_index("A") == 0
+    assert char_index(" ") == char_index("\n") == char_index("\t") == SPACE
+    assert char_index("7") == char_index(";") == OTHER
+
+
+def test_ngram_rows_are_normalized_distributions(ngram):
+    probs = np.exp(ngram.log_probs.astype(np.float64))
+    assert probs.shape == (OTHER + 1,) * ngram.order
+    np.testing.assert_allclose(probs.sum(axis=-1), 1.0, atol=1e-4)
+    assert np.all(probs > 0)
+
+
+def test_ngram_context_uses_last_characters(ngram):
+    # Only the last order - 1 characters matter, and case is folded
+    np.testing.assert_array_equal(ngram.next_log_probs("the quick th"), ngram.next_log_probs("TH"))
+    # Text shorter than the context is padded with spaces, like a word start
+    np.testing.assert_array_equal(ngram.next_log_probs(""), ngram.next_log_probs("hello\n "))
+    assert np.argmax(ngram.next_log_probs("q")) == ALPHABET.index("u")
+
+
+def key_center(button):
+    return button.pos[0] + button.size[0] // 2, button.pos[1] + button.size[1] // 2
+
+
+def simulate_typing(layout, decoder, lexicon, n_words=400, seed=0):
+    """
+    Type random lexicon words with noisy, systematically offset pinches.
+
+    Some words are followed by a digit or punctuation key, some by a typo
+    erased with BACK, and some lines end with ENTER. Returns (nearest-key
+    accuracy, decoder accuracy) overall and for keys outside the n-gram
+    (digits, punctuation, BACK, ENTER). Every tap trains the decoder with the
+    key that was meant, as kept or corrected taps do.
+    """
+    rng = np.random.default_rng(seed)
+    words, freqs = lexicon
+    keys = {b.text.lower(): b for b in layout.button_list if len(b.text) == 1}
+    keys[" "] = next(b for b in layout.button_list if b.text == "SPACE")
+    keys["\b"] = next(b for b in layout.button_list if b.text == "BACK")
+    keys["\n"] = next(b for b in layout.button_list if b.text == "ENTER")
+    symbols = [c for c in keys if len(c) == 1 and not c.isalpha() and c not in " \n"]
+    key_w, key_h = keys["a"].size
+    # Pinches land low and to the right of the fingertip target, and scatter
+    offset = np.array([0.15 * key_w, 0.2 * key_h])
+    sigma = np.array([0.3 * key_w, 0.3 * key_h])
+
+    probs = np.asarray(freqs, np.float64) / np.sum(freqs)
+    text = ""
+    hits = {"all": [0, 0, 0], "other": [0, 0, 0]}  # nearest hits, decoder hits, taps
+    for w in rng.choice(len(words), n_words, p=probs):
+        typed = words[w]
+        roll = rng.random()
+        if roll < 0.15:
+            typed += rng.choice(symbols)
+        elif roll < 0.25:
+            typed += rng.choice(list("qwertyuiop")) + "\b"
+        typed += "\n" if rng.random() < 0.1 else " "
+        for ch in typed:
+            if ch not in keys:
+                continue
+            meant = keys[ch]
+            x, y = (np.array(key_center(meant)) + offset + rng.normal(0, sigma)).round().astype(int)
+            nearest = layout.hit_index.nearest(x, y) is meant
+            decoded = decoder.decode(x, y, text) is meant
+            for group in ("all", "other") if ch in symbols or ch in "\b\n" else ("all",):
+                hits[group][0] += nearest
+                hits[group][1] += decoded
+                hits[group][2] += 1
+            decoder.learn(meant, x, y)
+            text = text[:-1] if ch == "\b" else text + ch
+    return {group: (n / taps, d / taps) for group, (n, d, taps) in hits.items()}
+
+
+def test_decoder_beats_nearest_key_on_noisy_taps(lexicon, ngram):
+    layout = KeyboardLayout("qwerty")
+    decoder = KeyDecoder(layout.button_list, ngram, radius=int(layout.magnet_radius * 1.5))
+    accuracy = simulate_typing(layout, decoder, lexicon)
+    nearest, decoded = accuracy["all"]
+    assert decoded > nearest + 0.1
+    # Keys the n-gram does not model are decoded at least as well as by nearest key
+    nearest, decoded = accuracy["other"]
+    assert decoded >= nearest
+
+
+@pytest.mark.parametrize("key, context", [("1", ""), ("2", "th"), (",", "hello"), ("/", "hello"),
+                                          (";", "the"), ("BACK", "th"), ("ENTER", "hello")])
+def test_pinches_inside_unmodelled_keys_are_kept(ngram, key, context):
+    layout = KeyboardLayout("qwerty")
+    decoder = KeyDecoder(layout.button_list, ngram, radius=int(layout.magnet_radius * 1.5))
+    button = next(b for b in layout.button_list if b.text == key)
+    x, y = key_center(button)
+    for dx, dy in [(0, 20), (0, -20), (20, 0), (-20, 0), (14, 14), (-14, -14)]:
+        assert decoder.decode(x + dx, y + dy, context) is button
+
+
+class TestLearnTap:
+    @pytest.fixture
+    def app(self, monkeypatch):
+        from air_keyboard import AirKeyboard
+        app = AirKeyboard(StubSink())
+        learned = []
+        monkeypatch.setattr(app.key_decoder(), "learn", lambda button, x, y: learned.append((button.text, x, y)))
+        app.learned = learned
+        return app
+
+    def key(self, app, text):
+        return next(b for b in app.keyboard.button_list if b.text == text)
+
+    def test_kept_tap_trains_its_key_once_confirmed(self, app):
+        app.press_key(self.key(app, "H"), (10, 20))
+        assert app.learned == []
+        app.press_key(self.key(app, "I"), (30, 40))
+        assert app.learned == [("H", 10, 20)]
+        assert app.final_text == "hi"
+
+    def test_erased_then_retyped_tap_trains_the_replacement_key(self, app):
+        app.press_key(self.key(app, "G"), (10, 20))
+        app.press_key(self.key(app, "BACK"), (0, 0))
+        app.press_key(self.key(app, "H"), (30, 40))
+        # The erased G tap is credited to H; the BACK tap itself is never learned
+        assert app.learned == [("H", 10, 20)]
+        app.press_key(self.key(app, "I"), (50, 60))
+        assert app.learned == [("H", 10, 20), ("H", 30, 40)]
+
+    def test_erased_tap_retyped_on_the_same_key_is_not_learned(self, app):
+        app.press_key(self.key(app, "H"), (10, 20))
+        app.press_key(self.key(app, "BACK"), (0, 0))
+        app.press_key(self.key(app, "H"), (30, 40))
+        assert app.learned == []
+
+    def test_layout_switch_drops_pending_taps(self, app):
+        app.press_key(self.key(app, "H"), (10, 20))
+        app.next_layout()
+        assert app.pending_tap is None and app.erased_tap is None
@@ -0,0 +1,22 @@
+import threading
+
+from multiprocess_inference import MultiProcessPipeline
+
+
+class StubCapture:
+    def get(self, prop):
+        return {3: 64, 4: 48}[prop]
+
+
+def test_settings_requests_from_several_threads_are_merged():
+    pipeline = MultiProcessPipeline([StubCapture()], frame_size=(64, 48))
+    # Quality steps from the main thread while idle mode changes the input scale from the collector
+    quality = threading.Thread(target=lambda: [pipeline.request_settings(model_complexity=0, max_hands=1)
+                                               for _ in range(1000)])
+    quality.start()
+    for _ in range(1000):
+        pipeline.request_settings(input_scale=0.5)
+    quality.join()
+    version, settings = pipeline.settings
+    assert version == 2000
+    assert settings == {"model_complexity": 0, "max_hands": 1, "input_scale": 0.5}
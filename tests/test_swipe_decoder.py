@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from autocomplete import WordIndex
+from keyboard_layout import KeyboardLayout
+from swipe_decoder import SwipeDecoder, path_length, resample
+
+
+@pytest.fixture(scope="module")
+def layout():
+    return KeyboardLayout("qwerty")
+
+
+@pytest.fixture(scope="module")
+def decoder(layout):
+    index = WordIndex.load()
+    return SwipeDecoder(layout.button_list, [index.word(i) for i in range(index.size)], index.freqs)
+
+
+def synthetic_trail(layout, word, rng, noise=6.0, steps=8):
+    """Finger trail through the key centers of `word`, densified and jittered like camera samples."""
+    keys = {b.text.lower(): b for b in layout.button_list if len(b.text) == 1}
+    centers = np.array([(keys[c].pos[0] + keys[c].size[0] / 2, keys[c].pos[1] + keys[c].size[1] / 2) for c in word])
+    points = [centers[0]]
+    for a, b in zip(centers[:-1], centers[1:]):
+        points.extend(a + (b - a) * s for s in np.linspace(0, 1, steps)[1:])
+    return [tuple(p) for p in np.array(points) + rng.normal(0, noise, (len(points), 2))]
+
+
+def test_resample_spaces_points_evenly_and_keeps_endpoints():
+    out = resample([(0, 0), (10, 0), (10, 30)], 5)
+    np.testing.assert_allclose(out, [(0, 0), (10, 0), (10, 10), (10, 20), (10, 30)])
+    assert path_length(out) == pytest.approx(40)
+    np.testing.assert_allclose(resample([(5, 5), (5, 5)], 3), [(5, 5)] * 3)
+
+
+@pytest.mark.parametrize("word", ["hello", "world", "keyboard", "typing", "great", "quick"])
+def test_synthetic_trails_decode_to_their_word(layout, decoder, word):
+    rng = np.random.default_rng(0)
+    assert decoder.decode(synthetic_trail(layout, word, rng))[0] == word
+
+
+def test_single_points_and_trails_off_the_keyboard_decode_to_nothing(layout, decoder):
+    assert decoder.decode([(10, 10)]) == []
+    assert decoder.decode([(-500, -500), (-400, -500)]) == []
+
+
+def test_words_with_characters_off_the_layout_are_skipped(layout):
+    decoder = SwipeDecoder(layout.button_list, ["ok", "a", "naïve"], [10, 10, 10])
+    assert decoder.words == ["ok"]
@@ -0,0 +1,45 @@
+import os
+
+import numpy as np
+
+from hand_tracker import HandLandmarks
+from trace_store import EVENT_DTYPE, TraceStoreReader, TraceStoreWriter
+
+
+def landmarks_for(frame, max_hands=2):
+    landmarks = HandLandmarks(max_hands)
+    landmarks.count = 1
+    landmarks.normalized[0] = frame / 100.0
+    landmarks.handedness[0] = frame % 2
+    landmarks.scores[0] = 0.5
+    return landmarks
+
+
+def test_reopen_after_partial_write_appends_aligned(tmp_path):
+    path = str(tmp_path / "trace")
+    writer = TraceStoreWriter(path)
+    for frame in range(3):
+        writer.append(landmarks_for(frame), frame * 0.1)
+        writer.append_event("key", frame * 0.1, text=str(frame))
+    writer.close()
+
+    # A crash mid-write: half a landmark record and half an event at the ends of the files
+    with open(os.path.join(path, "normalized.bin"), "ab") as f:
+        f.write(b"\0" * 100)
+    with open(os.path.join(path, "events.bin"), "ab") as f:
+        f.write(b"\0" * (EVENT_DTYPE.itemsize // 2))
+
+    writer = TraceStoreWriter(path)
+    assert writer.frames == 3
+    writer.append(landmarks_for(3), 0.3)
+    writer.append_event("key", 0.3, text="3")
+    writer.close()
+
+    reader = TraceStoreReader(path)
+    assert len(reader) == 4
+    np.testing.assert_allclose(reader.column("timestamps"), [0.0, 0.1, 0.2, 0.3])
+    np.testing.assert_allclose(reader.column("normalized")[:, 0], [np.full((21, 3), f / 100.0) for f in range(4)])
+    assert list(reader.events["kind"]) == [b"key"] * 4
+    assert list(reader.events["text"]) == [b"0", b"1", b"2", b"3"]
+    assert list(reader.events["frame"]) == [0, 1, 2, 3]
+    reader.close()
@@ -0,0 +1,283 @@
+import collections
+import os
+
+import cv2
+import numpy as np
+
+try:
+    # In requirements.txt: TrueType text and color emoji; without it glyphs fall back to Hershey fonts
+    from PIL import Image, ImageDraw, ImageFont
+except ImportError:
+    Image = ImageDraw = ImageFont = None
+    print("Warning: Pillow is not installed; emoji are drawn as placeholder boxes")
+
+TEXT_FONTS = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans.ttf",
+    "/System/Library/Fonts/Supplemental/Arial.ttf",
+    "/Library/Fonts/Arial.ttf",
+    "C:/Windows/Fonts/arial.ttf",
+]
+EMOJI_FONTS = [
+    "/usr/share/fonts/truetype/noto/NotoColorEmoji.ttf",
+    "/usr/share/fonts/noto/NotoColorEmoji.ttf",
+    "/System/Library/Fonts/Apple Color Emoji.ttc",
+    "C:/Windows/Fonts/seguiemj.ttf",
+]
+# Bitmap emoji fonts only load at their native strike size
+EMOJI_NATIVE_SIZES = [109, 160, 96, 64]
+
+
+def find_font(candidates):
+    for path in candidates:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def is_joiner(cp):
+    # Variation selectors, zero-width joiner, skin tones, combining marks
+    return 0xFE00 <= cp <= 0xFE0F or cp == 0x200D or 0x1F3FB <= cp <= 0x1F3FF or 0x0300 <= cp <= 0x036F
+
+
+def split_graphemes(text):
+    """Split text into user-visible glyphs, keeping emoji modifier/ZWJ sequences together."""
+    out = []
+    join_next = False
+    for ch in text:
+        cp = ord(ch)
+        if out and (join_next or is_joiner(cp)):
+            out[-1] += ch
+        else:
+            out.append(ch)
+        join_next = cp == 0x200D
+    return out
+
+
+def is_emoji(glyph):
+    cp = ord(glyph[0])
+    return cp >= 0x1F000 or 0x2600 <= cp < 0x27C0 or 0x2B00 <= cp < 0x2C00 or "\ufe0f" in glyph
+
+
+class GlyphCache:
+    """
+    Glyph atlas: every (glyph, color) pair is rasterized once into a fixed-size
+    cell of one preallocated array, with least-recently-used cells reused
+    when the atlas is full.
+
+    Cells hold premultiplied BGR plus alpha, so drawing a glyph is one
+    multiply-add over its cell no matter how it was rasterized.
+    """
+
+    def __init__(self, height=48, capacity=256, font_path=None, emoji_font_path=None):
+        self.height = height
+        self.cell_w = 2 * height
+        self.capacity = capacity
+
+        self.color = np.zeros((capacity, height, self.cell_w, 3), np.uint8)
+        self.alpha = np.zeros((capacity, height, self.cell_w), np.uint8)
+        self.widths = np.zeros(capacity, np.int32)
+        self.slots = collections.OrderedDict()  # (glyph, color) -> cell, oldest first
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.font = None
+        self.emoji_font = None
+        self.emoji_font_size = height
+        if ImageFont is not None:
+            font_path = font_path or find_font(TEXT_FONTS)
+            if font_path:
+                self.font = ImageFont.truetype(font_path, int(height * 0.8))
+            emoji_font_path = emoji_font_path or find_font(EMOJI_FONTS)
+            if emoji_font_path:
+                self.emoji_font = self.load_emoji_font(emoji_font_path)
+
+    def load_emoji_font(self, path):
+        for size in [int(self.height * 0.8)] + EMOJI_NATIVE_SIZES:
+            try:
+                font = ImageFont.truetype(path, size)
+            except OSError:
+                continue
+            self.emoji_font_size = size
+            return font
+        return None
+
+    def stats(self):
+        return {"glyphs": len(self.slots), "capacity": self.capacity, "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions}
+
+    def get(self, glyph, color=(255, 255, 255)):
+        """Atlas cell index for a glyph, rasterizing it on first use."""
+        key = (glyph, color)
+        cell = self.slots.get(key)
+        if cell is not None:
+            self.hits += 1
+            self.slots.move_to_end(key)
+            return cell
+
+        self.misses += 1
+        if len(self.slots) < self.capacity:
+            cell = len(self.slots)
+        else:
+            _, cell = self.slots.popitem(last=False)
+            self.evictions += 1
+        self.slots[key] = cell
+
+        bgra = self.rasterize(glyph, color)
+        h, w = bgra.shape[:2]
+        w = min(w, self.cell_w)
+        alpha = bgra[:, :w, 3:4].astype(np.uint16)
+        self.color[cell] = 0
+        self.alpha[cell] = 0
+        self.color[cell, :h, :w] = (bgra[:, :w, :3] * alpha // 255).astype(np.uint8)
+        self.alpha[cell, :h, :w] = alpha[..., 0]
+        self.widths[cell] = w
+        return cell
+
+    def rasterize(self, glyph, color):
+        """Render one glyph to a (height, width, 4) BGRA image."""
+        if glyph == "\n":
+            glyph = "\u21b5"
+        if self.emoji_font is not None and is_emoji(glyph):
+            return self.rasterize_pil(glyph, color, self.emoji_font, self.emoji_font_size)
+        if self.font is not None:
+            return self.rasterize_pil(glyph, color, self.font, self.height)
+        return self.rasterize_hershey(glyph, color)
+
+    def rasterize_pil(self, glyph, color, font, size):
+        # Canvas in the font's own size, scaled to the cell height afterwards
+        scale = self.height / size if font is self.emoji_font else 1.0
+        canvas_h = int(round(self.height / scale))
+        width = max(1, int(round(font.getlength(glyph))))
+        image = Image.new("RGBA", (width, canvas_h), (0, 0, 0, 0))
+        ascent = font.getmetrics()[0]
+        y = (canvas_h - ascent) // 2 if font is self.emoji_font else int(self.height * 0.05)
+        ImageDraw.Draw(image).text((0, y), glyph, font=font, fill=(color[2], color[1], color[0], 255),
+                                   embedded_color=True)
+        rgba = np.asarray(image)
+        bgra = rgba[..., [2, 1, 0, 3]]
+        if scale != 1.0:
+            bgra = cv2.resize(bgra, (max(1, int(width * scale)), self.height), interpolation=cv2.INTER_AREA)
+        return np.ascontiguousarray(bgra)
+
+    def rasterize_hershey(self, glyph, color):
+        thickness = max(1, self.height // 16)
+        scale = cv2.getFontScaleFromHeight(cv2.FONT_HERSHEY_PLAIN, int(self.height * 0.6), thickness)
+        if not glyph.isascii():
+            # Hershey fonts are ASCII only: draw a placeholder box
+            w = self.height // 2
+            bgra = np.zeros((self.height, w + 4, 4), np.uint8)
+            cv2.rectangle(bgra, (2, self.height // 5), (w, self.height * 4 // 5), color + (255,), thickness)
+            return bgra
+        (w, _), _ = cv2.getTextSize(glyph, cv2.FONT_HERSHEY_PLAIN, scale, thickness)
+        bgra = np.zeros((self.height, w + thickness, 4), np.uint8)
+        cv2.putText(bgra, glyph, (0, int(self.height * 0.8)), cv2.FONT_HERSHEY_PLAIN, scale,
+                    color + (255,), thickness)
+        return bgra
+
+    def blit(self, img, cell, x, y):
+        """Alpha-composite one atlas cell onto img with its top-left at (x, y), clipped."""
+        w = int(self.widths[cell])
+        ih, iw = img.shape[:2]
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + w, iw), min(y + self.height, ih)
+        if x1 <= x0 or y1 <= y0:
+            return w
+        color = self.color[cell, y0 - y:y1 - y, x0 - x:x1 - x]
+        alpha = self.alpha[cell, y0 - y:y1 - y, x0 - x:x1 - x, None].astype(np.uint16)
+        roi = img[y0:y1, x0:x1]
+        roi[:] = (roi * (255 - alpha) // 255 + color).astype(np.uint8)
+        return w
+
+    def draw_text(self, img, text, org, color=(255, 255, 255)):
+        """Draw a short label with its top-left at org; returns the drawn width."""
+        x, y = org
+        for glyph in split_graphemes(text):
+            x += self.blit(img, self.get(glyph, color), x, y)
+        return x - org[0]
+
+
+class TextLine:
+    """
+    Single-line text box that keeps its rendering between frames.
+
+    update() re-rasterizes only the glyphs after the first change (normally
+    the last typed character), and when the text outgrows the box it scrolls
+    so the tail stays visible. draw() is one composite of the fixed-size strip.
+    """
+
+    def __init__(self, cache, width, color=(255, 255, 255)):
+        self.cache = cache
+        self.width = width
+        self.height = cache.height
+        self.text_color = color
+
+        self.color = np.zeros((self.height, width, 3), np.uint8)
+        self.inv_alpha = np.full((self.height, width, 3), 255, np.uint8)
+        self.glyphs = []      # graphemes of the full text
+        self.start = 0        # first grapheme shown
+        self.xs = [0]         # x of each shown grapheme, plus the end position
+
+    def update(self, text):
+        glyphs = split_graphemes(text)
+        common = 0
+        limit = min(len(glyphs), len(self.glyphs))
+        while common < limit and glyphs[common] == self.glyphs[common]:
+            common += 1
+        if common == len(glyphs) == len(self.glyphs):
+            return
+
+        self.glyphs = glyphs
+        if common < self.start:
+            self.relayout()
+            return
+
+        # Clear from the first changed glyph and append the new tail
+        keep = common - self.start
+        del self.xs[keep + 1:]
+        x = self.xs[keep]
+        self.color[:, x:] = 0
+        self.inv_alpha[:, x:] = 255
+        for i in range(common, len(glyphs)):
+            if not self.append(glyphs[i]):
+                self.relayout()
+                return
+
+    def append(self, glyph):
+        cell = self.cache.get(glyph, self.text_color)
+        x = self.xs[-1]
+        w = int(self.cache.widths[cell])
+        if x + w > self.width:
+            return False
+        self.color[:, x:x + w] = self.cache.color[cell, :, :w]
+        self.inv_alpha[:, x:x + w] = 255 - self.cache.alpha[cell, :, :w, None]
+        self.xs.append(x + w)
+        return True
+
+    def relayout(self):
+        # Show as much of the tail as fits in two thirds of the box, leaving room to type
+        budget = self.width * 2 // 3
+        start = len(self.glyphs)
+        used = 0
+        while start > 0:
+            w = int(self.cache.widths[self.cache.get(self.glyphs[start - 1], self.text_color)])
+            if used + w > budget:
+                break
+            used += w
+            start -= 1
+
+        self.start = start
+        self.xs = [0]
+        self.color[:] = 0
+        self.inv_alpha[:] = 255
+        for glyph in self.glyphs[start:]:
+            self.append(glyph)
+
+    def draw(self, img, org):
+        x, y = org
+        roi = img[y:y + self.height, x:x + self.width]
+        h, w = roi.shape[:2]
+        cv2.multiply(roi, self.inv_alpha[:h, :w], dst=roi, scale=1 / 255)
+        cv2.add(roi, self.color[:h, :w], dst=roi)
+        return img
@@ -0,0 +1,233 @@
+"""
+Append-only, memory-mappable landmark traces.
+
+A trace is a directory of column files, each a flat array of fixed-size
+little-endian records (one per frame, or one per event), plus header.json
+describing them:
+
+    timestamps.bin   float64            capture/inference time per frame
+    counts.bin       int8               hands detected
+    normalized.bin   float32 (H, 21, 3) landmarks normalized to the frame
+    handedness.bin   int8 (H,)          0 = Left, 1 = Right, -1 = unknown
+    scores.bin       float32 (H,)
+    events.bin       EVENT_DTYPE        sink output (keys, clicks, clipboard...)
+
+Writers only ever append, so a crash loses at most the unflushed tail and a
+reader simply ignores a partially written last record.
+"""
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from hand_tracker import HandLandmarks, NUM_LANDMARKS
+
+TRACE_VERSION = 1
+
+EVENT_DTYPE = np.dtype([("t", "<f8"), ("frame", "<u4"), ("kind", "S12"), ("x", "<i4"), ("y", "<i4"), ("text", "S24")])
+
+
+def frame_columns(max_hands):
+    return {
+        "timestamps": ("<f8", ()),
+        "counts": ("i1", ()),
+        "normalized": ("<f4", (max_hands, NUM_LANDMARKS, 3)),
+        "handedness": ("i1", (max_hands,)),
+        "scores": ("<f4", (max_hands,)),
+    }
+
+
+class TraceStoreWriter:
+    """Appends per-frame landmarks and sink events to a trace directory."""
+
+    def __init__(self, path, max_hands=2, frame_size=(1280, 720), flush_every=30):
+        self.path = path
+        self.max_hands = max_hands
+        self.flush_every = flush_every
+        self.columns = frame_columns(max_hands)
+        self.lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+        header_path = os.path.join(path, "header.json")
+        if os.path.exists(header_path):
+            with open(header_path) as f:
+                header = json.load(f)
+            if header["max_hands"] != max_hands:
+                raise ValueError(f"Trace '{path}' was recorded with max_hands={header['max_hands']}")
+        else:
+            header = {
+                "version": TRACE_VERSION,
+                "max_hands": max_hands,
+                "frame_size": list(frame_size),
+                "columns": {name: [dtype, list(shape)] for name, (dtype, shape) in self.columns.items()},
+                "event_dtype": EVENT_DTYPE.descr,
+            }
+            with open(header_path, "w") as f:
+                json.dump(header, f, indent=2)
+
+        self.frames = self.truncate_partial()
+        self.files = {name: open(os.path.join(path, name + ".bin"), "ab") for name in self.columns}
+        self.events_file = open(os.path.join(path, "events.bin"), "ab")
+        self.pending = 0
+
+        # Reused per-frame records
+        self.timestamp = np.zeros(1, "<f8")
+        self.count = np.zeros(1, "i1")
+        self.event = np.zeros(1, EVENT_DTYPE)
+
+    def truncate_partial(self):
+        """
+        Cut every column of an existing trace back to its last whole frame, and
+        events.bin to its last whole event, so appends stay aligned; returns the frame count.
+        """
+        sizes = {}
+        for name, (dtype, shape) in self.columns.items():
+            path = os.path.join(self.path, name + ".bin")
+            itemsize = np.dtype(dtype).itemsize * int(np.prod(shape))
+            sizes[name] = (path, itemsize, os.path.getsize(path) if os.path.exists(path) else 0)
+        frames = min(size // itemsize for _, itemsize, size in sizes.values())
+        for path, itemsize, size in sizes.values():
+            if size > frames * itemsize:
+                os.truncate(path, frames * itemsize)
+        events_path = os.path.join(self.path, "events.bin")
+        if os.path.exists(events_path):
+            size = os.path.getsize(events_path)
+            if size % EVENT_DTYPE.itemsize:
+                os.truncate(events_path, size - size % EVENT_DTYPE.itemsize)
+        return frames
+
+    def append(self, landmarks, timestamp):
+        """Record one frame of landmarks (rows beyond `count` are zeroed)."""
+        n = min(landmarks.count, self.max_hands)
+        with self.lock:
+            self.timestamp[0] = timestamp
+            self.count[0] = n
+            normalized = landmarks.normalized[:self.max_hands]
+            if n < self.max_hands:
+                normalized = normalized.copy()
+                normalized[n:] = 0
+            self.files["timestamps"].write(self.timestamp.tobytes())
+            self.files["counts"].write(self.count.tobytes())
+            self.files["normalized"].write(normalized.astype("<f4", copy=False).tobytes())
+            self.files["handedness"].write(landmarks.handedness[:self.max_hands].astype("i1", copy=False).tobytes())
+            self.files["scores"].write(landmarks.scores[:self.max_hands].astype("<f4", copy=False).tobytes())
+            self.frames += 1
+            self.pending += 1
+            if self.pending >= self.flush_every:
+                self.flush_locked()
+
+    def append_event(self, kind, timestamp, x=0, y=0, text=""):
+        with self.lock:
+            event = self.event[0]
+            event["t"] = timestamp
+            event["frame"] = max(self.frames - 1, 0)
+            event["kind"] = kind.encode("ascii")[:12]
+            event["x"] = x
+            event["y"] = y
+            event["text"] = text.encode("utf-8")[:24]
+            self.events_file.write(self.event.tobytes())
+
+    def flush(self):
+        with self.lock:
+            self.flush_locked()
+
+    def flush_locked(self):
+        for f in self.files.values():
+            f.flush()
+        self.events_file.flush()
+        self.pending = 0
+
+    def close(self):
+        with self.lock:
+            self.flush_locked()
+            for f in self.files.values():
+                f.close()
+            self.events_file.close()
+
+
+class TraceSink:
+    """Sink wrapper that records every output event to a trace, then forwards it."""
+
+    def __init__(self, backend, writer, clock=None):
+        self.backend = backend
+        self.writer = writer
+        self.clock = clock or time.time
+
+    def tap_key(self, key):
+        self.writer.append_event("key", self.clock(), text=key)
+        self.backend.tap_key(key)
+
+    def move_mouse(self, x, y):
+        self.writer.append_event("mouse_move", self.clock(), x, y)
+        self.backend.move_mouse(x, y)
+
+    def click_mouse(self):
+        self.writer.append_event("mouse_click", self.clock())
+        self.backend.click_mouse()
+
+    def play_click(self):
+        self.backend.play_click()
+
+    def copy_to_clipboard(self, text):
+        self.writer.append_event("clipboard", self.clock(), text=text)
+        self.backend.copy_to_clipboard(text)
+
+
+class TraceStoreReader:
+    """Memory-maps a trace directory; columns are read lazily straight from the page cache."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "header.json")) as f:
+            self.header = json.load(f)
+        if self.header["version"] != TRACE_VERSION:
+            raise ValueError(f"Unsupported trace version {self.header['version']} in '{path}'")
+        self.max_hands = self.header["max_hands"]
+        self.frame_size = tuple(self.header["frame_size"])
+
+        self.columns = {}
+        for name, (dtype, shape) in self.header["columns"].items():
+            self.columns[name] = self.map(name + ".bin", np.dtype((dtype, tuple(shape))) if shape else np.dtype(dtype))
+        # A crash can leave columns one record apart: only whole frames count
+        self.frames = min(len(col) for col in self.columns.values())
+        self.events = self.map("events.bin", EVENT_DTYPE)
+
+    def map(self, filename, dtype):
+        path = os.path.join(self.path, filename)
+        n = os.path.getsize(path) // dtype.itemsize if os.path.exists(path) else 0
+        if n == 0:
+            return np.zeros((0,) + dtype.shape, dtype.base)
+        return np.memmap(path, dtype=dtype, mode="r", shape=(n,))
+
+    def __len__(self):
+        return self.frames
+
+    def column(self, name, start=0, stop=None):
+        stop = self.frames if stop is None else min(stop, self.frames)
+        return self.columns[name][start:stop]
+
+    def iter_chunks(self, chunk_size=4096):
+        """Yield dicts of column arrays, chunk_size frames at a time."""
+        for start in range(0, self.frames, chunk_size):
+            yield {name: self.column(name, start, start + chunk_size) for name in self.columns}
+
+    def iter_landmarks(self):
+        """Yield (HandLandmarks, timestamp) per frame; the HandLandmarks object is reused."""
+        landmarks = HandLandmarks(self.max_hands)
+        w, h = self.frame_size
+        scale = np.array([w, h, w], np.float32)
+        for chunk in self.iter_chunks():
+            for i in range(len(chunk["timestamps"])):
+                n = int(chunk["counts"][i])
+                landmarks.count = n
+                landmarks.normalized[:] = chunk["normalized"][i]
+                landmarks.handedness[:] = chunk["handedness"][i]
+                landmarks.scores[:] = chunk["scores"][i]
+                np.multiply(landmarks.normalized[:n], scale, out=landmarks.pixels[:n])
+                yield landmarks, float(chunk["timestamps"][i])
+
+    def close(self):
+        self.columns = {}
+        self.events = None